@@ -0,0 +1,684 @@
+"""
+In-process stand-ins for the AWS APIs the scheduler uses, with per-operation
+call accounting. Only the request/response shapes the Lambda reads are modelled.
+
+Every call goes through a botocore-like event system (before-call,
+needs-retry, after-call, after-call-error), and FakeSession hands the fakes
+to targets.get_client/get_resource. The Lambda's profiling and resilience
+hooks are therefore registered and run on the fakes as on real clients.
+"""
+import collections
+import copy
+import fnmatch
+import random
+import re
+import threading
+import types
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+
+class FakeError(Exception):
+    """
+    Mimics botocore ClientError closely enough for error_code().
+    """
+
+    def __init__(self, code: str, message: str = ""):
+        super().__init__(f"{code}: {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+
+class CallLog:
+    """
+    Thread-safe counter of API calls keyed by "service.Operation".
+    """
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def add(self, service: str, operation: str):
+        with self._lock:
+            self.counts[f"{service}.{operation}"] += 1
+
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+# ================================
+# 🔹 BOTOCORE-LIKE HOOKS
+# ================================
+class FakeEvents:
+    """
+    The part of botocore's event system the Lambda's hooks use: register,
+    register_first (with unique_id) and wildcard event names.
+    """
+
+    def __init__(self):
+        self.handlers = []  # (pattern, handler, unique_id)
+
+    def _add(self, position, event_name, handler, unique_id=None):
+        if unique_id is not None and any(u == unique_id for _, _, u in self.handlers):
+            return
+        self.handlers.insert(position, (event_name, handler, unique_id))
+
+    def register(self, event_name, handler, unique_id=None, **kwargs):
+        self._add(len(self.handlers), event_name, handler, unique_id)
+
+    def register_first(self, event_name, handler, unique_id=None, **kwargs):
+        self._add(0, event_name, handler, unique_id)
+
+    def emit(self, event_name, **kwargs):
+        return [(handler, handler(event_name=event_name, **kwargs))
+                for pattern, handler, _ in list(self.handlers) if fnmatch.fnmatchcase(event_name, pattern)]
+
+
+class FakeHttpResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+class FakeClient:
+    """
+    Base of the fake clients: call accounting plus the botocore events
+    around each API call, in botocore's order. Calls are never retried.
+    """
+
+    SERVICE = None
+
+    def __init__(self, log: CallLog):
+        self.log = log
+        self.meta = types.SimpleNamespace(events=FakeEvents(), region_name=REGION)
+
+    @contextmanager
+    def api_call(self, operation: str):
+        name = f"{self.SERVICE}.{operation}"
+        events = self.meta.events
+        context = {}
+        # A before-call hook that raises (open circuit) stops the call before it is sent
+        events.emit(f"before-call.{name}", params={}, model=None, context=context)
+        self.log.add(self.SERVICE, operation)
+        try:
+            error = None
+            try:
+                yield
+            except FakeError as e:
+                error = e
+            parsed = error.response if error is not None else {}
+            http = FakeHttpResponse(400 if error is not None else 200)
+            events.emit(
+                f"needs-retry.{name}", response=(http, parsed), endpoint=None, caught_exception=None,
+                attempts=1, operation=types.SimpleNamespace(name=operation), request_dict={"context": context},
+            )
+        except Exception as e:
+            events.emit(f"after-call-error.{name}", exception=e, context=context)
+            raise
+        events.emit(f"after-call.{name}", http_response=http, parsed=parsed, model=None, context=context)
+        if error is not None:
+            raise error
+
+
+class FakeSession:
+    """
+    Stand-in for the boto3 session in targets.py: returns the fakes, so
+    clients get the same profiling/resilience registration as real ones.
+    """
+
+    region_name = None
+
+    def __init__(self, clients: dict, resources: dict = None, region: str = None):
+        self.clients = clients
+        self.resources = resources or {}
+        self.region_name = region or REGION
+
+    def client(self, service: str, **kwargs):
+        return self.clients[service]
+
+    def resource(self, service: str, **kwargs):
+        return self.resources[service]
+
+
+def install_session(targets, clients: dict, resources: dict = None):
+    """
+    Put the fakes behind targets.get_client/get_resource, dropping any client built before.
+    """
+    targets._clients.clear()
+    targets._resources.clear()
+    targets._session["session"] = FakeSession(clients, resources)
+
+
+class FakePaginator:
+    def __init__(self, client: FakeClient, operation: str, fetch, key: str, page_size: int):
+        self.client = client
+        self.operation = operation
+        self.fetch = fetch
+        self.key = key
+        self.page_size = page_size
+
+    def paginate(self, **kwargs):
+        items = self.fetch(**kwargs)
+        for i in range(0, max(len(items), 1), self.page_size):
+            with self.client.api_call(self.operation):
+                page = {self.key: items[i:i + self.page_size]}
+            yield page
+
+
+# ================================
+# 🔹 EC2
+# ================================
+class FakeEC2(FakeClient):
+    SERVICE = "ec2"
+    PAGE_SIZE = 1000
+
+    def __init__(self, log: CallLog, instances: list):
+        super().__init__(log)
+        self.instances = {i["InstanceId"]: i for i in instances}
+        self.events = []
+        self._lock = threading.Lock()
+
+    def get_paginator(self, operation: str):
+        assert operation == "describe_instances", operation
+        return FakePaginator(self, "DescribeInstances", self._describe, "Reservations", self.PAGE_SIZE)
+
+    def _describe(self, Filters=None, InstanceIds=None, **kwargs):
+        keys = [f["Values"][0] for f in Filters or [] if f["Name"] == "tag-key"]
+        # "tag:<key>" filters: key -> accepted values, with EC2's * and ? wildcards
+        values = {f["Name"][4:]: f["Values"] for f in Filters or [] if f["Name"].startswith("tag:")}
+
+        def matches(instance):
+            tags = {t["Key"]: t["Value"] for t in instance.get("Tags", [])}
+            if keys and not any(k in tags for k in keys):
+                return False
+            return all(
+                k in tags and any(fnmatch.fnmatchcase(tags[k], v) for v in accepted)
+                for k, accepted in values.items()
+            )
+
+        with self._lock:
+            if InstanceIds and not all(i in self.instances for i in InstanceIds):
+                raise FakeError("InvalidInstanceID.NotFound", ",".join(InstanceIds))
+            found = [
+                copy.deepcopy(i) for i in self.instances.values()
+                if matches(i) and (not InstanceIds or i["InstanceId"] in InstanceIds)
+            ]
+        return [{"Instances": [i]} for i in found]
+
+    def describe_instances(self, **kwargs):
+        with self.api_call("DescribeInstances"):
+            return {"Reservations": self._describe(**kwargs)}
+
+    def _transition(self, operation: str, ids: list, allowed: str, new_state: str):
+        with self.api_call(operation), self._lock:
+            for instance_id in ids:
+                instance = self.instances.get(instance_id)
+                if instance is None:
+                    raise FakeError("InvalidInstanceID.NotFound", instance_id)
+                if instance["State"]["Name"] not in (allowed, new_state):
+                    raise FakeError("IncorrectInstanceState", instance_id)
+            for instance_id in ids:
+                instance = self.instances[instance_id]
+                if new_state == "pending" and instance["State"]["Name"] != new_state:
+                    # EC2 reports the last start as LaunchTime
+                    instance["LaunchTime"] = datetime.now(timezone.utc)
+                instance["State"]["Name"] = new_state
+                self.events.append(ec2_state_event(instance_id, new_state))
+        return {}
+
+    def start_instances(self, InstanceIds, **kwargs):
+        return self._transition("StartInstances", InstanceIds, "stopped", "pending")
+
+    def stop_instances(self, InstanceIds, Hibernate=False, **kwargs):
+        return self._transition("StopInstances", InstanceIds, "running", "stopping")
+
+    def settle(self):
+        """
+        Finish in-flight transitions, as if time passed between invocations.
+        """
+        with self._lock:
+            for instance in self.instances.values():
+                state = instance["State"]["Name"]
+                if state == "pending":
+                    instance["State"]["Name"] = "running"
+                    self.events.append(ec2_state_event(instance["InstanceId"], "running"))
+                elif state == "stopping":
+                    instance["State"]["Name"] = "stopped"
+                    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+                    instance["StateTransitionReason"] = f"User initiated ({now} GMT)"
+                    self.events.append(ec2_state_event(instance["InstanceId"], "stopped"))
+
+
+# ================================
+# 🔹 RDS
+# ================================
+class FakeRDS(FakeClient):
+    SERVICE = "rds"
+    PAGE_SIZE = 100
+
+    def __init__(self, log: CallLog, dbs: list):
+        super().__init__(log)
+        self.dbs = {d["DBInstanceIdentifier"]: d for d in dbs}
+        self.events = []
+        self._lock = threading.Lock()
+
+    def get_paginator(self, operation: str):
+        assert operation == "describe_db_instances", operation
+        return FakePaginator(self, "DescribeDBInstances", self._describe, "DBInstances", self.PAGE_SIZE)
+
+    def _describe(self, **kwargs):
+        with self._lock:
+            return [copy.deepcopy(d) for d in self.dbs.values()]
+
+    def describe_db_instances(self, DBInstanceIdentifier=None, **kwargs):
+        with self.api_call("DescribeDBInstances"):
+            dbs = self._describe()
+            if DBInstanceIdentifier:
+                dbs = [d for d in dbs if d["DBInstanceIdentifier"] == DBInstanceIdentifier]
+            return {"DBInstances": dbs}
+
+    def list_tags_for_resource(self, ResourceName, **kwargs):
+        with self.api_call("ListTagsForResource"):
+            for db in self.dbs.values():
+                if db["DBInstanceArn"] == ResourceName:
+                    return {"TagList": copy.deepcopy(db["TagList"])}
+            raise FakeError("DBInstanceNotFound", ResourceName)
+
+    def _transition(self, operation: str, db_id: str, allowed: str, new_state: str):
+        with self.api_call(operation), self._lock:
+            db = self.dbs.get(db_id)
+            if db is None:
+                raise FakeError("DBInstanceNotFound", db_id)
+            if db["DBInstanceStatus"] != allowed:
+                raise FakeError("InvalidDBInstanceState", db_id)
+            db["DBInstanceStatus"] = new_state
+        return {}
+
+    def start_db_instance(self, DBInstanceIdentifier, **kwargs):
+        return self._transition("StartDBInstance", DBInstanceIdentifier, "stopped", "starting")
+
+    def stop_db_instance(self, DBInstanceIdentifier, **kwargs):
+        return self._transition("StopDBInstance", DBInstanceIdentifier, "available", "stopping")
+
+    def settle(self):
+        with self._lock:
+            for db in self.dbs.values():
+                if db["DBInstanceStatus"] == "starting":
+                    db["DBInstanceStatus"] = "available"
+                    self.events.append(rds_instance_event(db, "RDS-EVENT-0088", "DB instance started"))
+                elif db["DBInstanceStatus"] == "stopping":
+                    db["DBInstanceStatus"] = "stopped"
+                    self.events.append(rds_instance_event(db, "RDS-EVENT-0087", "DB instance stopped"))
+
+
+# ================================
+# 🔹 CLOUDWATCH / STS
+# ================================
+class FakeCloudWatch(FakeClient):
+    SERVICE = "cloudwatch"
+    MAX_DATUMS = 1000
+
+    def __init__(self, log: CallLog):
+        super().__init__(log)
+        self.published = []
+
+    def put_metric_data(self, Namespace, MetricData, **kwargs):
+        with self.api_call("PutMetricData"):
+            if len(MetricData) > self.MAX_DATUMS:
+                raise FakeError("InvalidParameterValue", f"{len(MetricData)} datums exceed {self.MAX_DATUMS}")
+            self.published.extend(MetricData)
+            return {}
+
+
+class FakeSTS(FakeClient):
+    SERVICE = "sts"
+
+    def get_caller_identity(self, **kwargs):
+        with self.api_call("GetCallerIdentity"):
+            return {"Account": ACCOUNT, "Arn": f"arn:aws:sts::{ACCOUNT}:assumed-role/scheduler/fake"}
+
+    def assume_role(self, RoleArn, RoleSessionName, **kwargs):
+        with self.api_call("AssumeRole"):
+            return {"Credentials": {
+                "AccessKeyId": "AKIAFAKE",
+                "SecretAccessKey": "fake",
+                "SessionToken": "fake",
+                "Expiration": datetime.now(timezone.utc) + timedelta(hours=1),
+            }}
+
+
+# ================================
+# 🔹 DYNAMODB (resource API)
+# ================================
+class FakeBatchWriter:
+    def __init__(self, table):
+        self.table = table
+        self.pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._flush()
+
+    def _flush(self):
+        if self.pending:
+            with self.table.client.api_call("BatchWriteItem"):
+                self.pending = 0
+
+    def _count(self):
+        self.pending += 1
+        if self.pending == 25:
+            self._flush()
+
+    def put_item(self, Item):
+        with self.table._lock:
+            self.table.items[self.table.key_of(Item)] = copy.deepcopy(Item)
+        self._count()
+
+    def delete_item(self, Key):
+        with self.table._lock:
+            self.table.items.pop(self.table.key_of(Key), None)
+        self._count()
+
+
+# Condition expressions understood by FakeTable: attribute_exists/not_exists
+# and comparisons, joined with AND/OR (AND binds tighter, no parentheses)
+CONDITION_FUNCTION = re.compile(r"^(attribute_exists|attribute_not_exists)\(\s*([#\w.]+)\s*\)$")
+CONDITION_COMPARISON = re.compile(r"^([#:\w.]+)\s*(<=|>=|<>|=|<|>)\s*([#:\w.]+)$")
+COMPARATORS = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+class FakeTable:
+    PAGE_SIZE = 500
+
+    def __init__(self, client: FakeClient, name: str, hash_key: str, items: list = None, range_key: str = None):
+        self.client = client
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.items = {self.key_of(i): copy.deepcopy(i) for i in items or []}
+        self._lock = threading.Lock()
+
+    def key_of(self, item: dict):
+        if self.range_key is None:
+            return item[self.hash_key]
+        return (item[self.hash_key], item[self.range_key])
+
+    def _page(self, items: list, kwargs: dict) -> dict:
+        start = int(kwargs.get("ExclusiveStartKey", {}).get("_offset", 0))
+        resp = {"Items": copy.deepcopy(items[start:start + self.PAGE_SIZE])}
+        if start + self.PAGE_SIZE < len(items):
+            resp["LastEvaluatedKey"] = {"_offset": start + self.PAGE_SIZE}
+        return resp
+
+    def _check(self, item, condition: str, names: dict, values: dict):
+        """
+        Evaluate a ConditionExpression against the stored item (None = absent).
+        """
+        if not condition:
+            return
+        item = item or {}
+
+        def operand(token):
+            if token.startswith(":"):
+                return values[token]
+            return item.get(names.get(token, token))
+
+        def term(text):
+            text = text.strip()
+            match = CONDITION_FUNCTION.match(text)
+            if match:
+                present = names.get(match.group(2), match.group(2)) in item
+                return present if match.group(1) == "attribute_exists" else not present
+            match = CONDITION_COMPARISON.match(text)
+            if not match:
+                raise ValueError(f"Unsupported condition: {text}")
+            left, right = operand(match.group(1)), operand(match.group(3))
+            if left is None or right is None:
+                return False
+            return COMPARATORS[match.group(2)](left, right)
+
+        if not any(all(term(t) for t in re.split(r"\s+AND\s+", branch))
+                   for branch in re.split(r"\s+OR\s+", condition)):
+            raise FakeError("ConditionalCheckFailedException", "The conditional request failed")
+
+    def scan(self, **kwargs):
+        with self.client.api_call("Scan"):
+            return self._page(list(self.items.values()), kwargs)
+
+    def query(self, IndexName=None, ExpressionAttributeValues=None, ExpressionAttributeNames=None, **kwargs):
+        with self.client.api_call("Query"):
+            attribute = (ExpressionAttributeNames or {}).get("#t", "Type")
+            value = list(ExpressionAttributeValues.values())[0]
+            return self._page([i for i in self.items.values() if i.get(attribute) == value], kwargs)
+
+    def get_item(self, Key, **kwargs):
+        with self.client.api_call("GetItem"):
+            item = self.items.get(self.key_of(Key))
+            return {"Item": copy.deepcopy(item)} if item else {}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, **kwargs):
+        with self.client.api_call("PutItem"):
+            with self._lock:
+                key = self.key_of(Item)
+                self._check(self.items.get(key), ConditionExpression, ExpressionAttributeNames or {},
+                            ExpressionAttributeValues or {})
+                self.items[key] = copy.deepcopy(Item)
+            return {}
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, **kwargs):
+        """
+        Supports "SET a = :x, #b = :y" updates only.
+        """
+        with self.client.api_call("UpdateItem"):
+            names = ExpressionAttributeNames or {}
+            values = ExpressionAttributeValues or {}
+            assert UpdateExpression.startswith("SET "), UpdateExpression
+            with self._lock:
+                key = self.key_of(Key)
+                current = self.items.get(key)
+                self._check(current, ConditionExpression, names, values)
+                item = copy.deepcopy(current) if current else copy.deepcopy(Key)
+                for assignment in UpdateExpression[4:].split(","):
+                    name, _, value = (part.strip() for part in assignment.partition("="))
+                    item[names.get(name, name)] = values[value]
+                self.items[key] = item
+            return {}
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, **kwargs):
+        with self.client.api_call("DeleteItem"):
+            with self._lock:
+                key = self.key_of(Key)
+                self._check(self.items.get(key), ConditionExpression, ExpressionAttributeNames or {},
+                            ExpressionAttributeValues or {})
+                self.items.pop(key, None)
+            return {}
+
+    def batch_writer(self, **kwargs):
+        return FakeBatchWriter(self)
+
+
+class FakeDynamoDBClient(FakeClient):
+    SERVICE = "dynamodb"
+
+
+class FakeDynamoDB:
+    """
+    Stand-in for boto3.resource("dynamodb"); its tables' calls go through
+    meta.client, like a real resource.
+    """
+
+    def __init__(self, log: CallLog):
+        self.log = log
+        self.meta = types.SimpleNamespace(client=FakeDynamoDBClient(log))
+        self.tables = {}
+
+    def add_table(self, name: str, hash_key: str, items: list = None, range_key: str = None) -> FakeTable:
+        self.tables[name] = FakeTable(self.meta.client, name, hash_key, items, range_key)
+        return self.tables[name]
+
+    def Table(self, name: str) -> FakeTable:
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        with self.meta.client.api_call("BatchGetItem"):
+            responses = {}
+            for name, request in RequestItems.items():
+                table = self.tables[name]
+                found = (table.items.get(table.key_of(k)) for k in request["Keys"])
+                responses[name] = [copy.deepcopy(item) for item in found if item is not None]
+            return {"Responses": responses, "UnprocessedKeys": {}}
+
+
+# ================================
+# 🔹 EVENTBRIDGE EVENTS
+# ================================
+ACCOUNT = "123456789012"
+REGION = "us-east-1"
+
+
+def event_time() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def ec2_state_event(instance_id: str, state: str) -> dict:
+    return {
+        "version": "0",
+        "id": f"ec2-{instance_id}-{state}",
+        "detail-type": "EC2 Instance State-change Notification",
+        "source": "aws.ec2",
+        "account": ACCOUNT,
+        "time": event_time(),
+        "region": REGION,
+        "resources": [f"arn:aws:ec2:{REGION}:{ACCOUNT}:instance/{instance_id}"],
+        "detail": {"instance-id": instance_id, "state": state},
+    }
+
+
+def rds_instance_event(db: dict, event_id: str, message: str) -> dict:
+    return {
+        "version": "0",
+        "id": f"rds-{db['DBInstanceIdentifier']}-{event_id}",
+        "detail-type": "RDS DB Instance Event",
+        "source": "aws.rds",
+        "account": ACCOUNT,
+        "time": event_time(),
+        "region": REGION,
+        "resources": [db["DBInstanceArn"]],
+        "detail": {
+            "EventCategories": ["notification"],
+            "SourceType": "DB_INSTANCE",
+            "SourceArn": db["DBInstanceArn"],
+            "Date": event_time(),
+            "Message": message,
+            "SourceIdentifier": db["DBInstanceIdentifier"],
+            "EventID": event_id,
+        },
+    }
+
+
+# ================================
+# 🔹 SYNTHETIC ESTATES
+# ================================
+TAG_KEY = "ScheduleTag"
+EC2_TYPES = ["t3.micro", "t3.small", "t3.large", "m5.large", "m5.xlarge", "c5.large", "r5.large"]
+RDS_CLASSES = ["db.t3.micro", "db.t3.medium", "db.m5.large", "db.r5.large"]
+# Latest LaunchTime in a synthetic estate; launch times are spread over
+# LAUNCH_SPREAD_MINUTES before it, by index rather than from the seeded RNG,
+# so adding them left every other attribute of an estate unchanged
+LAUNCHED_AT = datetime(2024, 5, 1, tzinfo=timezone.utc)
+LAUNCH_SPREAD_MINUTES = 100000
+
+# Share of resources whose ScheduleTag lists two schedules
+MULTI_SCHEDULE_SHARE = 0.1
+# One schedule in this many opts in to pre-warming
+PREWARM_EVERY = 4
+TIMEZONES = ["UTC", "Asia/Tokyo", "Europe/Berlin", "America/New_York", "Asia/Ho_Chi_Minh"]
+
+# Period mix covering ranges, steps (/), last day (L), nearest weekday (W) and nth weekday (#)
+PERIOD_TEMPLATES = [
+    {"BeginTime": "09:00", "EndTime": "18:00", "Weekdays": "0-4"},
+    {"BeginTime": "08:00", "EndTime": "20:00", "Weekdays": "mon,tue,wed,thu"},
+    {"BeginTime": "22:00", "EndTime": "06:00", "Weekdays": "0-4"},
+    {"BeginTime": "00:00", "EndTime": "23:59", "MonthDays": "L"},
+    {"BeginTime": "09:00", "EndTime": "12:00", "MonthDays": "15W,1W"},
+    {"BeginTime": "10:00", "EndTime": "16:00", "Weekdays": "mon#1,fri#3"},
+    {"BeginTime": "07:00", "EndTime": "19:00", "Weekdays": "friL"},
+    {"MonthDays": "1-15/2", "Months": "jan-jun"},
+    {"BeginTime": "06:00", "EndTime": "22:00", "Months": "jan/3", "MonthDays": "1/7"},
+    {"BeginTime": "12:00", "EndTime": "13:00"},
+]
+
+
+def schedule_tag(rng, names: list) -> str:
+    """
+    ScheduleTag value: usually one schedule, sometimes two (e.g. business hours OR a batch window).
+    """
+    if len(names) > 1 and rng.random() < MULTI_SCHEDULE_SHARE:
+        return " ".join(rng.sample(names, 2))
+    return rng.choice(names)
+
+
+def make_estate(instances: int, dbs: int, schedules: int, seed: int = 42) -> dict:
+    """
+    Build config items, EC2 instances and RDS instances for a synthetic estate.
+    """
+    rng = random.Random(seed)
+
+    periods = []
+    for i, template in enumerate(PERIOD_TEMPLATES):
+        periods.append(dict(template, Name=f"period-{i}", Type="period"))
+
+    names = [f"schedule-{i}" for i in range(schedules)]
+    # Version marker, as written by modules/dynamodb next to the config items
+    config = [{"Name": "__config_version__", "Type": "version", "Version": f"estate-{seed}"}] + periods
+    for i, name in enumerate(names):
+        chosen = rng.sample(periods, rng.randint(1, 3))
+        config.append({
+            "Name": name,
+            "Type": "schedule",
+            "Periods": ",".join(p["Name"] for p in chosen),
+            "Timezone": rng.choice(TIMEZONES),
+            "Hibernate": rng.random() < 0.2,
+            "UseMetric": rng.random() < 0.7,
+        })
+        # Pre-warming is opt-in: some schedules set PrewarmMinutes (by index, not from the RNG)
+        if i % PREWARM_EVERY == 0:
+            config[-1]["PrewarmMinutes"] = 30
+
+    ec2 = []
+    for i in range(instances):
+        ec2.append({
+            "InstanceId": f"i-{i:017x}",
+            "InstanceType": rng.choice(EC2_TYPES),
+            "State": {"Name": rng.choice(["running", "stopped"])},
+            "LaunchTime": LAUNCHED_AT - timedelta(minutes=i * 7919 % LAUNCH_SPREAD_MINUTES),
+            "StateTransitionReason": "",
+            "Tags": [{"Key": TAG_KEY, "Value": schedule_tag(rng, names)}, {"Key": "Name", "Value": f"app-{i}"}],
+        })
+
+    rds = []
+    for i in range(dbs):
+        db_id = f"db-{i}"
+        rds.append({
+            "DBInstanceIdentifier": db_id,
+            "DBInstanceArn": f"arn:aws:rds:{REGION}:{ACCOUNT}:db:{db_id}",
+            "DBInstanceClass": rng.choice(RDS_CLASSES),
+            "DBInstanceStatus": rng.choice(["available", "stopped"]),
+            "TagList": [{"Key": TAG_KEY, "Value": schedule_tag(rng, names)}],
+        })
+
+    return {"config": config, "ec2": ec2, "rds": rds}
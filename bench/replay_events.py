@@ -0,0 +1,95 @@
+"""
+Replay recorded EventBridge events through the state-change handler.
+
+By default the events are applied to the in-process fakes: a small synthetic
+estate is described once into a fake state cache table, then each event file
+is replayed and the resulting cache items are printed. With --table the
+events go to a real state cache table and real EC2/RDS clients instead.
+
+    python bench/replay_events.py bench/events/*.json
+    python bench/replay_events.py --table ec2-rds-scheduler-table-cache bench/events/ec2-state-change.json
+"""
+import argparse
+import json
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCH_DIR, "..", "modules", "lambda")
+
+STATE_CACHE_TABLE = "bench-table-cache"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="JSON files holding one event or a list of events")
+    parser.add_argument("--table", help="apply to this real state cache table instead of the fakes")
+    parser.add_argument("--instances", type=int, default=20, help="EC2 instances in the fake estate")
+    parser.add_argument("--dbs", type=int, default=5, help="RDS instances in the fake estate")
+    return parser.parse_args(argv)
+
+
+def load_events(paths: list) -> list:
+    events = []
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        events.extend(data if isinstance(data, list) else [data])
+    return events
+
+
+def install_fakes(args):
+    """
+    Fake clients and a state cache table resynced from a synthetic estate.
+    """
+    sys.path.insert(0, BENCH_DIR)
+    import fakes
+    import targets
+    from instances import build_inventory
+    from statecache import StateCache
+
+    log = fakes.CallLog()
+    estate = fakes.make_estate(args.instances, args.dbs, 3)
+    # Resync before the recorded events happened, so they all apply
+    resynced_at = 0
+    dynamodb = fakes.FakeDynamoDB(log)
+    table = dynamodb.add_table(STATE_CACHE_TABLE, "Target", range_key="ResourceId")
+
+    fakes.install_session(
+        targets,
+        {"ec2": fakes.FakeEC2(log, estate["ec2"]), "rds": fakes.FakeRDS(log, estate["rds"]), "sts": fakes.FakeSTS(log)},
+        {"dynamodb": dynamodb},
+    )
+
+    target = targets.Target()
+    StateCache(table).replace(targets.target_key(target), build_inventory(target), {}, resynced_at)
+    return table, log
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ["STATE_CACHE_TABLE"] = args.table or STATE_CACHE_TABLE
+    sys.path.insert(0, os.path.abspath(LAMBDA_DIR))
+
+    table, log = (None, None) if args.table else install_fakes(args)
+
+    import state_events
+    events = load_events(args.files)
+    if log is not None:
+        log.reset()
+    result = state_events.lambda_handler(events)
+    print(json.dumps({"events": len(events), **result}, indent=2))
+
+    if table is not None:
+        from statecache import parse_event
+        touched = {(c["account"], c["region"], c["resource_id"]) for c in map(parse_event, events) if c}
+        for account, region, resource_id in sorted(touched):
+            item = table.items.get((f"{account}/{region}", resource_id))
+            print(f"{resource_id}: {json.dumps(item, default=str) if item else '(not cached)'}")
+        print(f"API calls: {dict(sorted(log.counts.items()))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
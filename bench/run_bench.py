@@ -0,0 +1,226 @@
+"""
+Offline load test for the scheduler Lambda.
+
+Drives main.lambda_handler against the in-process fakes in bench/fakes.py on
+a synthetic estate and reports wall time, API calls per operation and peak
+memory per invocation, plus the cold import time of the handler module.
+The fakes are handed out by the boto3 session, so they run under the same
+profiling and resilience hooks as real clients.
+Exits non-zero when a budget is exceeded, so a change that brings back
+per-schedule API fan-out or eager client construction at import fails the run.
+
+    python bench/run_bench.py --instances 5000 --dbs 500 --schedules 300
+    python bench/run_bench.py --max-calls ec2.DescribeInstances=5 --max-wall-ms 2000
+    python bench/run_bench.py --state-cache   # read states from the event-fed cache
+    python bench/run_bench.py --shards 4      # coordinator + 4 in-process workers
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCH_DIR, "..", "modules", "lambda")
+
+TABLE_NAME = "bench-table"
+STATE_TABLE_NAME = "bench-table-state"
+STATE_CACHE_TABLE = "bench-table-cache"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instances", type=int, default=2000, help="EC2 instances in the estate")
+    parser.add_argument("--dbs", type=int, default=200, help="RDS instances in the estate")
+    parser.add_argument("--schedules", type=int, default=200, help="schedules in the config table")
+    parser.add_argument("--invocations", type=int, default=3, help="warm invocations to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-wall-ms", type=float, help="fail if any invocation takes longer")
+    parser.add_argument("--max-peak-mb", type=float, help="fail if any invocation allocates more at peak")
+    parser.add_argument("--max-calls", action="append", default=[], metavar="OP=N",
+                        help="per-invocation budget for one operation, e.g. ec2.DescribeInstances=3")
+    parser.add_argument("--max-init-ms", type=float, default=800,
+                        help="fail if a cold import of the handler module takes longer")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="run as coordinator with this many shards, workers invoked in-process")
+    parser.add_argument("--state-cache", action="store_true",
+                        help="enable the state cache and replay state-change events between invocations")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    return parser.parse_args(argv)
+
+
+def default_budgets(args) -> dict:
+    """
+    API budgets that hold only if no call scales with the number of schedules.
+    Each shard describes its own targets, so describe budgets scale with shards.
+    """
+    ec2_batches = math.ceil(args.instances / 50) + args.shards
+    return {
+        "ec2.DescribeInstances": math.ceil(args.instances / 1000) + args.shards,
+        "rds.DescribeDBInstances": args.shards * max(1, math.ceil(args.dbs / 100)),
+        "rds.ListTagsForResource": 0,
+        "ec2.StartInstances": ec2_batches,
+        "ec2.StopInstances": 2 * ec2_batches,
+        "rds.StartDBInstance": args.dbs,
+        "rds.StopDBInstance": args.dbs,
+        "cloudwatch.PutMetricData": 5 * args.shards,
+        "dynamodb.Scan": args.shards * (math.ceil((args.schedules + 20) / 500) + 1),
+    }
+
+
+# Run in a fresh interpreter so nothing is already imported
+INIT_PROBE = """
+import json, time
+started = time.perf_counter()
+import main
+import targets
+print(json.dumps({
+    "import_ms": round((time.perf_counter() - started) * 1000, 1),
+    "clients": len(targets._clients) + len(targets._resources),
+    "session": targets._session["session"] is not None,
+}))
+"""
+
+
+def measure_init() -> dict:
+    """
+    Cold import time of the handler module, and whether anything built a
+    boto3 session or client at import time (it should not).
+    """
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+    out = subprocess.run(
+        [sys.executable, "-c", INIT_PROBE], cwd=os.path.abspath(LAMBDA_DIR), env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def install(args):
+    """
+    Import the Lambda modules and have their boto3 session hand out the fakes.
+    """
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ["TABLE_NAME"] = TABLE_NAME
+    os.environ["STATE_TABLE_NAME"] = STATE_TABLE_NAME
+    # Fakes never throttle: dispatch unpaced unless a rate is set explicitly
+    os.environ.setdefault("EC2_CALLS_PER_SECOND", "0")
+    os.environ.setdefault("RDS_CALLS_PER_SECOND", "0")
+    if args.state_cache:
+        os.environ["STATE_CACHE_TABLE"] = STATE_CACHE_TABLE
+    if args.shards > 1:
+        os.environ["SHARD_COUNT"] = str(args.shards)
+    sys.path.insert(0, os.path.abspath(LAMBDA_DIR))
+    sys.path.insert(0, BENCH_DIR)
+
+    import fakes
+    import main
+    import shards
+    import targets
+
+    estate = fakes.make_estate(args.instances, args.dbs, args.schedules, args.seed)
+    log = fakes.CallLog()
+
+    dynamodb = fakes.FakeDynamoDB(log)
+    dynamodb.add_table(TABLE_NAME, "Name", estate["config"])
+    dynamodb.add_table(STATE_TABLE_NAME, "ResourceId")
+    dynamodb.add_table(STATE_CACHE_TABLE, "Target", range_key="ResourceId")
+
+    ec2 = fakes.FakeEC2(log, estate["ec2"])
+    rds = fakes.FakeRDS(log, estate["rds"])
+    cloudwatch = fakes.FakeCloudWatch(log)
+
+    # Behind the boto3 session, so the profiling and resilience hooks are registered on them
+    fakes.install_session(
+        targets,
+        {"cloudwatch": cloudwatch, "ec2": ec2, "rds": rds, "sts": fakes.FakeSTS(log)},
+        {"dynamodb": dynamodb},
+    )
+    # Workers run inline, so their summaries are in place before the first poll
+    shards.set_invoker(shards.LocalInvoker(main.lambda_handler))
+
+    return main, log, [ec2, rds]
+
+
+def run(args) -> dict:
+    main, log, settle = install(args)
+    import state_events
+
+    runs = []
+    for i in range(args.invocations):
+        log.reset()
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = main.lambda_handler({}, None)
+        wall_ms = (time.perf_counter() - started) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        runs.append({
+            "invocation": i + 1,
+            "wall_ms": round(wall_ms, 1),
+            "peak_mb": round(peak / 2**20, 2),
+            "api_calls": log.total(),
+            "calls": dict(sorted(log.counts.items())),
+            "result": {k: v for k, v in (result or {}).items() if k != "active"},
+        })
+        for fake in settle:
+            fake.settle()
+            # Deliver the state changes to the event handler, outside the call accounting
+            events, fake.events = fake.events, []
+            if args.state_cache and events:
+                state_events.lambda_handler(events)
+
+    return {"estate": vars(args), "init": measure_init(), "runs": runs}
+
+
+def check_budgets(args, report: dict) -> list:
+    budgets = default_budgets(args)
+    for spec in args.max_calls:
+        op, _, limit = spec.partition("=")
+        budgets[op] = int(limit)
+
+    violations = []
+    init = report["init"]
+    if init["import_ms"] > args.max_init_ms:
+        violations.append(f"init: import {init['import_ms']}ms exceeds {args.max_init_ms}ms")
+    if init["clients"] or init["session"]:
+        violations.append("init: boto3 session or clients were built at import time")
+
+    for entry in report["runs"]:
+        for op, limit in budgets.items():
+            count = entry["calls"].get(op, 0)
+            if count > limit:
+                violations.append(f"invocation {entry['invocation']}: {op}={count} exceeds budget {limit}")
+        if args.max_wall_ms is not None and entry["wall_ms"] > args.max_wall_ms:
+            violations.append(f"invocation {entry['invocation']}: wall {entry['wall_ms']}ms exceeds {args.max_wall_ms}ms")
+        if args.max_peak_mb is not None and entry["peak_mb"] > args.max_peak_mb:
+            violations.append(f"invocation {entry['invocation']}: peak {entry['peak_mb']}MB exceeds {args.max_peak_mb}MB")
+    return violations
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run(args)
+    violations = check_budgets(args, report)
+    report["violations"] = violations
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print(f"estate: {args.instances} EC2, {args.dbs} RDS, {args.schedules} schedules")
+        print(f"init: {report['init']['import_ms']}ms cold import")
+        for entry in report["runs"]:
+            print(f"#{entry['invocation']}: {entry['wall_ms']}ms, peak {entry['peak_mb']}MB, {entry['api_calls']} API calls")
+            for op, count in entry["calls"].items():
+                print(f"    {op:<28} {count}")
+        for violation in violations:
+            print(f"BUDGET EXCEEDED: {violation}")
+
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,18 @@ module "dynamodb" {
   source     = "./modules/dynamodb"
   table_name = "${var.project_name}-table"
   config = var.config
+
+  state_cache = var.state_cache
 }
 module "iam_role" {
   source       = "./modules/iam_role"
   project_name = var.project_name
   table_arn    = module.dynamodb.table_arn
+
+  state_table_arn     = module.dynamodb.state_table_arn
+  cache_table_arn     = module.dynamodb.cache_table_arn
+  shard_count         = var.shard_count
+  assumable_role_arns = var.target_role_arns
 }
 
 module "lambda" {
@@ -14,6 +21,15 @@ module "lambda" {
   project_name = var.project_name
   role_arn     = module.iam_role.role_arn
   table_name   = module.dynamodb.table_name
+
+  state_table_name    = module.dynamodb.state_table_name
+  config_type_index   = module.dynamodb.type_index_name
+  target_regions      = var.target_regions
+  target_role_arns    = var.target_role_arns
+  state_cache         = var.state_cache
+  state_cache_table   = module.dynamodb.cache_table_name
+  state_cache_targets = var.state_cache_targets
+  shard_count         = var.shard_count
 }
 module "dashboard" {
   source          = "./modules/cloudwatch"
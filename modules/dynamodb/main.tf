@@ -7,6 +7,18 @@ resource "aws_dynamodb_table" "this" {
     name = "Name"
     type = "S"
   }
+
+  attribute {
+    name = "Type"
+    type = "S"
+  }
+
+  # Lets the scheduler load periods/schedules by Type without a full scan
+  global_secondary_index {
+    name            = "Type-index"
+    hash_key        = "Type"
+    projection_type = "ALL"
+  }
 }
 
 resource "aws_dynamodb_table_item" "config_item" {
@@ -32,3 +44,53 @@ resource "aws_dynamodb_table_item" "config_item" {
     Weekdays    = { S = var.config.weekdays }
   })
 }
+
+# Per-resource scheduler state (action ledger), keyed by EC2/RDS identifier
+resource "aws_dynamodb_table" "state" {
+  name         = "${var.table_name}-state"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "ResourceId"
+
+  attribute {
+    name = "ResourceId"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "ExpiresAt"
+    enabled        = true
+  }
+}
+
+# Version marker: the scheduler reloads its cached config when this changes.
+# Edits made to config items outside Terraform must also change Version;
+# without this item the scheduler reloads the config on every run.
+resource "aws_dynamodb_table_item" "config_version" {
+  table_name = aws_dynamodb_table.this.name
+  hash_key   = "Name"
+
+  item = jsonencode({
+    Name    = { S = "__config_version__" }
+    Type    = { S = "version" }
+    Version = { S = sha1(jsonencode(var.config)) }
+  })
+}
+
+# Optional event-fed EC2/RDS state cache, one partition per "account/region"
+resource "aws_dynamodb_table" "cache" {
+  count        = var.state_cache ? 1 : 0
+  name         = "${var.table_name}-cache"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "Target"
+  range_key    = "ResourceId"
+
+  attribute {
+    name = "Target"
+    type = "S"
+  }
+
+  attribute {
+    name = "ResourceId"
+    type = "S"
+  }
+}
@@ -5,3 +5,23 @@ output "table_name" {
 output "table_arn" {
   value = aws_dynamodb_table.this.arn
 }
+
+output "type_index_name" {
+  value = "Type-index"
+}
+
+output "state_table_name" {
+  value = aws_dynamodb_table.state.name
+}
+
+output "state_table_arn" {
+  value = aws_dynamodb_table.state.arn
+}
+
+output "cache_table_name" {
+  value = var.state_cache ? aws_dynamodb_table.cache[0].name : ""
+}
+
+output "cache_table_arn" {
+  value = var.state_cache ? aws_dynamodb_table.cache[0].arn : ""
+}
@@ -19,3 +19,9 @@ variable "config" {
     use_metrics = optional(bool)
   })
 }
+
+variable "state_cache" {
+  description = "Create the state cache table fed by EC2/RDS state-change events"
+  type        = bool
+  default     = false
+}
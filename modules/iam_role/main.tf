@@ -23,15 +23,31 @@ resource "aws_iam_policy" "custom" {
   name = "${var.project_name}-policy"
   policy = jsonencode({
     Version = "2012-10-17"
-    Statement = [
-      # DynamoDB table access 
+    Statement = concat([
+      # DynamoDB table access (config, run state and run leases)
       {
         Effect = "Allow"
         Action = [
           "dynamodb:Scan",
-          "dynamodb:GetItem"
+          "dynamodb:Query",
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:BatchGetItem"
         ]
-        Resource = var.table_arn
+        Resource = [var.table_arn, "${var.table_arn}/index/*"]
+      },
+      # Scheduler state table (action ledger)
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem"
+        ]
+        Resource = var.state_table_arn
       },
       # EC2 control
       {
@@ -62,7 +78,38 @@ resource "aws_iam_policy" "custom" {
         ]
         Resource = "*"
       }
-    ]
+    ],
+    # Sharded runs: the coordinator invokes this same function per shard
+    [
+      for _ in (var.shard_count > 1 ? [1] : []) : {
+        Effect   = "Allow"
+        Action   = ["lambda:InvokeFunction"]
+        Resource = "arn:aws:lambda:*:*:function:${var.project_name}-function"
+      }
+    ],
+    # Event-fed state cache
+    [
+      for _ in (var.cache_table_arn != "" ? [1] : []) : {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:Query",
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:BatchWriteItem"
+        ]
+        Resource = var.cache_table_arn
+      }
+    ],
+    # Cross-account targets
+    [
+      for _ in (length(var.assumable_role_arns) > 0 ? [1] : []) : {
+        Effect   = "Allow"
+        Action   = ["sts:AssumeRole"]
+        Resource = var.assumable_role_arns
+      }
+    ])
   })
 }
 
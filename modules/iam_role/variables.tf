@@ -5,3 +5,25 @@ variable "project_name" {
 variable "table_arn" {
   type = string
 }
+
+variable "state_table_arn" {
+  type = string
+}
+
+variable "assumable_role_arns" {
+  description = "Cross-account roles the scheduler may assume"
+  type        = list(string)
+  default     = []
+}
+
+variable "cache_table_arn" {
+  description = "State cache table (empty = state cache disabled)"
+  type        = string
+  default     = ""
+}
+
+variable "shard_count" {
+  description = "Schedule shards per run; above 1 the function may invoke itself"
+  type        = number
+  default     = 1
+}
@@ -0,0 +1,342 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.retries.standard import ThrottledRetryableChecker
+from inventory import Ec2Record, RdsRecord
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Max instance IDs per StartInstances/StopInstances call
+EC2_BATCH_SIZE = int(os.environ.get("EC2_BATCH_SIZE", "50"))
+
+# Error codes that apply to the whole request rather than to a single instance:
+# throttling as botocore's retry modes know it across services (EC2, RDS, and
+# DynamoDB's ProvisionedThroughputExceededException for the config/state tables)
+THROTTLE_CODES = set(getattr(ThrottledRetryableChecker, "_THROTTLED_ERROR_CODES", ())) | {
+    "RequestLimitExceeded",
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+}
+
+# Errors after which an action is deferred to the next run instead of failed
+# ("CircuitOpen" = call not sent by resilience.py while the API keeps throttling,
+# "DispatchBudget" = part of a split batch not sent before the dispatch deadline)
+DEFER_CODES = THROTTLE_CODES | {"CircuitOpen", "DispatchBudget"}
+
+# Start/stop calls per second per service and target (token bucket; 0 = unlimited)
+EC2_CALLS_PER_SECOND = float(os.environ.get("EC2_CALLS_PER_SECOND", "5"))
+RDS_CALLS_PER_SECOND = float(os.environ.get("RDS_CALLS_PER_SECOND", "2"))
+
+# Calls a bucket may send back to back after being idle
+CALL_BURST = int(os.environ.get("CALL_BURST", "5"))
+
+# RDS start/stop calls in flight at once per target (1 = one after another).
+# RDS has no batch API: with several DBs per wave they go out in parallel,
+# still paced by the target's token bucket.
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "8"))
+
+# Seconds one invocation may spend sending actions; the rest is deferred to the next run
+DISPATCH_BUDGET_SECONDS = float(os.environ.get("DISPATCH_BUDGET_SECONDS", "30"))
+
+# Pause between priority waves, e.g. to let databases come up before app servers
+WAVE_INTERVAL_SECONDS = float(os.environ.get("WAVE_INTERVAL_SECONDS", "0"))
+
+# Priority of resources whose schedule and tags set none (lower starts first, stops last)
+DEFAULT_PRIORITY = 100
+
+# Token buckets per (target key, service), kept across warm invocations
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def error_code(e: Exception):
+    return getattr(e, "response", {}).get("Error", {}).get("Code")
+
+
+def defer_reason(code: str) -> str:
+    if code == "DispatchBudget":
+        return "dispatch budget"
+    return "circuit open" if code == "CircuitOpen" else "throttled"
+
+
+class OutOfTime(Exception):
+    """
+    Raised by a paced call whose token would only come after the deadline.
+    """
+
+    response = {"Error": {"Code": "DispatchBudget", "Message": "dispatch budget spent"}}
+
+
+def parse_priority(value, default: int = DEFAULT_PRIORITY) -> int:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return default
+
+
+# ================================
+# 🔹 RATE LIMITING
+# ================================
+class TokenBucket:
+    """
+    Paces calls to `rate` per second with bursts of up to `burst`.
+    Callers reserve a token, then sleep until it is due.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: float = None) -> bool:
+        """
+        Wait for one token. Returns False, without waiting or consuming a
+        token, if it would only become available after deadline (monotonic).
+        """
+        if self.rate <= 0:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            self.tokens -= 1
+
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+
+def get_bucket(target_key, service: str) -> TokenBucket:
+    key = (target_key, service)
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            rate = EC2_CALLS_PER_SECOND if service == "ec2" else RDS_CALLS_PER_SECOND
+            bucket = _buckets[key] = TokenBucket(rate, CALL_BURST)
+        return bucket
+
+
+# ================================
+# 🔹 ACTION PLAN
+# ================================
+class ActionPlan:
+    """
+    Collects every EC2 and RDS start/stop of one target for one invocation,
+    then sends them in priority waves: starts by ascending Priority, stops
+    by descending Priority (dependents stop first). EC2 goes out in batched
+    calls and RDS one call per DB on up to MAX_WORKERS threads, each service
+    paced by its token bucket. Actions that do not fit before the deadline
+    are deferred, not failed.
+    """
+
+    # EC2 call, extra kwargs and resulting state per action
+    EC2_ACTIONS = {
+        "start": ("start_instances", {}, "pending"),
+        "stop": ("stop_instances", {}, "stopping"),
+        "hibernate": ("stop_instances", {"Hibernate": True}, "stopping"),
+    }
+    RDS_ACTIONS = {
+        "start": ("start_db_instance", "starting"),
+        "stop": ("stop_db_instance", "stopping"),
+    }
+
+    def __init__(self):
+        self.ec2 = {}       # (action, priority) -> {instance_id: Ec2Record}
+        self.rds = {}       # (action, priority) -> {db_id: RdsRecord}
+        self.failed = {}    # resource id -> error
+        self.deferred = {}  # resource id -> action left for the next run
+        self.deferred_reasons = {}  # resource id -> why it was deferred
+        self.done = {}      # resource id -> (ledger key, action)
+        self._lock = threading.Lock()
+
+    def start_ec2(self, instance: Ec2Record, priority: int = DEFAULT_PRIORITY):
+        with self._lock:
+            self.ec2.setdefault(("start", priority), {})[instance.instance_id] = instance
+
+    def stop_ec2(self, instance: Ec2Record, hibernate: bool, priority: int = DEFAULT_PRIORITY):
+        action = "hibernate" if hibernate else "stop"
+        with self._lock:
+            self.ec2.setdefault((action, priority), {})[instance.instance_id] = instance
+
+    def start_rds(self, db: RdsRecord, priority: int = DEFAULT_PRIORITY):
+        with self._lock:
+            self.rds.setdefault(("start", priority), {})[db.identifier] = db
+
+    def stop_rds(self, db: RdsRecord, priority: int = DEFAULT_PRIORITY):
+        with self._lock:
+            self.rds.setdefault(("stop", priority), {})[db.identifier] = db
+
+    def is_empty(self) -> bool:
+        return not (self.ec2 or self.rds)
+
+    def waves(self) -> list:
+        """
+        [(direction, priority)] in send order: start waves, then stop waves.
+        """
+        keys = set(self.ec2) | set(self.rds)
+        starts = sorted({p for a, p in keys if a == "start"})
+        stops = sorted({p for a, p in keys if a != "start"}, reverse=True)
+        return [("start", p) for p in starts] + [("stop", p) for p in stops]
+
+    def execute(self, ec2_client, rds_client=None, target_key=None, deadline: float = None,
+                batch_size: int = None) -> dict:
+        """
+        Send all planned actions. Returns {resource_id: error} for the
+        resources that could not be actioned; see also deferred and done.
+        """
+        size = batch_size or EC2_BATCH_SIZE
+        ec2_bucket = get_bucket(target_key, "ec2")
+        rds_bucket = get_bucket(target_key, "rds")
+        out_of_time = threading.Event()
+
+        for n, (direction, priority) in enumerate(self.waves()):
+            if n and WAVE_INTERVAL_SECONDS > 0 and not out_of_time.is_set():
+                if deadline is not None and time.monotonic() + WAVE_INTERVAL_SECONDS > deadline:
+                    out_of_time.set()
+                else:
+                    time.sleep(WAVE_INTERVAL_SECONDS)
+
+            actions = ("start",) if direction == "start" else ("stop", "hibernate")
+
+            # ===== EC2: batched calls =====
+            for action in actions:
+                records = self.ec2.get((action, priority), {})
+                method, kwargs, new_state = self.EC2_ACTIONS[action]
+                ids = sorted(records)
+                for i in range(0, len(ids), size):
+                    batch = ids[i:i + size]
+                    if out_of_time.is_set() or not ec2_bucket.acquire(deadline):
+                        out_of_time.set()
+                        self.defer(batch, action, "dispatch budget")
+                        continue
+                    call = paced(getattr(ec2_client, method), ec2_bucket, deadline)
+                    throttled = {}
+                    for instance_id in run_batch(call, batch, kwargs, self.failed, throttled):
+                        records[instance_id].state = new_state
+                        self.done[instance_id] = (instance_id, "start" if action == "start" else "stop")
+                    for code in set(throttled.values()):
+                        self.defer([i for i, c in throttled.items() if c == code], action, defer_reason(code))
+                    if "DispatchBudget" in throttled.values():
+                        out_of_time.set()
+
+            # ===== RDS: no batch API, one call per DB on a bounded pool =====
+            rds_action = "start" if direction == "start" else "stop"
+            records = self.rds.get((rds_action, priority), {})
+            if not records:
+                continue
+            method, new_state = self.RDS_ACTIONS[rds_action]
+            call = getattr(rds_client, method)
+
+            def send(db_id):
+                self.send_rds(call, records[db_id], rds_action, new_state, rds_bucket, deadline, out_of_time)
+
+            ids = sorted(records)
+            workers = max(1, min(MAX_WORKERS, len(ids)))
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    list(pool.map(send, ids))
+            else:
+                for db_id in ids:
+                    send(db_id)
+
+        if self.failed:
+            logger.error(f"[Control] {len(self.failed)} actions failed: {sorted(self.failed)}")
+        if self.deferred:
+            reasons = {}
+            for reason in self.deferred_reasons.values():
+                reasons[reason] = reasons.get(reason, 0) + 1
+            logger.warning(f"[Control] {len(self.deferred)} actions deferred to the next run: {reasons}")
+        return self.failed
+
+    def send_rds(self, call, db: RdsRecord, action: str, new_state: str, bucket: TokenBucket,
+                 deadline: float, out_of_time: threading.Event):
+        """
+        One paced RDS start/stop. Safe to run from dispatch threads; once a
+        token would come after the deadline, this and every later DB of the
+        plan are deferred.
+        """
+        db_id = db.identifier
+        if out_of_time.is_set() or not bucket.acquire(deadline):
+            out_of_time.set()
+            self.defer([db_id], action, "dispatch budget")
+            return
+        try:
+            call(DBInstanceIdentifier=db_id)
+        except Exception as e:
+            if error_code(e) in DEFER_CODES:
+                self.defer([db_id], action, defer_reason(error_code(e)))
+            else:
+                with self._lock:
+                    self.failed[db_id] = str(e)
+            return
+        with self._lock:
+            db.status = new_state
+            self.done[db_id] = (db.arn, action)
+
+    def defer(self, resource_ids, action: str, reason: str):
+        with self._lock:
+            for resource_id in resource_ids:
+                self.deferred[resource_id] = action
+                self.deferred_reasons[resource_id] = reason
+
+
+def paced(call, bucket: TokenBucket, deadline: float = None):
+    """
+    Wrap call so every call after the first (already paid for by the caller)
+    takes a token: a batch split by run_batch is paced like any other call.
+    A token only due after the deadline raises OutOfTime, so the rest of the
+    split is deferred.
+    """
+    state = {"paid": True}
+
+    def wrapper(**kwargs):
+        if state["paid"]:
+            state["paid"] = False
+        elif not bucket.acquire(deadline):
+            raise OutOfTime()
+        return call(**kwargs)
+    return wrapper
+
+
+def run_batch(call, ids: list, kwargs: dict, failed: dict, deferred: dict = None) -> list:
+    """
+    Issue one batched call. On failure split the batch in halves until the
+    offending IDs are isolated, so the rest of the batch still completes.
+    Throttling is not instance-specific, so it fails the batch without
+    splitting; when `deferred` is given, throttled IDs go there (id -> code) instead.
+    """
+    try:
+        call(InstanceIds=ids, **kwargs)
+        return ids
+    except Exception as e:
+        code = error_code(e)
+        if deferred is not None and code in DEFER_CODES:
+            for instance_id in ids:
+                deferred[instance_id] = code
+            return []
+        if len(ids) == 1 or code in THROTTLE_CODES:
+            for instance_id in ids:
+                failed[instance_id] = str(e)
+            return []
+
+    mid = len(ids) // 2
+    return (run_batch(call, ids[:mid], kwargs, failed, deferred)
+            + run_batch(call, ids[mid:], kwargs, failed, deferred))
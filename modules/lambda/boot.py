@@ -0,0 +1,151 @@
+import logging
+import os
+import threading
+from reconcile import RUN_INTERVAL_SECONDS, STATE_TABLE_NAME, STUCK_AFTER_SECONDS
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Start resources at most this long before BeginTime (0 = never early); a schedule's
+# PrewarmMinutes overrides it, so by default only schedules that set it start early
+PREWARM_MAX_MINUTES = int(os.environ.get("PREWARM_MAX_MINUTES", "0"))
+
+# Rolling window of boot times kept per instance class, and the percentile used as the estimate
+BOOT_SAMPLES = 20
+BOOT_PERCENTILE = 90
+
+# Key prefix separating boot samples from ledger items in the state table
+KEY_PREFIX = "boot#"
+LAST_RUN_KEY = KEY_PREFIX + "__last_run__"
+
+
+def class_key(kind: str, resource_class: str) -> str:
+    return f"{KEY_PREFIX}{kind}#{resource_class}"
+
+
+def prewarm_cap_seconds(sched: dict) -> int:
+    """
+    Longest early start allowed for one schedule: its PrewarmMinutes, else
+    PREWARM_MAX_MINUTES. 0 turns pre-warming off.
+    """
+    value = sched.get("PrewarmMinutes")
+    try:
+        minutes = PREWARM_MAX_MINUTES if value is None else int(value)
+    except (TypeError, ValueError):
+        logger.warning(f"[Boot] Invalid PrewarmMinutes {value!r} on schedule {sched.get('Name', 'UNKNOWN')}, using {PREWARM_MAX_MINUTES}")
+        minutes = PREWARM_MAX_MINUTES
+    return max(0, minutes) * 60
+
+
+# ================================
+# 🔹 BOOT LATENCY
+# ================================
+class BootLatency:
+    """
+    Observed time from our start action to running/available, per instance
+    class. Runs are minutes apart, so one sample is the midpoint between the
+    previous run (which still saw the resource booting) and the run that
+    sees it up. The estimate is a high percentile of the last BOOT_SAMPLES
+    samples; windows and the previous-run marker are read once per run and
+    written back with a batched writer.
+    """
+
+    def __init__(self, now_epoch: int, dynamodb=None, table_name: str = None, last_run_key: str = None):
+        self.now = now_epoch
+        self.dynamodb = dynamodb
+        self.table_name = STATE_TABLE_NAME if table_name is None else table_name
+        # Each shard of a sharded run keeps its own previous-run time
+        self.last_run_key = last_run_key or LAST_RUN_KEY
+        self.previous_run = None
+        self.samples = {}  # (kind, class) -> [seconds], oldest first
+        self.changed = set()
+        self._lock = threading.Lock()
+
+    def load(self, classes: set):
+        """
+        Read the sample windows of the given (kind, class) pairs and the
+        previous-run marker, in batches.
+        """
+        if not self.dynamodb or not self.table_name:
+            return
+        keys = [class_key(kind, cls) for kind, cls in sorted(classes)] + [self.last_run_key]
+        try:
+            for i in range(0, len(keys), 100):
+                request = {self.table_name: {"Keys": [{"ResourceId": k} for k in keys[i:i + 100]]}}
+                while request:
+                    resp = self.dynamodb.batch_get_item(RequestItems=request)
+                    for item in resp["Responses"].get(self.table_name, []):
+                        if item["ResourceId"] == self.last_run_key:
+                            self.previous_run = int(item["Since"])
+                        elif "Samples" in item:
+                            _, kind, cls = item["ResourceId"].split("#", 2)
+                            self.samples[(kind, cls)] = [int(s) for s in item["Samples"]]
+                    request = resp.get("UnprocessedKeys")
+        except Exception as e:
+            logger.error(f"[Boot] Failed to load boot latency samples: {e}")
+
+    def observe(self, kind: str, resource_class: str, issued_at: int):
+        """
+        Record one boot: the resource is up now and was started at issued_at.
+        Left out when no run saw it booting in between or it took so long it
+        was stuck rather than booting.
+        """
+        if self.previous_run is None or self.previous_run < issued_at:
+            return
+        upper = self.now - issued_at
+        if upper > STUCK_AFTER_SECONDS:
+            return
+        sample = (self.previous_run - issued_at + upper) // 2
+        with self._lock:
+            window = self.samples.setdefault((kind, resource_class), [])
+            window.append(sample)
+            del window[:-BOOT_SAMPLES]
+            self.changed.add((kind, resource_class))
+
+    def estimate(self, kind: str, resource_class: str):
+        """
+        Seconds a resource of this class takes to boot, or None before any sample.
+        """
+        window = self.samples.get((kind, resource_class))
+        if not window:
+            return None
+        ordered = sorted(window)
+        rank = max(1, -(-BOOT_PERCENTILE * len(ordered) // 100))
+        return ordered[rank - 1]
+
+    def lead_seconds(self, kind: str, resource_class: str, cap_seconds: int) -> int:
+        """
+        How long before BeginTime to start a resource of this class.
+        """
+        estimate = self.estimate(kind, resource_class)
+        if estimate is None or cap_seconds <= 0:
+            return 0
+        # Runs are RUN_INTERVAL_SECONDS apart: go out one run ahead so the resource is up in time
+        return min(estimate + RUN_INTERVAL_SECONDS, cap_seconds)
+
+    def max_lead(self, cap_seconds: int) -> int:
+        """
+        Longest lead across every known class, for the next-run estimate.
+        """
+        return max((self.lead_seconds(k, c, cap_seconds) for k, c in self.samples), default=0)
+
+    def flush(self):
+        """
+        Persist the windows that got new samples, and this run as the previous one.
+        """
+        if not self.dynamodb or not self.table_name:
+            return
+        try:
+            with self.dynamodb.Table(self.table_name).batch_writer() as batch:
+                for kind, cls in self.changed:
+                    batch.put_item(Item={"ResourceId": class_key(kind, cls), "Samples": self.samples[(kind, cls)]})
+                batch.put_item(Item={"ResourceId": self.last_run_key, "Since": self.now})
+        except Exception as e:
+            logger.error(f"[Boot] Failed to save boot latency samples: {e}")
+
+    def summary(self) -> dict:
+        return {f"{k}/{c}": self.estimate(k, c) for k, c in sorted(self.samples)}
@@ -0,0 +1,116 @@
+import logging
+import os
+import time
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# GSI on "Type"; when unset, the table is scanned once and grouped by Type
+TYPE_INDEX_NAME = os.environ.get("CONFIG_TYPE_INDEX", "")
+
+# Max age of the warm-container config before a full reload
+CONFIG_TTL_SECONDS = int(os.environ.get("CONFIG_TTL_SECONDS", "900"))
+
+# Version marker: an item whose "Version" attribute changes whenever the config
+# is edited (Terraform sets it to a hash of the config). Whoever edits config
+# items outside Terraform must also write a new Version, or the edit is only
+# picked up once CONFIG_TTL_SECONDS have passed. Without a readable marker the
+# config is reloaded on every invocation.
+VERSION_ITEM_NAME = "__config_version__"
+
+# Schedule attributes stored as strings by Terraform ("true"/"false")
+BOOL_FIELDS = ("Hibernate", "UseMetric")
+
+# Warm-container config cache
+_config_cache = {"periods": None, "schedules": None, "version": None, "loaded_at": 0.0}
+
+
+def parse_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+# ================================
+# 🔹 READERS
+# ================================
+def query_type(table, item_type: str) -> list:
+    """
+    Fully paginated query of one item Type through the Type index.
+    """
+    items = []
+    kwargs = {
+        "IndexName": TYPE_INDEX_NAME,
+        "KeyConditionExpression": "#t = :t",
+        "ExpressionAttributeNames": {"#t": "Type"},
+        "ExpressionAttributeValues": {":t": item_type},
+    }
+    while True:
+        resp = table.query(**kwargs)
+        items.extend(resp["Items"])
+        if "LastEvaluatedKey" not in resp:
+            return items
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def scan_by_type(table) -> dict:
+    """
+    Fully paginated scan, indexing items by Type in the same pass.
+    """
+    by_type = {}
+    kwargs = {}
+    while True:
+        resp = table.scan(**kwargs)
+        for item in resp["Items"]:
+            by_type.setdefault(item.get("Type"), []).append(item)
+        if "LastEvaluatedKey" not in resp:
+            return by_type
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def read_version(table):
+    try:
+        item = table.get_item(Key={"Name": VERSION_ITEM_NAME}).get("Item")
+    except Exception as e:
+        logger.error(f"[Config] Failed to read version marker: {e}")
+        return None
+    return item.get("Version") if item else None
+
+
+# ================================
+# 🔹 LOADER
+# ================================
+def load_config(table, force: bool = False):
+    """
+    Return (periods, schedules), reusing the parsed config kept in the warm
+    container until the version marker changes or the TTL expires. A missing
+    or unreadable marker counts as a change.
+    """
+    now = time.monotonic()
+    version = read_version(table)
+    cached = _config_cache["schedules"] is not None
+    fresh = now - _config_cache["loaded_at"] < CONFIG_TTL_SECONDS
+    unchanged = version is not None and version == _config_cache["version"]
+
+    if cached and fresh and unchanged and not force:
+        logger.info(f"[Config] Reusing cached config (version {version})")
+        return _config_cache["periods"], _config_cache["schedules"]
+
+    if TYPE_INDEX_NAME:
+        by_type = {t: query_type(table, t) for t in ("period", "schedule")}
+    else:
+        by_type = scan_by_type(table)
+
+    periods = {i["Name"]: i for i in by_type.get("period", [])}
+    schedules = by_type.get("schedule", [])
+    for sched in schedules:
+        for field in BOOL_FIELDS:
+            sched[field] = parse_bool(sched.get(field, False))
+
+    _config_cache.update(periods=periods, schedules=schedules, version=version, loaded_at=now)
+    logger.info(f"[Config] Loaded {len(periods)} periods, {len(schedules)} schedules (version {version})")
+    return periods, schedules
@@ -1,5 +1,11 @@
-import boto3
 import logging
+import time
+from actions import DEFAULT_PRIORITY, ActionPlan, parse_priority
+from metrics import METRICS_SINK, get_sink
+from reconcile import Reconciler
+from savings import SavingsAccumulator
+from targets import Target, get_client
+from inventory import InventorySnapshot, load_ec2_inventory, load_rds_inventory
 
 
 # ================================
@@ -8,123 +14,123 @@ import logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Boto3 clients
-ec2 = boto3.client("ec2")
-rds = boto3.client("rds")
-cloudwatch = boto3.client("cloudwatch")
-
-# Tag key used for scheduler
-TAG_KEY = "ScheduleTag"
+# Boto3 clients are built on first use by targets.get_client (EC2/RDS per target, CloudWatch on publish)
 
 
 # ================================
-# 🔹 RDS HELPER FUNCTION
+# 🔹 INVENTORY
 # ================================
-def find_rds_by_tag(tag_value: str):
+def build_inventory(target: Target, tag_values: list = None) -> InventorySnapshot:
     """
-    Find RDS instances by ScheduleTag.
-    Since RDS does not support tag filters in describe_db_instances,
-    we must iterate through all instances and check their tags.
+    Build the per-invocation snapshot of every tagged resource in one target
+    (EC2 limited to tag_values when given).
     """
-    ids = []
-    try:
-        dbs = rds.describe_db_instances()["DBInstances"]
-        for db in dbs:
-            arn = db["DBInstanceArn"]
-            tags = rds.list_tags_for_resource(ResourceName=arn)["TagList"]
-            if any(t["Key"] == TAG_KEY and t["Value"] == tag_value for t in tags):
-                ids.append(db["DBInstanceIdentifier"])
-
-        if not ids:
-            logger.info(f"No RDS instances found for tag {tag_value}")
-    except Exception as e:
-        logger.error(f"[RDS] Failed to find instances by tag {tag_value}: {e}")
-
-    return ids
+    snapshot = InventorySnapshot()
+    load_ec2_inventory(target.client("ec2"), snapshot, tag_values)
+    load_rds_inventory(target.client("rds"), snapshot, cache_key=target.key)
+    return snapshot
 
 
 # ================================
 # 🔹 CONTROL FUNCTIONS
 # ================================
-def control_instance(tag_value: str, active: bool, hibernate: bool):
+def control_instance(tag_value: str, active: bool, hibernate: bool, snapshot: InventorySnapshot,
+                     plan: ActionPlan, reconciler: Reconciler, target: Target, priority: int = DEFAULT_PRIORITY,
+                     prewarm=None, schedule_name: str = None):
     """
-    Start/Stop EC2 & RDS according to schedule.
-    - Only log one summary line per schedule.
+    Start/Stop the EC2 & RDS resources of one ScheduleTag value according
+    to the state resolved across the schedules it lists.
+    - EC2/RDS state is read from the shared inventory snapshot.
+    - The reconciler decides whether each resource needs an action.
+    - prewarm(kind, resource_class), when given for an inactive schedule,
+      says whether a resource of that class must already start so it is up
+      by the next BeginTime.
+    - Actions are queued on the plan with the schedule's priority (or the
+      resource's Priority tag) and sent in rate-limited waves later.
+    Returns the queued IDs for the summary line of schedule_name (the
+    schedule that decided the state).
     """
-    started_ec2, stopped_ec2 = [], []
-    started_rds, stopped_rds = [], []
+    result = {"name": schedule_name or tag_value, "active": active, "ec2": [], "rds": [], "early": []}
 
     # ==== EC2 ====
     try:
-        resp = ec2.describe_instances(
-            Filters=[{"Name": f"tag:{TAG_KEY}", "Values": [tag_value]}]
-        )
-        instances = [i for r in resp["Reservations"] for i in r["Instances"]]
-
-        for instance in instances:
-            instance_id = instance["InstanceId"]
-            state = instance["State"]["Name"]
-
-            if active and state == "stopped":
-                ec2.start_instances(InstanceIds=[instance_id])
-                started_ec2.append(instance_id)
-            elif not active and state == "running":
-                if hibernate:
-                    ec2.stop_instances(InstanceIds=[instance_id], Hibernate=True)
-                else:
-                    ec2.stop_instances(InstanceIds=[instance_id])
-                stopped_ec2.append(instance_id)
+        for instance in snapshot.ec2_group(tag_value):
+            inst_type = instance.instance_type
+            want = active or (prewarm is not None and prewarm("ec2", inst_type))
+            action = reconciler.decide("ec2", instance.instance_id, instance.state, want, inst_type)
+            level = parse_priority(instance.priority, priority)
+
+            if action == "start":
+                plan.start_ec2(instance, level)
+                result["ec2"].append(instance.instance_id)
+                if not active:
+                    result["early"].append(instance.instance_id)
+            elif action == "stop":
+                plan.stop_ec2(instance, hibernate, level)
+                result["ec2"].append(instance.instance_id)
     except Exception as e:
         logger.error(f"[EC2] Failed to enforce for tag {tag_value}: {e}")
 
     # ==== RDS ====
     try:
-        rds_ids = find_rds_by_tag(tag_value)
-        for db_id in rds_ids:
-            db = rds.describe_db_instances(DBInstanceIdentifier=db_id)["DBInstances"][0]
-            status = db["DBInstanceStatus"]
-
-            if active and status == "stopped":
-                rds.start_db_instance(DBInstanceIdentifier=db_id)
-                started_rds.append(db_id)
-            elif not active and status == "available":
-                rds.stop_db_instance(DBInstanceIdentifier=db_id)
-                stopped_rds.append(db_id)
+        for db in snapshot.rds_group(tag_value):
+            want = active or (prewarm is not None and prewarm("rds", db.db_class))
+            action = reconciler.decide("rds", db.arn, db.status, want, db.db_class)
+            level = parse_priority(db.priority, priority)
+
+            if action == "start":
+                plan.start_rds(db, level)
+                result["rds"].append(db.identifier)
+                if not active:
+                    result["early"].append(db.identifier)
+            elif action == "stop":
+                plan.stop_rds(db, level)
+                result["rds"].append(db.identifier)
     except Exception as e:
         logger.error(f"[RDS] Failed to enforce for tag {tag_value}: {e}")
 
-    # ==== Log only once per schedule ====
-    if active:
-        if started_ec2 or started_rds:
-            logger.info(
-                f"Schedule {tag_value} STARTED "
-                f"EC2={started_ec2 if started_ec2 else '[]'}, "
-                f"RDS={started_rds if started_rds else '[]'}"
-            )
-    else:
-        if stopped_ec2 or stopped_rds:
-            logger.info(
-                f"Schedule {tag_value} STOPPED "
-                f"EC2={stopped_ec2 if stopped_ec2 else '[]'}, "
-                f"RDS={stopped_rds if stopped_rds else '[]'}"
-            )
+    return result
+
+
+def execute_plan(plan: ActionPlan, target: Target, deadline: float = None) -> dict:
+    """
+    Send the EC2 and RDS actions collected across all schedules of one target.
+    """
+    if plan.is_empty():
+        return {}
+    ec2 = target.client("ec2") if plan.ec2 else None
+    rds = target.client("rds") if plan.rds else None
+    return plan.execute(ec2, rds, target.key, deadline)
+
+
+def log_control_summary(result: dict, failed: dict):
+    """
+    Log only once per schedule, leaving out actions that failed or were deferred.
+    """
+    early = [i for i in result.get("early", []) if i not in failed]
+    if early:
+        logger.info(f"Schedule {result['name']} PRE-WARMED {early} ahead of its next window")
+
+    ec2_ids = [i for i in result["ec2"] if i not in failed and i not in early]
+    rds_ids = [i for i in result["rds"] if i not in failed and i not in early]
+    if not ec2_ids and not rds_ids:
+        return
+
+    action = "STARTED" if result["active"] else "STOPPED"
+    logger.info(
+        f"Schedule {result['name']} {action} "
+        f"EC2={ec2_ids if ec2_ids else '[]'}, "
+        f"RDS={rds_ids if rds_ids else '[]'}"
+    )
 
 
 # ================================
 # 🔹 METRICS FUNCTIONS
 # ================================
-def collect_ec2_metrics(schedule_name: str):
-    try:
-        resp = ec2.describe_instances(
-            Filters=[{"Name": f"tag:{TAG_KEY}", "Values": [schedule_name]}]
-        )
-        instances = [i for r in resp["Reservations"] for i in r["Instances"]]
-
-        if not instances:
-            logger.info(f"No EC2 instances found for schedule {schedule_name}")
-            return 0, 0, {}, {}
-    except Exception as e:
-        logger.error(f"[EC2] Failed to collect metrics for {schedule_name}: {e}")
+def collect_ec2_metrics(schedule_name: str, snapshot: InventorySnapshot):
+    instances = snapshot.ec2_instances(schedule_name)
+    if not instances:
+        logger.info(f"No EC2 instances found for schedule {schedule_name}")
         return 0, 0, {}, {}
 
     running_count = 0
@@ -132,8 +138,8 @@ def collect_ec2_metrics(schedule_name: str):
     running_type_count = {}
 
     for instance in instances:
-        state = instance["State"]["Name"]
-        inst_type = instance["InstanceType"]
+        state = instance.state
+        inst_type = instance.instance_type
 
         type_count[inst_type] = type_count.get(inst_type, 0) + 1
         if state == "running":
@@ -144,103 +150,107 @@ def collect_ec2_metrics(schedule_name: str):
     return managed_count, running_count, type_count, running_type_count
 
 
-def collect_rds_metrics(schedule_name: str):
-    try:
-        rds_ids = find_rds_by_tag(schedule_name)
-        return len(rds_ids)
-    except Exception as e:
-        logger.error(f"[RDS] Failed to collect metrics for {schedule_name}: {e}")
-        return 0
+def collect_estate_counts(estate: InventorySnapshot):
+    """
+    Managed/running counts by type over every resource of the estate,
+    each counted once however many schedules it is in.
+    """
+    ec2_type_count = {}
+    ec2_running_type_count = {}
+    rds_type_count = {}
 
+    for tag_value in estate.groups():
+        for instance in estate.ec2_group(tag_value):
+            inst_type = instance.instance_type
+            ec2_type_count[inst_type] = ec2_type_count.get(inst_type, 0) + 1
+            if instance.state == "running":
+                ec2_running_type_count[inst_type] = ec2_running_type_count.get(inst_type, 0) + 1
+        for db in estate.rds_group(tag_value):
+            inst_type = db.db_class
+            rds_type_count[inst_type] = rds_type_count.get(inst_type, 0) + 1
 
-def collect_rds_type_metrics(schedule_name: str):
-    type_count = {}
-    try:
-        rds_ids = find_rds_by_tag(schedule_name)
-        if not rds_ids:
-            logger.info(f"No RDS instances found for schedule {schedule_name}")
-        for db_id in rds_ids:
-            db = rds.describe_db_instances(DBInstanceIdentifier=db_id)["DBInstances"][0]
-            inst_type = db["DBInstanceClass"]
-            type_count[inst_type] = type_count.get(inst_type, 0) + 1
-    except Exception as e:
-        logger.error(f"[RDS] Failed to collect type metrics for {schedule_name}: {e}")
-    return type_count
+    return ec2_type_count, ec2_running_type_count, rds_type_count
 
 
-def collect_saved_hours(schedules: list, interval_minutes=5):
+def collect_saved_hours(estate: InventorySnapshot, savings: SavingsAccumulator):
+    """
+    Hours each stopped resource actually spent stopped since the previous run,
+    from the per-resource state kept by the savings accumulator.
+    """
+    groups = estate.groups()
     hours_saved_ec2_total = 0
     hours_saved_ec2_type = {}
     hours_saved_rds_total = 0
     hours_saved_rds_type = {}
 
-    saved_per_instance = interval_minutes / 60.0
-
-    for sched in schedules:
-        sched_name = sched["Name"]
+    savings.load(
+        [i.instance_id for v in groups for i in estate.ec2_group(v)]
+        + [d.arn for v in groups for d in estate.rds_group(v)]
+    )
 
+    for tag_value in groups:
         # ==== EC2 ====
         try:
-            resp = ec2.describe_instances(
-                Filters=[{"Name": f"tag:{TAG_KEY}", "Values": [sched_name]}]
-            )
-            instances = [i for r in resp["Reservations"] for i in r["Instances"]]
-            for instance in instances:
-                state = instance["State"]["Name"]
-                inst_type = instance["InstanceType"]
-                if state == "stopped":
-                    hours_saved_ec2_total += saved_per_instance
-                    hours_saved_ec2_type[inst_type] = hours_saved_ec2_type.get(inst_type, 0) + saved_per_instance
+            for instance in estate.ec2_group(tag_value):
+                stopped = instance.state == "stopped"
+                inst_type = instance.instance_type
+                saved = savings.observe(instance.instance_id, stopped, instance.stopped_at)
+                if stopped:
+                    hours_saved_ec2_total += saved
+                    hours_saved_ec2_type[inst_type] = hours_saved_ec2_type.get(inst_type, 0) + saved
         except Exception as e:
-            logger.error(f"[EC2] Failed to calculate saved hours for {sched_name}: {e}")
+            logger.error(f"[EC2] Failed to calculate saved hours for tag {tag_value}: {e}")
 
         # ==== RDS ====
         try:
-            rds_ids = find_rds_by_tag(sched_name)
-            for db_id in rds_ids:
-                db = rds.describe_db_instances(DBInstanceIdentifier=db_id)["DBInstances"][0]
-                status = db["DBInstanceStatus"]
-                inst_type = db["DBInstanceClass"]
-                if status == "stopped":
-                    hours_saved_rds_total += saved_per_instance
-                    hours_saved_rds_type[inst_type] = hours_saved_rds_type.get(inst_type, 0) + saved_per_instance
+            for db in estate.rds_group(tag_value):
+                stopped = db.status == "stopped"
+                inst_type = db.db_class
+                saved = savings.observe(db.arn, stopped)
+                if stopped:
+                    hours_saved_rds_total += saved
+                    hours_saved_rds_type[inst_type] = hours_saved_rds_type.get(inst_type, 0) + saved
         except Exception as e:
-            logger.error(f"[RDS] Failed to calculate saved hours for {sched_name}: {e}")
+            logger.error(f"[RDS] Failed to calculate saved hours for tag {tag_value}: {e}")
 
+    savings.flush()
     return hours_saved_ec2_total, hours_saved_ec2_type, hours_saved_rds_total, hours_saved_rds_type
 
 
-def collect_and_publish_all_metrics(schedules: list):
-    total_managed = 0
-    global_type_count = {}
-    global_running_type_count = {}
+def collect_and_publish_all_metrics(schedules: list, snapshot: InventorySnapshot, convergence: dict = None,
+                                    savings: SavingsAccumulator = None, extra_metrics: list = None,
+                                    estate: InventorySnapshot = None):
+    metric_data = collect_all_metrics(schedules, snapshot, convergence, savings, estate)
+    metric_data.extend(extra_metrics or [])
+    publish_metric_data(metric_data)
+
+
+def collect_all_metrics(schedules: list, snapshot: InventorySnapshot, convergence: dict = None,
+                        savings: SavingsAccumulator = None, estate: InventorySnapshot = None) -> list:
+    """
+    Metrics for the given schedules, in PutMetricData shape. Estate totals
+    and saved hours cover the resources in estate, by default every
+    resource whose ScheduleTag lists one of the schedules.
+    """
     schedule_stats = {}
     schedule_running_stats = {}
-    total_rds_managed = 0
-    global_rds_type_count = {}
 
     for sched in schedules:
         sched_name = sched["Name"]
-        managed_count, running_count, type_count, running_type_count = collect_ec2_metrics(sched_name)
-        rds_count = collect_rds_metrics(sched_name)
-        rds_type_count = collect_rds_type_metrics(sched_name)
-
-        total_managed += managed_count
-        total_rds_managed += rds_count
-
-        for inst_type, count in type_count.items():
-            global_type_count[inst_type] = global_type_count.get(inst_type, 0) + count
-
-        for inst_type, count in running_type_count.items():
-            global_running_type_count[inst_type] = global_running_type_count.get(inst_type, 0) + count
-
-        for inst_type, count in rds_type_count.items():
-            global_rds_type_count[inst_type] = global_rds_type_count.get(inst_type, 0) + count
-
+        managed_count, running_count, _, _ = collect_ec2_metrics(sched_name, snapshot)
         schedule_stats[sched_name] = managed_count
         schedule_running_stats[sched_name] = running_count
 
-    hours_saved_ec2_total, hours_saved_ec2_type, hours_saved_rds_total, hours_saved_rds_type = collect_saved_hours(schedules)
+    if estate is None:
+        index = snapshot.schedule_index()
+        estate = snapshot.select(v for s in schedules for v in index.get(s["Name"], []))
+    global_type_count, global_running_type_count, global_rds_type_count = collect_estate_counts(estate)
+    total_managed = sum(global_type_count.values())
+    total_rds_managed = sum(global_rds_type_count.values())
+
+    hours_saved_ec2_total, hours_saved_ec2_type, hours_saved_rds_total, hours_saved_rds_type = collect_saved_hours(
+        estate, savings or SavingsAccumulator(int(time.time()))
+    )
 
     # Build metric_data
     metric_data = []
@@ -314,7 +324,7 @@ def collect_and_publish_all_metrics(schedules: list):
         "MetricName": "SavedHours",
         "Dimensions": [{"Name": "ResourceType", "Value": "EC2"}],
         "Value": hours_saved_ec2_total,
-        "Unit": "Hours"
+        "Unit": "None"
     })
 
     # 8️⃣ Saved hours by EC2 InstanceType
@@ -326,7 +336,7 @@ def collect_and_publish_all_metrics(schedules: list):
                 {"Name": "InstanceType", "Value": inst_type}
             ],
             "Value": saved_hours,
-            "Unit": "Hours"
+            "Unit": "None"
         })
 
     # 9️⃣ Total saved hours for RDS
@@ -334,7 +344,7 @@ def collect_and_publish_all_metrics(schedules: list):
         "MetricName": "SavedHours",
         "Dimensions": [{"Name": "ResourceType", "Value": "RDS"}],
         "Value": hours_saved_rds_total,
-        "Unit": "Hours"
+        "Unit": "None"
     })
 
     # 🔟 Saved hours by RDS InstanceType
@@ -346,7 +356,7 @@ def collect_and_publish_all_metrics(schedules: list):
                 {"Name": "InstanceType", "Value": inst_type}
             ],
             "Value": saved_hours,
-            "Unit": "Hours"
+            "Unit": "None"
         })
 
     # 1️⃣1️⃣ Managed RDS count by InstanceType
@@ -361,12 +371,29 @@ def collect_and_publish_all_metrics(schedules: list):
             "Unit": "Count"
         })
 
-    # Publish to CloudWatch
+    # 1️⃣2️⃣ Convergence of the scheduler's own actions
+    if convergence is not None:
+        metric_data.append({
+            "MetricName": "ConvergingResources",
+            "Value": convergence["converging"],
+            "Unit": "Count"
+        })
+        metric_data.append({
+            "MetricName": "StuckResources",
+            "Value": len(convergence["stuck"]),
+            "Unit": "Count"
+        })
+
+    return metric_data
+
+
+def publish_metric_data(metric_data: list):
+    """
+    Publish through the configured sink (PutMetricData or EMF).
+    """
     try:
-        cloudwatch.put_metric_data(
-            Namespace="EC2RDS/Scheduler",
-            MetricData=metric_data
-        )
-        logger.info(f"Published {len(metric_data)} metrics to CloudWatch")
+        # The EMF sink only writes to stdout and needs no CloudWatch client
+        cloudwatch = get_client("cloudwatch") if METRICS_SINK != "emf" else None
+        get_sink(cloudwatch).publish(metric_data)
     except Exception as e:
         logger.error(f"[CloudWatch] Failed to publish metrics: {e}")
@@ -0,0 +1,326 @@
+import logging
+import os
+import re
+import sys
+import time
+from calendar import timegm
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Tag key used for scheduler
+TAG_KEY = "ScheduleTag"
+
+# A ScheduleTag may list several schedules, separated by commas or spaces
+# (RDS tag values cannot contain commas)
+TAG_SEPARATORS = re.compile(r"[,\s]+")
+
+# Optional per-resource tag overriding the schedule's Priority
+PRIORITY_TAG_KEY = "Priority"
+
+# Max values in one describe_instances filter
+MAX_FILTER_VALUES = 200
+
+# How long the RDS tag index may be reused by warm invocations (0 = rebuild every run)
+RDS_INDEX_TTL_SECONDS = int(os.environ.get("RDS_INDEX_TTL_SECONDS", "0"))
+
+# Warm-container cache for the RDS tag index, per target
+_rds_index_cache = {}
+
+# EC2 StateTransitionReason, e.g. "User initiated (2024-01-31 18:00:05 GMT)"
+TRANSITION_TIME = re.compile(r"\((\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2}) GMT\)")
+
+# Warm-container cache: ScheduleTag value -> schedule names it lists
+_tag_schedules = {}
+
+
+def tag_schedules(tag_value: str) -> tuple:
+    """
+    Schedule names listed by one ScheduleTag value, in tag order, without repeats.
+    """
+    names = _tag_schedules.get(tag_value)
+    if names is None:
+        names = tuple(dict.fromkeys(n for n in TAG_SEPARATORS.split(tag_value) if n))
+        _tag_schedules[tag_value] = names
+    return names
+
+
+# ================================
+# 🔹 RECORDS
+# ================================
+def intern(value):
+    """
+    One shared copy of strings repeated across the estate (types, classes),
+    passing None through.
+    """
+    return None if value is None else sys.intern(value)
+
+
+def transition_time(reason: str):
+    """
+    Epoch of the time in an EC2 StateTransitionReason, if present.
+    Parsed from the regex groups: strptime costs more than the rest of a record.
+    """
+    match = TRANSITION_TIME.search(reason or "")
+    if not match:
+        return None
+    return timegm(tuple(map(int, match.groups())))
+
+
+class Ec2Record:
+    """
+    The fields of a describe_instances entry the scheduler keeps. The state
+    is updated in place once an action has been sent.
+    """
+
+    __slots__ = ("instance_id", "tag", "state", "instance_type", "priority", "launched_at", "stopped_at")
+
+    def __init__(self, instance_id: str, tag: str, state: str, instance_type: str = None, priority: str = None,
+                 launched_at: int = None, stopped_at: int = None):
+        self.instance_id = instance_id
+        self.tag = sys.intern(tag)
+        self.state = sys.intern(state)
+        self.instance_type = intern(instance_type)
+        self.priority = priority
+        self.launched_at = launched_at
+        self.stopped_at = stopped_at
+
+
+class RdsRecord:
+    """
+    The fields of a describe_db_instances entry the scheduler keeps. The
+    status is updated in place once an action has been sent, so a cached
+    index hands each run copies (see load_rds_inventory).
+    """
+
+    __slots__ = ("identifier", "arn", "tag", "status", "db_class", "priority")
+
+    def __init__(self, identifier: str, arn: str, tag: str, status: str, db_class: str = None, priority: str = None):
+        self.identifier = identifier
+        self.arn = arn
+        self.tag = sys.intern(tag)
+        self.status = sys.intern(status)
+        self.db_class = intern(db_class)
+        self.priority = priority
+
+    def copy(self) -> "RdsRecord":
+        return RdsRecord(self.identifier, self.arn, self.tag, self.status, self.db_class, self.priority)
+
+
+def ec2_record(instance: dict):
+    """
+    Compact record of one describe_instances entry, or None without a ScheduleTag.
+    """
+    tag_value = None
+    priority = None
+    for tag in instance.get("Tags") or []:
+        if tag["Key"] == TAG_KEY:
+            tag_value = tag["Value"]
+        elif tag["Key"] == PRIORITY_TAG_KEY:
+            priority = tag["Value"]
+    if tag_value is None:
+        return None
+
+    state = instance["State"]["Name"]
+    launched = instance.get("LaunchTime")
+    return Ec2Record(
+        instance["InstanceId"],
+        tag_value,
+        state,
+        instance.get("InstanceType"),
+        priority,
+        int(launched.timestamp()) if launched is not None else None,
+        transition_time(instance.get("StateTransitionReason")) if state == "stopped" else None,
+    )
+
+
+def rds_record(db: dict):
+    """
+    Compact record of one describe_db_instances entry, or None without a ScheduleTag.
+    """
+    tag_value = None
+    priority = None
+    for tag in db.get("TagList") or []:
+        if tag["Key"] == TAG_KEY:
+            tag_value = tag["Value"]
+        elif tag["Key"] == PRIORITY_TAG_KEY:
+            priority = tag["Value"]
+    if tag_value is None:
+        return None
+    return RdsRecord(
+        db["DBInstanceIdentifier"],
+        db["DBInstanceArn"],
+        tag_value,
+        db["DBInstanceStatus"],
+        db.get("DBInstanceClass"),
+        priority,
+    )
+
+
+# ================================
+# 🔹 SNAPSHOT
+# ================================
+class InventorySnapshot:
+    """
+    In-memory view of every resource carrying the ScheduleTag key,
+    grouped by tag value: each resource is in exactly one group, and the
+    group's tag value lists its schedules (resource -> schedules). The
+    inverted index schedule -> groups is built in one pass over the groups
+    on first lookup by schedule. Built once per invocation and read by both
+    the control loop and the metrics stage.
+    """
+
+    def __init__(self):
+        self.ec2 = {}
+        self.rds = {}
+        self._index = None
+
+    def groups(self) -> list:
+        """
+        Every tag value with at least one EC2 or RDS resource.
+        """
+        return list(dict.fromkeys([*self.ec2, *self.rds]))
+
+    def schedule_index(self) -> dict:
+        if self._index is None:
+            index = {}
+            for tag_value in self.groups():
+                for name in tag_schedules(tag_value):
+                    index.setdefault(name, []).append(tag_value)
+            self._index = index
+        return self._index
+
+    def ec2_group(self, tag_value: str) -> list:
+        return self.ec2.get(tag_value, [])
+
+    def rds_group(self, tag_value: str) -> list:
+        return self.rds.get(tag_value, [])
+
+    def ec2_instances(self, schedule_name: str) -> list:
+        """
+        Every EC2 instance whose ScheduleTag lists the schedule.
+        """
+        tag_values = self.schedule_index().get(schedule_name, [])
+        if len(tag_values) == 1:
+            return self.ec2.get(tag_values[0], [])
+        return [i for v in tag_values for i in self.ec2.get(v, [])]
+
+    def rds_instances(self, schedule_name: str) -> list:
+        """
+        Every RDS instance whose ScheduleTag lists the schedule.
+        """
+        tag_values = self.schedule_index().get(schedule_name, [])
+        if len(tag_values) == 1:
+            return self.rds.get(tag_values[0], [])
+        return [d for v in tag_values for d in self.rds.get(v, [])]
+
+    def ec2_count(self) -> int:
+        return sum(len(instances) for instances in self.ec2.values())
+
+    def rds_count(self) -> int:
+        return sum(len(dbs) for dbs in self.rds.values())
+
+    def select(self, tag_values) -> "InventorySnapshot":
+        """
+        Snapshot of only the given tag values (lists shared, not copied).
+        """
+        subset = InventorySnapshot()
+        for tag_value in dict.fromkeys(tag_values):
+            if tag_value in self.ec2:
+                subset.ec2[tag_value] = self.ec2[tag_value]
+            if tag_value in self.rds:
+                subset.rds[tag_value] = self.rds[tag_value]
+        return subset
+
+    def merge(self, other: "InventorySnapshot"):
+        """
+        Fold another target's snapshot into this one (used for metrics).
+        """
+        for tag_value, instances in other.ec2.items():
+            self.ec2.setdefault(tag_value, []).extend(instances)
+        for tag_value, dbs in other.rds.items():
+            self.rds.setdefault(tag_value, []).extend(dbs)
+        self._index = None
+        return self
+
+
+# ================================
+# 🔹 LOADERS
+# ================================
+def load_ec2_inventory(ec2_client, snapshot: InventorySnapshot, tag_values: list = None):
+    """
+    Pull every instance carrying the ScheduleTag key in one paginated pass
+    and group them by tag value. Each page is turned into compact records
+    as it arrives, so only one page of boto3 response is held at a time. With tag_values (e.g. one shard's
+    schedules), only instances whose tag mentions one of them are returned;
+    the wildcard also matches tags listing several schedules, and the
+    occasional name that merely contains another is sorted out by the caller.
+    """
+    filters = [{"Name": "tag-key", "Values": [TAG_KEY]}]
+    if tag_values and len(tag_values) <= MAX_FILTER_VALUES:
+        filters = [{"Name": f"tag:{TAG_KEY}", "Values": sorted(f"*{v}*" for v in tag_values)}]
+
+    paginator = ec2_client.get_paginator("describe_instances")
+    pages = paginator.paginate(Filters=filters)
+
+    for page in pages:
+        for reservation in page["Reservations"]:
+            for instance in reservation["Instances"]:
+                record = ec2_record(instance)
+                if record is not None:
+                    snapshot.ec2.setdefault(record.tag, []).append(record)
+
+    logger.info(f"[Inventory] Loaded {snapshot.ec2_count()} EC2 instances across {len(snapshot.ec2)} tag values")
+    return snapshot
+
+
+def build_rds_index(rds_client) -> dict:
+    """
+    Map ScheduleTag value -> compact DB records in one paginated pass.
+    describe_db_instances already returns TagList, so no per-DB
+    list_tags_for_resource or describe calls are needed.
+    """
+    index = {}
+    paginator = rds_client.get_paginator("describe_db_instances")
+
+    for page in paginator.paginate():
+        for db in page["DBInstances"]:
+            record = rds_record(db)
+            if record is not None:
+                index.setdefault(record.tag, []).append(record)
+
+    return index
+
+
+def copy_rds_index(index: dict) -> dict:
+    return {tag_value: [db.copy() for db in dbs] for tag_value, dbs in index.items()}
+
+
+def load_rds_inventory(rds_client, snapshot: InventorySnapshot, ttl_seconds: int = None, cache_key=None):
+    """
+    Attach the RDS tag index to the snapshot, reusing the one built by a
+    previous warm invocation for the same target while it is younger than the TTL.
+    The cache keeps the records as described; the run updates statuses on
+    its own copies, so a later run still sees what the API reported.
+    """
+    ttl = RDS_INDEX_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    now = time.monotonic()
+    cached = _rds_index_cache.get(cache_key)
+
+    if cached is not None and ttl > 0 and now - cached[1] < ttl:
+        snapshot.rds = copy_rds_index(cached[0])
+        snapshot._index = None
+        logger.info(f"[Inventory] Reusing RDS index ({snapshot.rds_count()} DB instances)")
+        return snapshot
+
+    snapshot.rds = build_rds_index(rds_client)
+    snapshot._index = None
+    if ttl > 0:
+        _rds_index_cache[cache_key] = (copy_rds_index(snapshot.rds), now)
+
+    logger.info(f"[Inventory] Loaded {snapshot.rds_count()} RDS instances across {len(snapshot.rds)} tag values")
+    return snapshot
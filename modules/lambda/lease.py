@@ -0,0 +1,230 @@
+import logging
+import os
+import time
+from actions import error_code
+from profiling import PROFILE_METRICS
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Lease duration; a run renews it between phases while it still holds it
+LEASE_SECONDS = int(os.environ.get("LEASE_SECONDS", "120"))
+
+# How long a run waits for a held lease (0 = exit at once, leaving the work to the holder)
+LEASE_WAIT_SECONDS = float(os.environ.get("LEASE_WAIT_SECONDS", "0"))
+LEASE_POLL_SECONDS = 1.0
+
+# Lease items live in the config table next to the schedules; load_config ignores this Type
+KEY_PREFIX = "__lease__#"
+ITEM_TYPE = "lease"
+
+RUN_SCOPE = "run"
+
+# Lease datums of runs that published no self-metrics (gave way, skipped as idle),
+# sent with the next batch this container publishes; capped between batches
+_unpublished = []
+MAX_UNPUBLISHED = 100
+
+
+def lease_scope(shard: tuple = None) -> str:
+    """
+    "run" for a whole run or a coordinator, "shard#i/n" for one shard's worker.
+    """
+    if shard is None:
+        return RUN_SCOPE
+    _, index, count = shard
+    return f"shard#{index}/{count}"
+
+
+# ================================
+# 🔹 LEASE
+# ================================
+class Lease:
+    """
+    Exclusive hold on one scope, taken with a conditional write: a run gets
+    it only if nobody holds it or the holder's lease has expired (e.g. it
+    timed out). Renewed by heartbeats and deleted on release.
+    Errors reaching DynamoDB fail open: the run goes ahead without a lease.
+    """
+
+    def __init__(self, table, scope: str, owner: str):
+        self.table = table
+        self.scope = scope
+        self.owner = owner
+        self.key = {"Name": KEY_PREFIX + scope}
+        self.acquired = False
+        self.held = False
+        self.lost = False
+        self.holder = None
+        self.expires_at = 0.0
+        self.wait_ms = 0.0
+        self.acquired_at = None
+        self.released_at = None
+        self.reported = False
+
+    def _try_acquire(self, now: float) -> bool:
+        try:
+            self.table.put_item(
+                Item={
+                    **self.key,
+                    "Type": ITEM_TYPE,
+                    "Owner": self.owner,
+                    "AcquiredAt": int(now),
+                    "ExpiresAt": int(now + LEASE_SECONDS),
+                },
+                ConditionExpression="attribute_not_exists(#n) OR #e < :now",
+                ExpressionAttributeNames={"#n": "Name", "#e": "ExpiresAt"},
+                ExpressionAttributeValues={":now": int(now)},
+            )
+        except Exception as e:
+            if error_code(e) != "ConditionalCheckFailedException":
+                logger.error(f"[Lease] Failed to take lease {self.scope}, running without it: {e}")
+                return True
+            return False
+
+        self.held = True
+        self.expires_at = now + LEASE_SECONDS
+        return True
+
+    def acquire(self, wait_seconds: float = None) -> bool:
+        """
+        Take the lease, waiting up to wait_seconds for the holder to let go.
+        """
+        wait = LEASE_WAIT_SECONDS if wait_seconds is None else wait_seconds
+        started = time.monotonic()
+        while True:
+            if self._try_acquire(time.time()):
+                self.acquired = True
+                break
+            if time.monotonic() - started + LEASE_POLL_SECONDS > wait:
+                break
+            time.sleep(LEASE_POLL_SECONDS)
+
+        self.wait_ms = (time.monotonic() - started) * 1000
+        if self.acquired:
+            self.acquired_at = time.monotonic()
+        else:
+            self.holder = self._read_holder()
+            logger.warning(f"[Lease] {self.scope} is held by {self.holder or 'another run'}, exiting")
+        return self.acquired
+
+    def _read_holder(self):
+        try:
+            item = self.table.get_item(Key=self.key).get("Item") or {}
+            return item.get("Owner")
+        except Exception:
+            return None
+
+    def renew(self, force: bool = False) -> bool:
+        """
+        Heartbeat: extend the lease once half of it is used. False when
+        another run has taken it over meanwhile.
+        """
+        if not self.held or self.lost:
+            return not self.lost
+        now = time.time()
+        if not force and self.expires_at - now > LEASE_SECONDS / 2:
+            return True
+        try:
+            self.table.update_item(
+                Key=self.key,
+                UpdateExpression="SET #e = :exp",
+                ConditionExpression="#o = :me",
+                ExpressionAttributeNames={"#e": "ExpiresAt", "#o": "Owner"},
+                ExpressionAttributeValues={":exp": int(now + LEASE_SECONDS), ":me": self.owner},
+            )
+            self.expires_at = now + LEASE_SECONDS
+        except Exception as e:
+            if error_code(e) == "ConditionalCheckFailedException":
+                self.lost = True
+                logger.error(f"[Lease] Lost lease {self.scope} to another run")
+                return False
+            logger.error(f"[Lease] Failed to renew lease {self.scope}: {e}")
+        return True
+
+    def release(self):
+        if self.acquired and self.released_at is None:
+            self.released_at = time.monotonic()
+        if not self.held or self.lost:
+            return
+        try:
+            self.table.delete_item(
+                Key=self.key,
+                ConditionExpression="#o = :me",
+                ExpressionAttributeNames={"#o": "Owner"},
+                ExpressionAttributeValues={":me": self.owner},
+            )
+        except Exception as e:
+            if error_code(e) != "ConditionalCheckFailedException":
+                logger.error(f"[Lease] Failed to release lease {self.scope}: {e}")
+        self.held = False
+
+    @property
+    def hold_ms(self) -> float:
+        if self.acquired_at is None:
+            return 0.0
+        return ((self.released_at or time.monotonic()) - self.acquired_at) * 1000
+
+    def summary(self) -> dict:
+        return {
+            "scope": self.scope,
+            "acquired": self.acquired,
+            "lost": self.lost,
+            "holder": self.holder,
+            "wait_ms": round(self.wait_ms, 1),
+            "hold_ms": round(self.hold_ms, 1),
+        }
+
+    def metric_data(self) -> list:
+        """
+        LeaseWait/LeaseHold per invocation and LeaseContention when the run
+        gave way, with the scope kind ("run" or "shard") as dimension.
+        """
+        dims = [{"Name": "Lease", "Value": self.scope.split("#", 1)[0]}]
+        data = [{"MetricName": "LeaseWait", "Dimensions": dims, "Value": round(self.wait_ms, 1), "Unit": "Milliseconds"}]
+        if self.acquired:
+            data.append({"MetricName": "LeaseHold", "Dimensions": dims, "Value": round(self.hold_ms, 1), "Unit": "Milliseconds"})
+        else:
+            data.append({"MetricName": "LeaseContention", "Dimensions": dims, "Value": 1, "Unit": "Count"})
+        if self.lost:
+            data.append({"MetricName": "LeaseLost", "Dimensions": dims, "Value": 1, "Unit": "Count"})
+        return data
+
+    def take_metric_data(self) -> list:
+        """
+        This lease's datums (hold time so far) and those left by earlier
+        runs of this container, for the run's own self-metrics batch.
+        """
+        self.reported = True
+        data = _unpublished + self.metric_data()
+        del _unpublished[:]
+        return data
+
+    def keep_metric_data(self):
+        """
+        Hold the datums of a run that published none, when self-metrics are on.
+        """
+        if PROFILE_METRICS and not self.reported:
+            _unpublished.extend(self.metric_data())
+            del _unpublished[:-MAX_UNPUBLISHED]
+
+
+def held_scopes(dynamodb, table_name: str, scopes: list, now_epoch: int) -> set:
+    """
+    Scopes whose lease is currently held by some run (not yet expired).
+    """
+    held = set()
+    keys = [{"Name": KEY_PREFIX + s} for s in scopes]
+    for start in range(0, len(keys), 100):
+        request = {table_name: {"Keys": keys[start:start + 100]}}
+        while request:
+            resp = dynamodb.batch_get_item(RequestItems=request)
+            for item in resp["Responses"].get(table_name, []):
+                if int(item.get("ExpiresAt", 0)) >= now_epoch:
+                    held.add(item["Name"][len(KEY_PREFIX):])
+            request = resp.get("UnprocessedKeys")
+    return held
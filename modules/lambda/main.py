@@ -1,10 +1,47 @@
-import boto3
 import os
 import logging
-from period import is_period_active
+import time
+import profiling
+import resilience
+from concurrent.futures import ThreadPoolExecutor
+from period import PeriodEvaluator, schedule_period_names
+from actions import DISPATCH_BUDGET_SECONDS, ActionPlan, parse_priority
+from boot import LAST_RUN_KEY as BOOT_LAST_RUN_KEY, BootLatency, prewarm_cap_seconds
+from config import load_config
+from lease import Lease, held_scopes, lease_scope
+from metrics import merge_metric_data
+from reconcile import (
+    STATE_TABLE_NAME,
+    STUCK_AFTER_SECONDS,
+    Reconciler,
+    booted_resources,
+    forget_ledger,
+    pending_resources
+)
+from savings import LAST_RUN_KEY, SavingsAccumulator, sync_last_run
+from shards import (
+    SHARD_COUNT,
+    SHARD_WAIT_SECONDS,
+    collect_summaries,
+    get_invoker,
+    new_run_id,
+    save_summary,
+    shard_of,
+    shard_request,
+    shard_schedules
+)
+from runstate import SKIP_WHEN_IDLE, config_fingerprint, load_run_state, should_skip, save_run_state
+from inventory import InventorySnapshot, tag_schedules
+from statecache import STATE_CACHE_TABLE, StateCache, event_fed
+from targets import MAX_TARGET_WORKERS, Target, get_resource, resolve_targets, schedule_targets, target_key
 from instances import (
+    build_inventory,
     control_instance,
-    collect_and_publish_all_metrics
+    execute_plan,
+    log_control_summary,
+    collect_all_metrics,
+    collect_and_publish_all_metrics,
+    publish_metric_data
 )
 
 # ================================
@@ -13,60 +50,627 @@ from instances import (
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# DynamoDB
-dynamodb = boto3.resource("dynamodb")
+# DynamoDB (resource built on first invocation, see targets.get_resource)
 TABLE_NAME = os.environ.get("TABLE_NAME", "ec2-rds-scheduler-table")
 
+# Schedule Override values: while such a schedule is active it sets its resources' state outright
+OVERRIDE_VALUES = ("start", "stop")
 
-def lambda_handler(event, context):
-    # ===== Load table =====
+
+def earliest_transition(schedules: list, periods: dict, evaluator: PeriodEvaluator, lead_seconds: int = 0) -> int:
+    """
+    Epoch seconds of the earliest upcoming active/inactive change across
+    all schedules, lead_seconds early for pre-warm starts. Falls back to
+    "now" when a schedule cannot be evaluated.
+    """
+    now_epoch = int(evaluator.utc_now.timestamp())
+    earliest = None
+    for sched in schedules:
+        try:
+            moment = evaluator.next_transition(
+                [periods[p] for p in schedule_period_names(sched)],
+                sched.get("Timezone", "UTC")
+            )
+        except Exception as e:
+            logger.error(f"[Period] Failed to compute next transition for schedule {sched.get('Name', 'UNKNOWN')}: {e}")
+            return now_epoch
+        if moment is not None and (earliest is None or moment < earliest):
+            earliest = moment
+
+    if earliest is None:
+        return now_epoch + 366 * 86400
+    return max(now_epoch, int(earliest.timestamp()) - lead_seconds)
+
+
+def seconds_to_start(sched: dict, periods: dict, evaluator: PeriodEvaluator):
+    """
+    Seconds until an inactive schedule next becomes active, or None when
+    it never does within the lookahead.
+    """
     try:
-        table = dynamodb.Table(TABLE_NAME)
-        items = table.scan()["Items"]
-        logger.info(f"[DynamoDB] Loaded {len(items)} items from {TABLE_NAME}")
+        moment = evaluator.next_transition(
+            [periods[p] for p in schedule_period_names(sched)],
+            sched.get("Timezone", "UTC")
+        )
     except Exception as e:
-        logger.error(f"[DynamoDB] Failed to scan table {TABLE_NAME}: {e}")
-        return
+        logger.error(f"[Period] Failed to compute next start for schedule {sched.get('Name', 'UNKNOWN')}: {e}")
+        return None
+    if moment is None:
+        return None
+    return int(moment.timestamp()) - int(evaluator.utc_now.timestamp())
 
-    # ===== Parse config =====
+
+def evaluate_schedule(sched: dict, periods: dict, evaluator: PeriodEvaluator) -> bool:
+    """
+    Desired state of one schedule: active if any of its periods is active.
+    """
+    tz = sched.get("Timezone", "UTC")
     try:
-        periods = {i["Name"]: i for i in items if i["Type"] == "period"}
-        schedules = [i for i in items if i["Type"] == "schedule"]
-        logger.info(f"[Config] Found {len(periods)} periods, {len(schedules)} schedules")
+        return any(evaluator.is_active(periods.get(p), tz) for p in schedule_period_names(sched))
     except Exception as e:
-        logger.error(f"[Config] Failed to parse items: {e}")
-        return
+        logger.error(f"[Period] Failed to evaluate active for schedule {sched.get('Name', 'UNKNOWN')}: {e}")
+        return False
+
+
+def schedule_override(sched: dict):
+    """
+    "start" or "stop" when the schedule sets Override, else None.
+    """
+    value = str(sched.get("Override") or "").strip().lower()
+    if not value:
+        return None
+    if value in OVERRIDE_VALUES:
+        return value
+    logger.warning(f"[Schedule] Ignoring invalid Override {value!r} on schedule {sched.get('Name', 'UNKNOWN')}")
+    return None
+
+
+def resolve_state(names: list, by_name: dict, states: dict):
+    """
+    Desired state of resources whose ScheduleTag lists these schedules
+    (configured ones, in tag order):
+    1. an active schedule with Override sets the state outright; when
+       several are active, the first listed wins;
+    2. otherwise the resources run if any of their schedules is active.
+    Returns (active, deciding schedule, overridden).
+    """
+    for name in names:
+        override = schedule_override(by_name[name])
+        if override and states[name]:
+            return override == "start", by_name[name], True
+    for name in names:
+        if states[name]:
+            return True, by_name[name], False
+    return False, by_name[names[0]], False
+
+
+def plan_groups(target: Target, snapshot, by_name: dict, states: dict, run_names: set,
+                target_names: dict, starts_in: dict = None) -> list:
+    """
+    One entry per ScheduleTag value in the target, with the state resolved
+    across the schedules it lists that apply here. A tag value belongs to
+    the first of those schedules; only the run (or shard) holding that
+    schedule plans it, so each resource is acted on once.
+    starts_in (schedule name -> seconds to its next window) feeds pre-warm.
+    """
+    groups = []
+    for tag_value in snapshot.groups():
+        names = [n for n in tag_schedules(tag_value) if n in by_name and target in target_names[n]]
+        if not names or names[0] not in run_names:
+            continue
+        active, sched, overridden = resolve_state(names, by_name, states)
+        group = {"tag": tag_value, "names": names, "active": active, "schedule": sched, "starts_in": None}
+
+        # The window that opens first decides how early to start; never against an override
+        if not active and not overridden and starts_in:
+            upcoming = [(starts_in[n], n) for n in names if starts_in.get(n) is not None]
+            if upcoming:
+                group["starts_in"], name = min(upcoming)
+                group["prewarm_schedule"] = by_name[name]
+        groups.append(group)
+    return groups
+
+
+def process_group(group: dict, snapshot, plan: ActionPlan, reconciler: Reconciler, target: Target,
+                  boot: BootLatency = None):
+    """
+    Enforce one ScheduleTag value in one target: only queues actions on the
+    plan. Hibernate and Priority come from the deciding schedule; the
+    seconds to the next window and the boot latency estimates decide which
+    resources start early.
+    """
+    sched = group["schedule"]
+    sched_name = sched.get("Name", "UNKNOWN")
+    hibernate = sched.get("Hibernate", False)
+    priority = parse_priority(sched.get("Priority"))
+
+    prewarm = None
+    starts_in = group["starts_in"]
+    cap = prewarm_cap_seconds(group["prewarm_schedule"]) if starts_in is not None else 0
+    if boot is not None and cap:
+        def prewarm(kind, resource_class):
+            return starts_in <= boot.lead_seconds(kind, resource_class, cap)
+
+    # Control EC2/RDS
+    try:
+        return control_instance(
+            group["tag"], group["active"], hibernate, snapshot, plan, reconciler, target, priority, prewarm, sched_name
+        )
+    except Exception as e:
+        logger.error(f"[Control] Failed for tag {group['tag']} in {target.label}: {e}")
+        return None
 
-    # ===== Process schedules =====
-    for sched in schedules:
-        sched_name = sched.get("Name", "UNKNOWN")
-        tz = sched.get("Timezone", "UTC")
-        period_names = [p.strip() for p in sched.get("Periods", "").split(",") if p.strip()]
 
-        # Confirm active
+def load_inventories(targets: list, cache: StateCache = None, now_epoch: int = None, tag_values: list = None) -> dict:
+    """
+    Inventory every target in parallel. Targets that fail are logged and left out.
+    With a state cache, targets whose events reach the cache and that were
+    resynced recently enough are read from it instead; the others among them
+    are described in full and written back. Targets outside the cache, and
+    every target without one, are described with EC2 limited to tag_values
+    (a shard's schedules) when given.
+    """
+    snapshots = {}
+    existing = {}
+    if cache is not None:
+        for target in targets:
+            try:
+                key = target_key(target)
+                if not event_fed(key, target_key(Target())):
+                    continue
+                snapshot, existing[target] = cache.load(key, now_epoch)
+            except Exception as e:
+                logger.error(f"[StateCache] Failed to read {target.label}, describing instead: {e}")
+                continue
+            if snapshot is not None:
+                snapshots[target] = snapshot
+        if snapshots:
+            logger.info(f"[StateCache] {len(snapshots)}/{len(targets)} targets read from the state cache")
+
+    def load(target):
         try:
-            active = any(is_period_active(periods.get(p), tz) for p in period_names)
+            return build_inventory(target, None if target in existing else tag_values)
         except Exception as e:
-            logger.error(f"[Period] Failed to evaluate active for schedule {sched_name}: {e}")
-            active = False
+            logger.error(f"[Inventory] Failed to load tagged resources in {target.label}: {e}")
+            return None
+
+    pending = [t for t in targets if t not in snapshots]
+    workers = max(1, min(MAX_TARGET_WORKERS, len(pending)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        described = list(pool.map(load, pending))
+
+    for target, snapshot in zip(pending, described):
+        if snapshot is None:
+            continue
+        snapshots[target] = snapshot
+        # DynamoDB resource calls stay on this thread
+        if cache is not None and target in existing:
+            try:
+                cache.replace(target_key(target), snapshot, existing[target], now_epoch)
+            except Exception as e:
+                logger.error(f"[StateCache] Failed to resync {target.label}: {e}")
+
+    # Keep the targets' order for the control stage
+    return {t: snapshots[t] for t in targets if t in snapshots}
+
+
+def run_target(target: Target, groups: list, snapshot, reconciler: Reconciler, deadline: float = None,
+               boot: BootLatency = None):
+    """
+    Control every ScheduleTag value planned for one target, then send the
+    target's actions in rate-limited waves until the deadline.
+    Returns (results, failed, {deferred id: reason}).
+    """
+    plan = ActionPlan()
+
+    # Planning is CPU only: no API call until the plan is executed
+    outputs = [process_group(group, snapshot, plan, reconciler, target, boot) for group in groups]
+    results = [r for r in outputs if r is not None]
+
+    # ===== Send EC2/RDS actions in priority waves =====
+    try:
+        failed = execute_plan(plan, target, deadline)
+    except Exception as e:
+        logger.error(f"[Control] Failed to execute action plan in {target.label}: {e}")
+        failed = {i: str(e) for r in results for i in r["ec2"] + r["rds"] if i not in plan.done}
+
+    # Only actions actually sent go to the ledger; deferred ones are decided again next run
+    for ledger_key, action in plan.done.values():
+        reconciler.record(ledger_key, action)
+
+    return results, failed, plan.deferred_reasons
+
+
+def dispatch_deadline(context) -> float:
+    """
+    Monotonic time by which action dispatch must stop: the dispatch budget,
+    or less when the Lambda itself would time out first.
+    """
+    budget = DISPATCH_BUDGET_SECONDS
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        # Keep time for the ledger flush, metrics and run state after dispatch
+        budget = min(budget, context.get_remaining_time_in_millis() / 1000.0 * 0.6)
+    return time.monotonic() + budget
 
-        hibernate = sched.get("Hibernate", False)
-        use_metric = sched.get("UseMetric", False)
 
-        # Control EC2/RDS
+def shard_deadline(context) -> float:
+    """
+    Monotonic time until which the coordinator waits for worker summaries.
+    """
+    wait = SHARD_WAIT_SECONDS
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        wait = min(wait, context.get_remaining_time_in_millis() / 1000.0 * 0.8)
+    return time.monotonic() + wait
+
+
+def self_metric_data(profiler: profiling.Profiler, lease: Lease = None) -> list:
+    """
+    Phase/API timings and lease datums, when PROFILE_METRICS is on.
+    """
+    if not profiling.PROFILE_METRICS:
+        return []
+    return profiler.metric_data() + (lease.take_metric_data() if lease is not None else [])
+
+
+def lambda_handler(event, context):
+    profiler = profiling.start()
+    resilience.start_invocation()
+    shard = shard_request(event)
+    lease = None
+    try:
+        # ===== One run (or one shard's worker) at a time: overlapping runs exit =====
+        with profiler.phase("lease"):
+            lease = Lease(get_resource("dynamodb").Table(TABLE_NAME), lease_scope(shard), new_run_id(context))
+            acquired = lease.acquire()
+        if acquired:
+            response = run_scheduler(profiler, context, shard, lease)
+        else:
+            response = {"skipped": True, "busy": True}
+    finally:
+        if lease is not None:
+            lease.release()
+        profiling.stop(profiler)
+
+    # ===== One structured timing/API summary per invocation =====
+    summary = profiler.summary()
+    profiler.log_summary(summary)
+    if response is not None:
+        response["profile"] = summary
+        response["resilience"] = resilience.summary()
+        response["lease"] = lease.summary()
+    if lease is not None:
+        lease.keep_metric_data()
+
+    # ===== Workers report back to the coordinator through the state table =====
+    if shard is not None:
+        run_id, index, _ = shard
+        try:
+            save_summary(get_resource("dynamodb"), run_id, index, response or {"error": True}, int(time.time()))
+        except Exception as e:
+            logger.error(f"[Shard] Failed to save summary of shard {index}: {e}")
+    return response
+
+
+def run_scheduler(profiler: profiling.Profiler, context=None, shard: tuple = None, lease: Lease = None):
+    """
+    One scheduler run. shard = (run_id, index, count) restricts it to one
+    shard's schedules (worker); with SHARD_COUNT > 1 and no shard, the run
+    fans the schedules out to workers instead (coordinator). The lease, if
+    any, is renewed between phases.
+    """
+    # ===== Load config (paginated, cached in the warm container) =====
+    with profiler.phase("config"):
+        try:
+            dynamodb = get_resource("dynamodb")
+            table = dynamodb.Table(TABLE_NAME)
+            periods, schedules = load_config(table)
+        except Exception as e:
+            logger.error(f"[Config] Failed to load config from {TABLE_NAME}: {e}")
+            return
+
+    # Tags may list schedules of other shards: their state is needed to resolve them
+    config_schedules = schedules
+    last_run_key = LAST_RUN_KEY
+    boot_run_key = BOOT_LAST_RUN_KEY
+    if shard is not None:
+        _, index, count = shard
+        schedules = shard_schedules(schedules, index, count)
+        last_run_key = f"{LAST_RUN_KEY}#{index}/{count}"
+        boot_run_key = f"{BOOT_LAST_RUN_KEY}#{index}/{count}"
+        logger.info(f"[Shard] Worker for shard {index}/{count}: {len(schedules)} schedules")
+        if not schedules:
+            return {"schedules": 0, "skipped": True}
+        # Shards land on any container: drop warm per-resource state if this one ran elsewhere
+        if sync_last_run(dynamodb, last_run_key):
+            forget_ledger()
+
+    with profiler.phase("period"):
+        evaluator = PeriodEvaluator()
+        now_epoch = int(evaluator.utc_now.timestamp())
+
+        # ===== Skip when no schedule has a transition (decided by the coordinator) =====
+        fingerprint = None
+        if SKIP_WHEN_IDLE and shard is None:
+            fingerprint = config_fingerprint(periods, schedules)
+            if should_skip(load_run_state(table), fingerprint, now_epoch):
+                logger.info("[Idle] No schedule transition since last run, skipping EC2/RDS work")
+                return {"schedules": len(schedules), "skipped": True}
+
+    if shard is None and SHARD_COUNT > 1:
+        if STATE_TABLE_NAME:
+            return run_coordinator(profiler, context, dynamodb, table, periods, schedules, evaluator, fingerprint, lease)
+        logger.warning("[Shard] SHARD_COUNT needs STATE_TABLE_NAME for worker summaries, running unsharded")
+
+    # ===== Load inventory (one pass per target, shared by control and metrics) =====
+    with profiler.phase("inventory"):
+        targets = resolve_targets(schedules)
+        cache = StateCache(dynamodb.Table(STATE_CACHE_TABLE)) if STATE_CACHE_TABLE else None
+        tag_values = [s.get("Name", "UNKNOWN") for s in schedules] if shard is not None else None
+        snapshots = load_inventories(targets, cache, now_epoch, tag_values)
+        if not snapshots:
+            logger.error("[Inventory] No target could be inventoried")
+            return
+
+    # ===== Desired state per schedule, for every schedule the inventoried tags list =====
+    with profiler.phase("period"):
+        by_name = {s.get("Name", "UNKNOWN"): s for s in config_schedules}
+        run_names = {s.get("Name", "UNKNOWN") for s in schedules}
+        listed = {n for snap in snapshots.values() for n in snap.schedule_index() if n in by_name}
+        states = {n: evaluate_schedule(by_name[n], periods, evaluator) for n in sorted(listed | run_names)}
+        target_names = {n: set(schedule_targets(by_name[n])) for n in states}
+
+    # ===== Never send actions once another run has taken over =====
+    if lease is not None and not lease.renew():
+        return {"schedules": len(schedules), "skipped": True, "busy": True}
+
+    with profiler.phase("control"):
+        deadline = dispatch_deadline(context)
+
+        # ===== Boot latency per instance class, for starts ahead of BeginTime =====
+        boot = None
+        starts_in = None
+        if STATE_TABLE_NAME and any(prewarm_cap_seconds(by_name[n]) for n in states):
+            boot = BootLatency(now_epoch, dynamodb, last_run_key=boot_run_key)
+            boot.load(
+                {("ec2", i.instance_type) for snap in snapshots.values() for v in snap.groups()
+                 for i in snap.ec2_group(v) if i.instance_type}
+                | {("rds", d.db_class) for snap in snapshots.values() for v in snap.groups()
+                   for d in snap.rds_group(v) if d.db_class}
+            )
+            if boot.samples:
+                with profiler.phase("period"):
+                    starts_in = {
+                        n: seconds_to_start(by_name[n], periods, evaluator)
+                        for n, active in states.items() if not active and prewarm_cap_seconds(by_name[n])
+                    }
+
+        # ===== One entry per tag value: resources listing several schedules are resolved once =====
+        plans = {
+            t: plan_groups(t, snap, by_name, states, run_names, target_names, starts_in)
+            for t, snap in snapshots.items()
+        }
+
+        # ===== Reconcile against the snapshots =====
+        reconciler = Reconciler(now_epoch, dynamodb, boot=boot)
+        ledger_ids = [
+            i for t, snap in snapshots.items()
+            for i in pending_resources(snap, {g["tag"]: g["active"] for g in plans[t]})
+        ]
+        if boot is not None:
+            # Starts finished since the last run are timed from their ledger entry, warm or not
+            ledger_ids += [
+                i for t, snap in snapshots.items()
+                for i in booted_resources(
+                    snap, {g["tag"]: g["active"] or g["starts_in"] is not None for g in plans[t]},
+                    now_epoch - STUCK_AFTER_SECONDS
+                )
+            ]
+        reconciler.prefetch(ledger_ids)
+
+        # ===== Process tag values, targets in parallel =====
+        workers = max(1, min(MAX_TARGET_WORKERS, len(snapshots)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(
+                lambda t: run_target(t, plans[t], snapshots[t], reconciler, deadline, boot), snapshots
+            ))
+
+        # One combined result per deciding schedule across tag values and targets
+        failed = {}
+        deferred = {}
+        combined = {}
+        for target_results, target_failed, target_deferred in outcomes:
+            for r in target_results:
+                entry = combined.setdefault((r["name"], r["active"]), {
+                    "name": r["name"], "active": r["active"], "ec2": [], "rds": [], "early": []
+                })
+                for key in ("ec2", "rds", "early"):
+                    entry[key].extend(r[key])
+            failed.update(target_failed)
+            deferred.update(target_deferred)
+        results = list(combined.values())
+
+        for sched in schedules:
+            name = sched.get("Name", "UNKNOWN")
+            if name in listed:
+                logger.info(f"[Schedule] {name} is {'ACTIVE' if states[name] else 'INACTIVE'} ")
+
+        for result in results:
+            log_control_summary(result, {**failed, **deferred})
+
+        reconciler.flush()
+        reconciler.log_summary()
+        if boot is not None:
+            boot.flush()
+
+    if lease is not None:
+        lease.renew()
+
+    with profiler.phase("metrics"):
+        # Metrics see every target as one estate
+        snapshot = InventorySnapshot()
+        for snap in snapshots.values():
+            snapshot.merge(snap)
+        metric_schedules = [s for s in schedules if s.get("UseMetric", False)]
+
+        # Estate totals count each resource once, in the run that controls it
+        metric_names = {n for n, s in by_name.items() if s.get("UseMetric", False)}
+        estate = InventorySnapshot()
+        for t, snap in snapshots.items():
+            estate.merge(snap.select(g["tag"] for g in plans[t] if any(n in metric_names for n in g["names"])))
+
+        # Self-metrics cover the phases up to here; the JSON summary also has "metrics"
+        self_metrics = self_metric_data(profiler, lease)
+
+        savings = SavingsAccumulator(now_epoch, dynamodb, last_run_key=last_run_key)
+
+        # ===== Publish metrics (once, for opted-in schedules only) =====
+        estate_metrics = []
+        if shard is not None:
+            # Estate totals are partial per shard: the coordinator sums and publishes them
+            try:
+                if metric_schedules:
+                    estate_metrics = collect_all_metrics(
+                        metric_schedules, snapshot, reconciler.summary(), savings, estate
+                    )
+            except Exception as e:
+                logger.error(f"[Metrics] Failed to collect metrics: {e}")
+            if self_metrics:
+                publish_metric_data(self_metrics)
+        elif metric_schedules:
+            try:
+                collect_and_publish_all_metrics(
+                    metric_schedules, snapshot, reconciler.summary(), savings, self_metrics, estate
+                )
+                logger.info(f"[Metrics] Metrics published for {len(metric_schedules)} schedules")
+            except Exception as e:
+                logger.error(f"[Metrics] Failed to publish metrics: {e}")
+        elif self_metrics:
+            publish_metric_data(self_metrics)
+
+    # ===== Remember when the next full run is needed =====
+    # Resources still booting are checked on the next run, which times their boot
+    prewarm_lead = boot.max_lead(max(prewarm_cap_seconds(by_name[n]) for n in states)) if boot is not None else 0
+    booting = boot is not None and (reconciler.issued or reconciler.converging)
+    if fingerprint is not None:
+        with profiler.phase("period"):
+            retry_now = failed or deferred or booting
+            next_change = now_epoch if retry_now else earliest_transition(schedules, periods, evaluator, prewarm_lead)
+            save_run_state(table, fingerprint, next_change, now_epoch)
+
+    deferred_reasons = {}
+    for reason in deferred.values():
+        deferred_reasons[reason] = deferred_reasons.get(reason, 0) + 1
+
+    response = {
+        "schedules": len(schedules),
+        "skipped": False,
+        "active": [n for n in (s.get("Name", "UNKNOWN") for s in schedules) if n in listed and states[n]],
+        "ec2_actions": sum(1 for r in results for i in r["ec2"] if i not in failed and i not in deferred),
+        "rds_actions": sum(1 for r in results for i in r["rds"] if i not in failed and i not in deferred),
+        "failed": sorted(failed),
+        "deferred": sorted(deferred),
+        "deferred_reasons": deferred_reasons,
+        "convergence": reconciler.summary(),
+        "prewarmed": sorted(i for r in results for i in r["early"] if i not in failed and i not in deferred),
+    }
+    if boot is not None:
+        response["boot_seconds"] = boot.summary()
+    if shard is not None:
+        response["metric_data"] = estate_metrics
+        response["prewarm_lead"] = prewarm_lead
+        response["booting"] = bool(booting)
+    return response
+
+
+def run_coordinator(profiler: profiling.Profiler, context, dynamodb, table, periods: dict, schedules: list,
+                    evaluator: PeriodEvaluator, fingerprint: str = None, lease: Lease = None):
+    """
+    Split the schedules into shards by a stable hash of their name, invoke
+    one worker per non-empty shard and combine the summaries they leave in
+    the state table. Shards still leased by a previous run's worker are left
+    to it. Estate metrics are summed across shards and published once.
+    """
+    now_epoch = int(evaluator.utc_now.timestamp())
+    run_id = new_run_id(context)
+    shards = sorted({shard_of(s.get("Name", "UNKNOWN"), SHARD_COUNT) for s in schedules})
+
+    with profiler.phase("fanout"):
+        busy = []
         try:
-            control_instance(sched_name, active, hibernate)
-            if active:
-                logger.info(f"[Schedule] {sched_name} is ACTIVE ")
-            else:
-                logger.info(f"[Schedule] {sched_name} is INACTIVE ")
+            held = held_scopes(dynamodb, TABLE_NAME, [lease_scope((run_id, i, SHARD_COUNT)) for i in shards], now_epoch)
+            busy = [i for i in shards if lease_scope((run_id, i, SHARD_COUNT)) in held]
         except Exception as e:
-            logger.error(f"[Control] Failed for schedule {sched_name}: {e}")
+            logger.error(f"[Lease] Failed to read shard leases: {e}")
+        if busy:
+            logger.warning(f"[Shard] Shards {busy} are still leased by a previous run, not invoking them")
+
+        invoker = get_invoker()
+        invoked = []
+        for index in shards:
+            if index in busy:
+                continue
+            try:
+                invoker.invoke({"shard": index, "shards": SHARD_COUNT, "run": run_id})
+                invoked.append(index)
+            except Exception as e:
+                logger.error(f"[Shard] Failed to invoke worker for shard {index}: {e}")
 
-        # Publish metrics 
-        if use_metric:
+        summaries = {}
+        if invoked:
             try:
-                collect_and_publish_all_metrics(schedules)
-                logger.info(f"[Metrics] Metrics published for schedule {sched_name}")
+                heartbeat = lease.renew if lease is not None else None
+                summaries = collect_summaries(dynamodb, run_id, invoked, shard_deadline(context), heartbeat)
             except Exception as e:
-                logger.error(f"[Metrics] Failed for schedule {sched_name}: {e}")
\ No newline at end of file
+                logger.error(f"[Shard] Failed to collect worker summaries: {e}")
+
+    # Workers that found their shard leased gave way to a previous run's worker
+    busy += [i for i in sorted(summaries) if summaries[i].get("busy")]
+    reported = [summaries[i] for i in sorted(summaries) if not summaries[i].get("error") and not summaries[i].get("busy")]
+    missing = [i for i in shards if i not in busy and (i not in summaries or summaries[i].get("error"))]
+    if missing:
+        logger.warning(f"[Shard] No summary from shards {missing} of run {run_id}")
+    logger.info(f"[Shard] {len(reported)}/{len(shards)} shards reported for {len(schedules)} schedules")
+
+    failed = sorted(i for r in reported for i in r.get("failed", []))
+    deferred = sorted(i for r in reported for i in r.get("deferred", []))
+    deferred_reasons = {}
+    for r in reported:
+        for reason, count in r.get("deferred_reasons", {}).items():
+            deferred_reasons[reason] = deferred_reasons.get(reason, 0) + count
+    convergence = {"converged": 0, "converging": 0, "stuck": [], "issued": 0}
+    for r in reported:
+        part = r.get("convergence") or {}
+        for key in ("converged", "converging", "issued"):
+            convergence[key] += part.get(key, 0)
+        convergence["stuck"].extend(part.get("stuck", []))
+    convergence["stuck"].sort()
+
+    with profiler.phase("metrics"):
+        self_metrics = self_metric_data(profiler, lease)
+        metric_data = merge_metric_data(*(r.get("metric_data") for r in reported))
+        if metric_data or self_metrics:
+            publish_metric_data(metric_data + self_metrics)
+
+    # ===== Remember when the next full run is needed =====
+    if fingerprint is not None:
+        with profiler.phase("period"):
+            retry_now = failed or deferred or missing or busy or any(r.get("booting") for r in reported)
+            prewarm_lead = max((r.get("prewarm_lead", 0) for r in reported), default=0)
+            next_change = now_epoch if retry_now else earliest_transition(schedules, periods, evaluator, prewarm_lead)
+            save_run_state(table, fingerprint, next_change, now_epoch)
+
+    return {
+        "schedules": len(schedules),
+        "skipped": False,
+        "shards": len(shards),
+        "missing_shards": missing,
+        "busy_shards": sorted(busy),
+        "active": sorted(name for r in reported for name in r.get("active", [])),
+        "ec2_actions": sum(r.get("ec2_actions", 0) for r in reported),
+        "rds_actions": sum(r.get("rds_actions", 0) for r in reported),
+        "failed": failed,
+        "deferred": deferred,
+        "deferred_reasons": deferred_reasons,
+        "convergence": convergence,
+        "prewarmed": sorted(i for r in reported for i in r.get("prewarmed", [])),
+    }
@@ -16,7 +16,34 @@ resource "aws_lambda_function" "this" {
 
   environment {
     variables = {
-      TABLE_NAME = var.table_name
+      TABLE_NAME              = var.table_name
+      STATE_TABLE_NAME        = var.state_table_name
+      CONFIG_TYPE_INDEX       = var.config_type_index
+      CONFIG_TTL_SECONDS      = var.config_ttl_seconds
+      RDS_INDEX_TTL_SECONDS   = var.rds_index_ttl_seconds
+      MAX_WORKERS             = var.max_workers
+      SKIP_WHEN_IDLE          = var.skip_when_idle
+      DRIFT_SWEEP_MINUTES     = var.drift_sweep_minutes
+      METRICS_SINK            = var.metrics_sink
+      TARGET_REGIONS          = join(",", var.target_regions)
+      TARGET_ROLE_ARNS        = join(",", var.target_role_arns)
+      MAX_TARGET_WORKERS      = var.max_target_workers
+      PROFILE_METRICS         = var.profile_metrics
+      EC2_CALLS_PER_SECOND    = var.ec2_calls_per_second
+      RDS_CALLS_PER_SECOND    = var.rds_calls_per_second
+      DISPATCH_BUDGET_SECONDS = var.dispatch_budget_seconds
+      WAVE_INTERVAL_SECONDS   = var.wave_interval_seconds
+      RETRY_BUDGET            = var.retry_budget
+      CIRCUIT_THRESHOLD       = var.circuit_threshold
+      CIRCUIT_OPEN_SECONDS    = var.circuit_open_seconds
+      STATE_CACHE_TABLE       = var.state_cache_table
+      RESYNC_MINUTES          = var.resync_minutes
+      STATE_CACHE_TARGETS     = join(",", var.state_cache_targets)
+      SHARD_COUNT             = var.shard_count
+      SHARD_WAIT_SECONDS      = var.shard_wait_seconds
+      LEASE_SECONDS           = var.lease_seconds
+      LEASE_WAIT_SECONDS      = var.lease_wait_seconds
+      PREWARM_MAX_MINUTES     = var.prewarm_max_minutes
     }
   }
 }
@@ -39,3 +66,52 @@ resource "aws_lambda_permission" "allow_eventbridge" {
   principal     = "events.amazonaws.com"
   source_arn    = aws_cloudwatch_event_rule.every5min.arn
 }
+
+# Optional handler keeping the state cache current from EC2/RDS state-change events
+resource "aws_lambda_function" "state_events" {
+  count            = var.state_cache ? 1 : 0
+  function_name    = "${var.project_name}-state-events"
+  role             = var.role_arn
+  handler          = "state_events.lambda_handler"
+  runtime          = "python3.11"
+
+  filename         = data.archive_file.lambda_zip.output_path
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+
+  environment {
+    variables = {
+      STATE_CACHE_TABLE = var.state_cache_table
+      TARGET_ROLE_ARNS  = join(",", var.target_role_arns)
+    }
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "state_events" {
+  count = var.state_cache ? 1 : 0
+  name  = "${var.project_name}-state-events"
+
+  event_pattern = jsonencode({
+    source = ["aws.ec2", "aws.rds", "aws.tag"]
+    detail-type = [
+      "EC2 Instance State-change Notification",
+      "RDS DB Instance Event",
+      "Tag Change on Resource"
+    ]
+  })
+}
+
+resource "aws_cloudwatch_event_target" "state_events" {
+  count     = var.state_cache ? 1 : 0
+  rule      = aws_cloudwatch_event_rule.state_events[0].name
+  target_id = "state-events"
+  arn       = aws_lambda_function.state_events[0].arn
+}
+
+resource "aws_lambda_permission" "allow_state_events" {
+  count         = var.state_cache ? 1 : 0
+  statement_id  = "AllowExecutionFromEventBridge"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.state_events[0].function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.state_events[0].arn
+}
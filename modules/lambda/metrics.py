@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Namespace read by the modules/cloudwatch dashboard; do not change
+NAMESPACE = "EC2RDS/Scheduler"
+
+# "api" = PutMetricData, "emf" = Embedded Metric Format in the log stream
+METRICS_SINK = os.environ.get("METRICS_SINK", "api").lower()
+
+# Max datums per PutMetricData request
+PUT_BATCH_SIZE = int(os.environ.get("METRICS_BATCH_SIZE", "1000"))
+
+# CloudWatch limits
+MAX_VALUES_PER_DATUM = 150
+MAX_METRICS_PER_EMF_DOC = 100
+
+
+def dimension_key(datum: dict) -> tuple:
+    return tuple((d["Name"], d["Value"]) for d in datum.get("Dimensions", []))
+
+
+def merge_metric_data(*metric_lists) -> list:
+    """
+    Sum datums with the same metric, dimensions and unit, e.g. the partial
+    estate counts reported by each shard of one run.
+    """
+    merged = {}
+    for metric_data in metric_lists:
+        for datum in metric_data or []:
+            key = (datum["MetricName"], dimension_key(datum), datum.get("Unit", "None"))
+            if key in merged:
+                merged[key]["Value"] += datum["Value"]
+            else:
+                merged[key] = dict(datum)
+    return list(merged.values())
+
+
+# ================================
+# 🔹 SINKS
+# ================================
+class MetricsSink(ABC):
+    """
+    Destination for the scheduler's metric_data list (PutMetricData shape).
+    """
+
+    @abstractmethod
+    def publish(self, metric_data: list):
+        ...
+
+
+class PutMetricDataSink(MetricsSink):
+    """
+    Collapses repeated (metric, dimensions, unit) datums into Values/Counts
+    and sends them in chunks that stay under the per-request datum limit.
+    """
+
+    def __init__(self, cloudwatch_client, batch_size: int = None):
+        self.cloudwatch = cloudwatch_client
+        self.batch_size = batch_size or PUT_BATCH_SIZE
+
+    def collapse(self, metric_data: list) -> list:
+        grouped = {}
+        for datum in metric_data:
+            key = (datum["MetricName"], dimension_key(datum), datum.get("Unit", "None"))
+            counts = grouped.setdefault(key, {})
+            counts[datum["Value"]] = counts.get(datum["Value"], 0) + 1
+
+        collapsed = []
+        for (name, dims, unit), counts in grouped.items():
+            items = list(counts.items())
+            for i in range(0, len(items), MAX_VALUES_PER_DATUM):
+                chunk = items[i:i + MAX_VALUES_PER_DATUM]
+                collapsed.append({
+                    "MetricName": name,
+                    "Dimensions": [{"Name": n, "Value": v} for n, v in dims],
+                    "Values": [float(v) for v, _ in chunk],
+                    "Counts": [float(c) for _, c in chunk],
+                    "Unit": unit,
+                })
+        return collapsed
+
+    def publish(self, metric_data: list):
+        collapsed = self.collapse(metric_data)
+        sent = 0
+        for i in range(0, len(collapsed), self.batch_size):
+            batch = collapsed[i:i + self.batch_size]
+            try:
+                self.cloudwatch.put_metric_data(Namespace=NAMESPACE, MetricData=batch)
+                sent += len(batch)
+            except Exception as e:
+                logger.error(f"[CloudWatch] Failed to publish {len(batch)} metrics: {e}")
+        logger.info(f"Published {sent} metrics to CloudWatch")
+
+
+class EmfSink(MetricsSink):
+    """
+    Writes CloudWatch Embedded Metric Format documents to stdout, which
+    Lambda ships to the log stream; no synchronous API call is made.
+    One document per dimension set, since EMF dimension values are per document.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def documents(self, metric_data: list, timestamp_ms: int = None) -> list:
+        timestamp_ms = timestamp_ms or int(time.time() * 1000)
+        by_dims = {}
+        for datum in metric_data:
+            by_dims.setdefault(dimension_key(datum), []).append(datum)
+
+        docs = []
+        for dims, datums in by_dims.items():
+            for i in range(0, len(datums), MAX_METRICS_PER_EMF_DOC):
+                values = {}
+                definitions = []
+                for datum in datums[i:i + MAX_METRICS_PER_EMF_DOC]:
+                    name = datum["MetricName"]
+                    if name not in values:
+                        definitions.append({"Name": name, "Unit": datum.get("Unit", "None")})
+                        values[name] = []
+                    values[name].append(datum["Value"])
+
+                doc = {
+                    "_aws": {
+                        "Timestamp": timestamp_ms,
+                        "CloudWatchMetrics": [{
+                            "Namespace": NAMESPACE,
+                            "Dimensions": [[n for n, _ in dims]],
+                            "Metrics": definitions,
+                        }],
+                    },
+                }
+                doc.update({n: v for n, v in dims})
+                doc.update({n: v[0] if len(v) == 1 else v for n, v in values.items()})
+                docs.append(doc)
+        return docs
+
+    def publish(self, metric_data: list):
+        docs = self.documents(metric_data)
+        for doc in docs:
+            print(json.dumps(doc), file=self.stream, flush=True)
+        logger.info(f"Wrote {len(metric_data)} metrics as {len(docs)} EMF documents")
+
+
+def get_sink(cloudwatch_client) -> MetricsSink:
+    if METRICS_SINK == "emf":
+        return EmfSink()
+    return PutMetricDataSink(cloudwatch_client)
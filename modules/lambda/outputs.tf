@@ -1,3 +1,7 @@
 output "lambda_name" {
   value = aws_lambda_function.this.function_name
 }
+
+output "state_events_lambda_name" {
+  value = var.state_cache ? aws_lambda_function.state_events[0].function_name : ""
+}
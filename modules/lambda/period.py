@@ -1,55 +1,190 @@
-from datetime import datetime, time, timedelta
+import calendar
+import threading
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 from utils import match_month, match_monthday, match_weekday
 
 
-def is_period_active(period: dict, tz: str) -> bool:
-    now = datetime.now(ZoneInfo(tz))
+# ================================
+# 🔹 COMPILED PERIODS
+# ================================
+# Period fields that affect evaluation; their values form the cache key
+PERIOD_FIELDS = ("Months", "MonthDays", "Weekdays", "BeginTime", "EndTime")
 
-    # Check Months
-    if period.get("Months") and not any(match_month(now, e.strip()) for e in period["Months"].split(",")):
-        return False
+# Compiled periods keyed by content, shared by warm invocations
+_compiled = {}
+_compiled_lock = threading.Lock()
 
-    # Check MonthDays
-    if period.get("MonthDays") and not any(match_monthday(now, e.strip()) for e in period["MonthDays"].split(",")):
-        return False
 
-    # Check Weekdays
-    if period.get("Weekdays") and not any(match_weekday(now, e.strip()) for e in period["Weekdays"].split(",")):
-        return False
+def split_exprs(value):
+    if not value:
+        return None
+    return tuple(e.strip() for e in value.split(","))
 
-    begin_t = end_t = None
-    if period.get("BeginTime"):
-        bh, bm = map(int, period["BeginTime"].split(":"))
-        begin_t = time(bh, bm)
-    if period.get("EndTime"):
-        eh, em = map(int, period["EndTime"].split(":"))
-        end_t = time(eh, em)
 
+def parse_minute(value):
+    if not value:
+        return None
+    h, m = map(int, value.split(":"))
+    return h * 60 + m
 
-    if begin_t and end_t:
-        if begin_t <= end_t:
 
-            return begin_t <= now.time() < end_t
-        else:
+class CompiledPeriod:
+    """
+    A period item parsed once into a month bitset, lazily built per-month
+    day bitsets (MonthDays & Weekdays) and minute-of-day bounds.
+    """
 
-            if now.time() >= begin_t:
+    __slots__ = ("key", "months", "monthdays", "weekdays", "begin", "end", "_day_masks")
 
+    def __init__(self, period: dict):
+        self.key = tuple(period.get(f) or None for f in PERIOD_FIELDS)
+
+        months = split_exprs(period.get("Months"))
+        self.months = None
+        if months:
+            probe = [datetime(2000, m, 1) for m in range(1, 13)]
+            self.months = sum(1 << d.month for d in probe if any(match_month(d, e) for e in months))
+
+        self.monthdays = split_exprs(period.get("MonthDays"))
+        self.weekdays = split_exprs(period.get("Weekdays"))
+        self.begin = parse_minute(period.get("BeginTime"))
+        self.end = parse_minute(period.get("EndTime"))
+        self._day_masks = {}
+
+    def day_mask(self, year: int, month: int) -> int:
+        """
+        Bit d is set when day d of the month satisfies MonthDays and Weekdays.
+        """
+        mask = self._day_masks.get((year, month))
+        if mask is None:
+            days = [datetime(year, month, d) for d in range(1, calendar.monthrange(year, month)[1] + 1)]
+            mask = 0
+            for day in days:
+                if self.monthdays and not any(match_monthday(day, e) for e in self.monthdays):
+                    continue
+                if self.weekdays and not any(match_weekday(day, e) for e in self.weekdays):
+                    continue
+                mask |= 1 << day.day
+            self._day_masks[(year, month)] = mask
+        return mask
+
+    def matches_day(self, now) -> bool:
+        if self.months is not None and not self.months >> now.month & 1:
+            return False
+        if self.monthdays is None and self.weekdays is None:
+            return True
+        return bool(self.day_mask(now.year, now.month) >> now.day & 1)
+
+    def is_active(self, now) -> bool:
+        if not self.matches_day(now):
+            return False
+
+        minute = now.hour * 60 + now.minute
+        begin, end = self.begin, self.end
+
+        if begin is not None and end is not None:
+            if begin <= end:
+                return begin <= minute < end
+            # Overnight window: the part after midnight belongs to yesterday's window
+            if minute >= begin:
                 return True
-            elif now.time() < end_t:
-
-                yesterday = now - timedelta(days=1)
-                if period.get("Weekdays") and not any(match_weekday(yesterday, e.strip()) for e in period["Weekdays"].split(",")):
-                    return False
-                if period.get("Months") and not any(match_month(yesterday, e.strip()) for e in period["Months"].split(",")):
-                    return False
-                if period.get("MonthDays") and not any(match_monthday(yesterday, e.strip()) for e in period["MonthDays"].split(",")):
-                    return False
-                return True
+            if minute < end:
+                return self.matches_day(now - timedelta(days=1))
+            return False
+
+        if begin is not None:
+            return minute >= begin
+        if end is not None:
+            return minute < end
+        return True
+
+
+def compile_period(period: dict) -> CompiledPeriod:
+    key = tuple(period.get(f) or None for f in PERIOD_FIELDS)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = CompiledPeriod(period)
+        with _compiled_lock:
+            compiled = _compiled.setdefault(key, compiled)
+    return compiled
+
+
+# ================================
+# 🔹 EVALUATION
+# ================================
+class PeriodEvaluator:
+    """
+    Per-invocation evaluation cache: one shared "now" per timezone and
+    one answer per (period, timezone) pair or (period set, timezone)
+    transition lookup.
+    """
+
+    def __init__(self, now: datetime = None):
+        self.utc_now = now or datetime.now(timezone.utc)
+        self._local = {}
+        self._results = {}
+        self._transitions = {}
+
+    def local_now(self, tz: str) -> datetime:
+        local = self._local.get(tz)
+        if local is None:
+            local = self._local[tz] = self.utc_now.astimezone(ZoneInfo(tz))
+        return local
+
+    def is_active(self, period: dict, tz: str) -> bool:
+        compiled = compile_period(period)
+        result = self._results.get((compiled.key, tz))
+        if result is None:
+            result = self._results[(compiled.key, tz)] = compiled.is_active(self.local_now(tz))
+        return result
+
+    def next_transition(self, periods: list, tz: str):
+        compiled = [compile_period(p) for p in periods]
+        key = (tuple(c.key for c in compiled), tz)
+        if key not in self._transitions:
+            self._transitions[key] = next_transition(periods, tz, self.utc_now)
+        return self._transitions[key]
+
+
+def schedule_period_names(sched: dict) -> list:
+    return [p.strip() for p in sched.get("Periods", "").split(",") if p.strip()]
+
+
+def is_period_active(period: dict, tz: str, evaluator: PeriodEvaluator = None) -> bool:
+    if evaluator is None:
+        evaluator = PeriodEvaluator()
+    return evaluator.is_active(period, tz)
+
+
+# ================================
+# 🔹 TRANSITIONS
+# ================================
+def next_transition(periods: list, tz: str, after: datetime = None, horizon_days: int = 366):
+    """
+    Return the next time (aware, UTC) at which "any period active" changes
+    for the given periods in timezone tz, or None within the horizon.
+    Activity can only change at midnight or at a BeginTime/EndTime minute,
+    so only those candidate instants are evaluated.
+    """
+    compiled = [compile_period(p) for p in periods]
+    zone = ZoneInfo(tz)
+    start = (after or datetime.now(timezone.utc)).astimezone(zone)
+
+    def active_at(moment):
+        return any(c.is_active(moment) for c in compiled)
+
+    current = active_at(start)
+    minutes = sorted({0} | {m for c in compiled for m in (c.begin, c.end) if m is not None})
 
-    if begin_t and not end_t:
-        return now.time() >= begin_t
-    if end_t and not begin_t:
-        return now.time() < end_t
+    day = start.date()
+    for _ in range(horizon_days + 1):
+        for minute in minutes:
+            moment = datetime(day.year, day.month, day.day, minute // 60, minute % 60, tzinfo=zone)
+            if moment <= start:
+                continue
+            if active_at(moment) != current:
+                return moment.astimezone(timezone.utc)
+        day += timedelta(days=1)
 
-    return True
+    return None
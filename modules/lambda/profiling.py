@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from actions import THROTTLE_CODES
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Also publish phase durations and API call counts as scheduler metrics
+PROFILE_METRICS = os.environ.get("PROFILE_METRICS", "false").lower() == "true"
+
+# Profiler receiving botocore events for the current invocation (None = not recording)
+_active = {"profiler": None}
+
+
+# ================================
+# 🔹 PROFILER
+# ================================
+class Profiler:
+    """
+    Per-invocation timings: wall time per handler phase, and calls,
+    retries, throttles, errors, circuit rejections and latency per
+    "service.Operation".
+    API stats come from botocore event hooks on clients passed to instrument().
+    """
+
+    def __init__(self):
+        self.parent = None
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.api = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time a block; a phase entered several times accumulates.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def _stats(self, operation: str) -> dict:
+        stats = self.api.get(operation)
+        if stats is None:
+            stats = self.api[operation] = {
+                "calls": 0, "retries": 0, "throttles": 0, "errors": 0, "rejected": 0, "ms": 0.0,
+            }
+        return stats
+
+    def record_call(self, operation: str, elapsed_ms: float, retries: int, error: bool):
+        with self._lock:
+            stats = self._stats(operation)
+            stats["calls"] += 1
+            stats["retries"] += retries
+            stats["ms"] += elapsed_ms
+            if error:
+                stats["errors"] += 1
+
+    def record_throttle(self, operation: str):
+        with self._lock:
+            self._stats(operation)["throttles"] += 1
+
+    def record_rejection(self, operation: str):
+        # Call never sent: its circuit was open (resilience.py)
+        with self._lock:
+            self._stats(operation)["rejected"] += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            api = {
+                op: dict(s, ms=round(s["ms"], 1), avg_ms=round(s["ms"] / s["calls"], 1) if s["calls"] else 0.0)
+                for op, s in sorted(self.api.items())
+            }
+            return {
+                "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+                "phases": {name: round(ms, 1) for name, ms in self.phases.items()},
+                "api": api,
+                "api_calls": sum(s["calls"] for s in api.values()),
+                "api_rejected": sum(s["rejected"] for s in api.values()),
+                "api_ms": round(sum(s["ms"] for s in api.values()), 1),
+            }
+
+    def log_summary(self, summary: dict = None):
+        """
+        One structured line per invocation, easy to query with Logs Insights.
+        """
+        logger.info(json.dumps({"profile": summary or self.summary()}))
+
+    def metric_data(self, summary: dict = None) -> list:
+        """
+        Self-metrics in PutMetricData shape, for the scheduler's metrics sink.
+        """
+        summary = summary or self.summary()
+        data = [{
+            "MetricName": "PhaseDuration",
+            "Dimensions": [{"Name": "Phase", "Value": name}],
+            "Value": ms,
+            "Unit": "Milliseconds"
+        } for name, ms in summary["phases"].items()]
+
+        for operation, stats in summary["api"].items():
+            dims = [{"Name": "Operation", "Value": operation}]
+            if stats["calls"]:
+                data.append({"MetricName": "ApiCalls", "Dimensions": dims, "Value": stats["calls"], "Unit": "Count"})
+                data.append({"MetricName": "ApiLatency", "Dimensions": dims, "Value": stats["avg_ms"], "Unit": "Milliseconds"})
+            if stats["retries"]:
+                data.append({"MetricName": "ApiRetries", "Dimensions": dims, "Value": stats["retries"], "Unit": "Count"})
+            if stats["throttles"]:
+                data.append({"MetricName": "ApiThrottles", "Dimensions": dims, "Value": stats["throttles"], "Unit": "Count"})
+            if stats["rejected"]:
+                data.append({"MetricName": "ApiRejections", "Dimensions": dims, "Value": stats["rejected"], "Unit": "Count"})
+        return data
+
+
+def start() -> Profiler:
+    """
+    New profiler for this invocation; instrumented clients report to it.
+    A handler run inline by another (shards.LocalInvoker) nests inside it.
+    """
+    profiler = Profiler()
+    profiler.parent = _active["profiler"]
+    _active["profiler"] = profiler
+    return profiler
+
+
+def stop(profiler: Profiler = None):
+    _active["profiler"] = profiler.parent if profiler is not None else None
+
+
+# ================================
+# 🔹 BOTOCORE HOOKS
+# ================================
+def _operation(event_name: str) -> str:
+    # "before-call.ec2.DescribeInstances" -> "ec2.DescribeInstances"
+    return event_name.split(".", 1)[1]
+
+
+def _before_call(event_name=None, context=None, **kwargs):
+    if context is not None:
+        context["profile_started"] = time.perf_counter()
+
+
+def _after_call(event_name=None, context=None, **kwargs):
+    _finish(event_name, context, error=False)
+
+
+def _after_call_error(event_name=None, context=None, **kwargs):
+    _finish(event_name, context, error=True)
+
+
+def _finish(event_name: str, context: dict, error: bool):
+    profiler = _active["profiler"]
+    context = context or {}
+    started = context.pop("profile_started", None)
+    attempts = context.pop("profile_attempts", 1)
+    if profiler is None or started is None:
+        return
+    profiler.record_call(_operation(event_name), (time.perf_counter() - started) * 1000, attempts - 1, error)
+
+
+def record_rejection(operation: str):
+    """
+    Count a call rejected before it was sent; the botocore hooks never see it finish.
+    """
+    profiler = _active["profiler"]
+    if profiler is not None:
+        profiler.record_rejection(operation)
+
+
+def _needs_retry(event_name=None, response=None, attempts=None, request_dict=None, **kwargs):
+    """
+    Sees every attempt of a call: remembers the attempt number for the
+    retry count and counts throttled attempts. Always returns None, so the
+    client's own retry handler keeps deciding whether to retry.
+    """
+    context = (request_dict or {}).get("context")
+    if context is not None and attempts:
+        context["profile_attempts"] = attempts
+
+    profiler = _active["profiler"]
+    if profiler is None or response is None:
+        return None
+    code = ((response[1] or {}).get("Error") or {}).get("Code")
+    if code in THROTTLE_CODES:
+        profiler.record_throttle(_operation(event_name))
+    return None
+
+
+def instrument(client):
+    """
+    Register the profiling hooks on a boto3 client (or resource) once.
+    resilience.protect() calls this first, so these hooks run ahead of the
+    ones that may raise and see every attempt. Objects without a botocore
+    event system are left alone.
+    """
+    botocore_client = getattr(getattr(client, "meta", None), "client", client)
+    events = getattr(getattr(botocore_client, "meta", None), "events", None)
+    if events is None or getattr(botocore_client, "_profiled", False):
+        return client
+
+    events.register("before-call.*.*", _before_call, unique_id="profile-before-call")
+    events.register("after-call.*.*", _after_call, unique_id="profile-after-call")
+    events.register("after-call-error.*.*", _after_call_error, unique_id="profile-after-call-error")
+    events.register_first("needs-retry.*.*", _needs_retry, unique_id="profile-needs-retry")
+    botocore_client._profiled = True
+    return client
@@ -0,0 +1,213 @@
+import logging
+import os
+import threading
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Companion table for per-resource scheduler state (empty = in-memory only)
+STATE_TABLE_NAME = os.environ.get("STATE_TABLE_NAME", "")
+
+# How often EventBridge runs the scheduler (rate(5 minutes) in main.tf)
+RUN_INTERVAL_SECONDS = int(os.environ.get("RUN_INTERVAL_SECONDS", "300"))
+
+# An action issued less than this long ago is not re-issued; longer than one
+# run interval, so the next run leaves a resource still picking it up alone
+ACTION_COOLDOWN_SECONDS = int(os.environ.get("ACTION_COOLDOWN_SECONDS", str(RUN_INTERVAL_SECONDS * 3 // 2)))
+
+# A resource still converging this long after our action is reported as stuck
+STUCK_AFTER_SECONDS = int(os.environ.get("STUCK_AFTER_SECONDS", "1800"))
+
+# Ledger entries expire (DynamoDB TTL) after this long
+LEDGER_TTL_SECONDS = 86400
+
+# Observed states from which the scheduler can act
+STABLE_STATES = {
+    "ec2": {"running": True, "stopped": False},
+    "rds": {"available": True, "stopped": False},
+}
+
+# Observed states the scheduler never acts on or counts
+IGNORED_STATES = {
+    "ec2": {"shutting-down", "terminated"},
+    "rds": {"deleting"},
+}
+
+# Warm-container copy of the action ledger: resource_id -> {"Action", "IssuedAt"}
+_ledger = {}
+
+
+def forget_ledger():
+    """
+    Drop the warm copy of the ledger; entries are read again from the table.
+    """
+    _ledger.clear()
+
+
+# ================================
+# 🔹 RECONCILER
+# ================================
+class Reconciler:
+    """
+    Compares desired state (schedule active or not) with the observed state
+    in the inventory snapshot and decides the single action, if any, per
+    resource. Issued actions are recorded with a timestamp so resources that
+    are still converging are neither actioned again nor re-described, and
+    resources stuck in a transition are reported. Starts seen through to
+    running/available are reported to the boot latency tracker, if any.
+    """
+
+    def __init__(self, now_epoch: int, dynamodb=None, table_name: str = None, boot=None):
+        self.now = now_epoch
+        self.dynamodb = dynamodb
+        self.table_name = STATE_TABLE_NAME if table_name is None else table_name
+        self.boot = boot
+        self.converged = 0
+        self.converging = 0
+        self.stuck = []
+        self.issued = {}
+        self.cleared = []
+        self._lock = threading.Lock()
+
+    def prefetch(self, resource_ids: list):
+        """
+        Load ledger entries, in batches: of resources that are not converged,
+        and of those that may just have finished booting (boot latency).
+        """
+        missing = [i for i in resource_ids if i not in _ledger]
+        if not missing or not self.dynamodb or not self.table_name:
+            return
+
+        try:
+            for i in range(0, len(missing), 100):
+                request = {self.table_name: {"Keys": [{"ResourceId": r} for r in missing[i:i + 100]]}}
+                while request:
+                    resp = self.dynamodb.batch_get_item(RequestItems=request)
+                    for item in resp["Responses"].get(self.table_name, []):
+                        if "Action" in item:
+                            _ledger[item["ResourceId"]] = {"Action": item["Action"], "IssuedAt": int(item["IssuedAt"])}
+                    request = resp.get("UnprocessedKeys")
+        except Exception as e:
+            logger.error(f"[Reconcile] Failed to load action ledger: {e}")
+
+    def decide(self, kind: str, resource_id: str, observed: str, active: bool, resource_class: str = None):
+        """
+        Return "start", "stop" or None for one resource.
+        """
+        if observed in IGNORED_STATES[kind]:
+            return None
+
+        desired = "start" if active else "stop"
+        stable = STABLE_STATES[kind]
+        entry = _ledger.get(resource_id)
+        age = self.now - entry["IssuedAt"] if entry else None
+
+        with self._lock:
+            if observed in stable and stable[observed] == active:
+                self.converged += 1
+                _ledger.pop(resource_id, None)
+                if entry:
+                    self.cleared.append(resource_id)
+                if entry and entry["Action"] == "start" and active and self.boot is not None and resource_class:
+                    self.boot.observe(kind, resource_class, entry["IssuedAt"])
+                return None
+
+            if observed not in stable:
+                if entry and entry["Action"] == desired and age >= STUCK_AFTER_SECONDS:
+                    self.stuck.append(resource_id)
+                else:
+                    self.converging += 1
+                return None
+
+            if entry and entry["Action"] == desired and age < ACTION_COOLDOWN_SECONDS:
+                self.converging += 1
+                return None
+
+        return desired
+
+    def record(self, resource_id: str, action: str):
+        with self._lock:
+            entry = {"Action": action, "IssuedAt": self.now}
+            _ledger[resource_id] = entry
+            self.issued[resource_id] = entry
+
+    def flush(self):
+        """
+        Persist this run's issued actions and drop the entries of converged
+        resources, with one batched writer. A boot is then observed once,
+        whichever container runs next.
+        """
+        if not (self.issued or self.cleared) or not self.dynamodb or not self.table_name:
+            return
+        try:
+            with self.dynamodb.Table(self.table_name).batch_writer() as batch:
+                for resource_id in self.cleared:
+                    batch.delete_item(Key={"ResourceId": resource_id})
+                for resource_id, entry in self.issued.items():
+                    batch.put_item(Item={
+                        "ResourceId": resource_id,
+                        "Action": entry["Action"],
+                        "IssuedAt": entry["IssuedAt"],
+                        "ExpiresAt": entry["IssuedAt"] + LEDGER_TTL_SECONDS,
+                    })
+        except Exception as e:
+            logger.error(f"[Reconcile] Failed to save action ledger: {e}")
+
+    def summary(self) -> dict:
+        return {
+            "converged": self.converged,
+            "converging": self.converging,
+            "stuck": sorted(self.stuck),
+            "issued": len(self.issued),
+        }
+
+    def log_summary(self):
+        summary = self.summary()
+        logger.info(
+            f"[Reconcile] converged={summary['converged']}, converging={summary['converging']}, "
+            f"issued={summary['issued']}, stuck={len(summary['stuck'])}"
+        )
+        if summary["stuck"]:
+            logger.warning(f"[Reconcile] Resources stuck in transition for over {STUCK_AFTER_SECONDS}s: {summary['stuck']}")
+
+
+def pending_resources(snapshot, desired: dict) -> list:
+    """
+    IDs whose observed state does not already match the desired state
+    (tag value -> active). These are the only ones that need a ledger lookup.
+    """
+    ids = []
+    for tag_value, active in desired.items():
+        for instance in snapshot.ec2_group(tag_value):
+            state = instance.state
+            if state not in IGNORED_STATES["ec2"] and STABLE_STATES["ec2"].get(state) != active:
+                ids.append(instance.instance_id)
+        for db in snapshot.rds_group(tag_value):
+            status = db.status
+            if status not in IGNORED_STATES["rds"] and STABLE_STATES["rds"].get(status) != active:
+                ids.append(db.arn)
+    return ids
+
+
+def booted_resources(snapshot, starting: dict, since: int) -> list:
+    """
+    IDs that are up in tag values meant to run (tag value -> True), and
+    may have been started by us recently: EC2 launched since `since`, and
+    every available RDS (describe gives no start time). Their ledger entry,
+    if any, times the boot.
+    """
+    ids = []
+    for tag_value, start in starting.items():
+        if not start:
+            continue
+        for instance in snapshot.ec2_group(tag_value):
+            if instance.state == "running" and (instance.launched_at is None or instance.launched_at >= since):
+                ids.append(instance.instance_id)
+        for db in snapshot.rds_group(tag_value):
+            if db.status == "available":
+                ids.append(db.arn)
+    return ids
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import time
+from functools import partial
+from botocore.exceptions import ClientError
+from actions import THROTTLE_CODES
+from profiling import instrument, record_rejection
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Botocore retry mode and total attempts per call. "adaptive" adds client-side
+# rate limiting on top of the jittered exponential backoff of "standard".
+RETRY_MODE = os.environ.get("RETRY_MODE", "adaptive")
+MAX_ATTEMPTS = int(os.environ.get("MAX_ATTEMPTS", "5"))
+
+# Retries allowed across all calls of one invocation; once spent, calls fail on their first error
+RETRY_BUDGET = int(os.environ.get("RETRY_BUDGET", "50"))
+
+# Throttled attempts in a row that open an operation's circuit, and how long it stays open
+CIRCUIT_THRESHOLD = int(os.environ.get("CIRCUIT_THRESHOLD", "5"))
+CIRCUIT_OPEN_SECONDS = float(os.environ.get("CIRCUIT_OPEN_SECONDS", "60"))
+
+
+class CircuitOpenError(ClientError):
+    """
+    Raised instead of calling an operation whose circuit is open.
+    """
+
+    def __init__(self, operation: str):
+        super().__init__(
+            {"Error": {"Code": "CircuitOpen", "Message": f"{operation} is throttling, calls paused"}},
+            operation.split(".", 1)[-1],
+        )
+
+
+# ================================
+# 🔹 CIRCUIT BREAKERS
+# ================================
+class CircuitBreaker:
+    """
+    Breaker of one operation in one target (role, region), so a throttled
+    account or region leaves the others alone. Opens after CIRCUIT_THRESHOLD throttled attempts
+    in a row, rejects calls while open, then lets a single trial call through
+    (half-open): success closes it, another throttle re-opens it.
+    Kept across warm invocations, so a run starts where the last one left off.
+    """
+
+    __slots__ = ("throttles", "opened_at", "trial")
+
+    def __init__(self):
+        self.throttles = 0
+        self.opened_at = None
+        self.trial = False
+
+    def allow(self, now: float) -> bool:
+        if self.opened_at is None:
+            return True
+        if now - self.opened_at < CIRCUIT_OPEN_SECONDS or self.trial:
+            return False
+        self.trial = True
+        return True
+
+    def on_success(self):
+        self.throttles = 0
+        self.opened_at = None
+        self.trial = False
+
+    def on_throttle(self, now: float) -> bool:
+        """
+        Record one throttled attempt; True when this opens (or re-opens) the circuit.
+        """
+        self.throttles += 1
+        if self.trial or (self.opened_at is None and self.throttles >= CIRCUIT_THRESHOLD):
+            self.opened_at = now
+            self.trial = False
+            return True
+        return False
+
+
+# Scope of clients in the Lambda's own account and region
+HOME_SCOPE = ("", "")
+
+_breakers = {}  # ((role_arn, region), "service.Operation") -> CircuitBreaker
+_budget = {"left": RETRY_BUDGET, "used": 0, "rejected": 0, "exhausted": 0}
+_lock = threading.Lock()
+
+
+def breaker(operation: str, scope: tuple = HOME_SCOPE) -> CircuitBreaker:
+    key = (scope, operation)
+    cb = _breakers.get(key)
+    if cb is None:
+        cb = _breakers.setdefault(key, CircuitBreaker())
+    return cb
+
+
+def scope_label(scope: tuple) -> str:
+    # "account/region", as in Target.label
+    role_arn, region = scope
+    account = role_arn.split(":")[4] if role_arn else "self"
+    return f"{account}/{region or 'default'}"
+
+
+def start_invocation(budget: int = None):
+    """
+    Reset the per-invocation retry budget and counters; breakers carry over.
+    """
+    with _lock:
+        _budget.update(left=RETRY_BUDGET if budget is None else budget, used=0, rejected=0, exhausted=0)
+
+
+def open_circuits(now: float = None) -> list:
+    now = time.monotonic() if now is None else now
+    return sorted(f"{op} in {scope_label(scope)}" for (scope, op), cb in _breakers.items()
+                  if cb.opened_at is not None and now - cb.opened_at < CIRCUIT_OPEN_SECONDS)
+
+
+def summary() -> dict:
+    with _lock:
+        return {
+            "retries_used": _budget["used"],
+            "retry_budget_left": _budget["left"],
+            "unretried_calls": _budget["exhausted"],
+            "short_circuited_calls": _budget["rejected"],
+            "open_circuits": open_circuits(),
+        }
+
+
+# ================================
+# 🔹 BOTOCORE HOOKS
+# ================================
+def _operation(event_name: str) -> str:
+    # "needs-retry.ec2.StartInstances" -> "ec2.StartInstances"
+    return event_name.split(".", 1)[1]
+
+
+def _before_call(event_name=None, scope=HOME_SCOPE, **kwargs):
+    """
+    Reject calls to an operation whose circuit is open, without sending them.
+    """
+    operation = _operation(event_name)
+    with _lock:
+        if breaker(operation, scope).allow(time.monotonic()):
+            return None
+        _budget["rejected"] += 1
+    record_rejection(operation)
+    raise CircuitOpenError(operation)
+
+
+def _after_call(event_name=None, parsed=None, scope=HOME_SCOPE, **kwargs):
+    """
+    Any answer other than a throttle means the API is serving: close the circuit.
+    """
+    code = (((parsed or {}).get("Error")) or {}).get("Code")
+    if code in THROTTLE_CODES:
+        return
+    with _lock:
+        breaker(_operation(event_name), scope).on_success()
+
+
+def _after_call_error(event_name=None, scope=HOME_SCOPE, **kwargs):
+    # A failed half-open trial (e.g. connection error) re-opens the circuit
+    with _lock:
+        cb = breaker(_operation(event_name), scope)
+        if cb.trial:
+            cb.opened_at = time.monotonic()
+            cb.trial = False
+
+
+def _needs_retry(event_name=None, response=None, caught_exception=None, attempts=None,
+                 operation=None, scope=HOME_SCOPE, **kwargs):
+    """
+    Runs before botocore's own retry handler on every attempt. Throttles feed
+    the breaker; a retryable error with no budget left (or an open circuit)
+    is raised as-is instead of being retried. Returns None otherwise, so
+    botocore's retry mode keeps the backoff, jitter and adaptive rate.
+    """
+    op = _operation(event_name)
+    parsed, status = None, None
+    if response is not None:
+        http, parsed = response
+        status = getattr(http, "status_code", None)
+    elif caught_exception is None:
+        return None
+
+    code = ((parsed or {}).get("Error") or {}).get("Code")
+    throttled = code in THROTTLE_CODES
+    retryable = throttled or caught_exception is not None or (status is not None and status >= 500)
+    if not retryable:
+        return None
+
+    with _lock:
+        opened = throttled and breaker(op, scope).on_throttle(time.monotonic())
+        if opened:
+            logger.warning(f"[Resilience] Circuit opened for {op} in {scope_label(scope)} after repeated throttling")
+        if (attempts or 1) >= MAX_ATTEMPTS:
+            # Botocore gives up on its own after this attempt
+            return None
+        if opened or _budget["left"] <= 0:
+            _budget["exhausted"] += 1
+            give_up = True
+        else:
+            _budget["left"] -= 1
+            _budget["used"] += 1
+            give_up = False
+
+    if not give_up:
+        return None
+    if caught_exception is not None:
+        raise caught_exception
+    raise ClientError(parsed, operation.name if operation is not None else op.split(".", 1)[-1])
+
+
+def protect(client, scope: tuple = HOME_SCOPE):
+    """
+    Register the breaker and retry-budget hooks on a boto3 client (or resource) once.
+    scope is the client's target key (role ARN or "", region or ""): breakers
+    are kept per scope and operation. The profiling hooks are registered
+    first, so they still see the attempts these hooks give up on. Objects
+    without a botocore event system are left alone.
+    """
+    botocore_client = getattr(getattr(client, "meta", None), "client", client)
+    events = getattr(getattr(botocore_client, "meta", None), "events", None)
+    if events is None or getattr(botocore_client, "_protected", False):
+        return client
+    instrument(client)
+
+    # Each client has its own copy of the event system, so the scope can be bound per client
+    events.register("before-call.*.*", partial(_before_call, scope=scope), unique_id="resilience-before-call")
+    events.register("after-call.*.*", partial(_after_call, scope=scope), unique_id="resilience-after-call")
+    events.register("after-call-error.*.*", partial(_after_call_error, scope=scope),
+                    unique_id="resilience-after-call-error")
+    events.register_first("needs-retry.*.*", partial(_needs_retry, scope=scope), unique_id="resilience-needs-retry")
+    botocore_client._protected = True
+    return client
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import logging
+import os
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Skip EC2/RDS work when no schedule changes state between runs
+SKIP_WHEN_IDLE = os.environ.get("SKIP_WHEN_IDLE", "false").lower() == "true"
+
+# Even when idle, do a full run at least this often to correct drift
+DRIFT_SWEEP_MINUTES = int(os.environ.get("DRIFT_SWEEP_MINUTES", "60"))
+
+# Item in the config table that remembers the last full run
+STATE_ITEM_NAME = "__scheduler_state__"
+STATE_ITEM_TYPE = "state"
+
+
+def config_fingerprint(periods: dict, schedules: list) -> str:
+    """
+    Stable hash of the loaded config, so a config edit forces a full run.
+    """
+    payload = json.dumps([periods, schedules], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_run_state(table) -> dict:
+    try:
+        return table.get_item(Key={"Name": STATE_ITEM_NAME}).get("Item") or {}
+    except Exception as e:
+        logger.error(f"[State] Failed to read run state: {e}")
+        return {}
+
+
+def should_skip(state: dict, fingerprint: str, now_epoch: int) -> bool:
+    """
+    A run can be skipped when the config is unchanged, the earliest schedule
+    transition recorded by the last full run is still in the future and the
+    drift-correction sweep is not yet due.
+    """
+    if not state or state.get("ConfigHash") != fingerprint:
+        return False
+    if now_epoch >= int(state.get("NextTransition", 0)):
+        return False
+    return now_epoch - int(state.get("LastSweep", 0)) < DRIFT_SWEEP_MINUTES * 60
+
+
+def save_run_state(table, fingerprint: str, next_transition_epoch: int, now_epoch: int):
+    try:
+        table.put_item(Item={
+            "Name": STATE_ITEM_NAME,
+            "Type": STATE_ITEM_TYPE,
+            "ConfigHash": fingerprint,
+            "NextTransition": next_transition_epoch,
+            "LastSweep": now_epoch,
+        })
+    except Exception as e:
+        logger.error(f"[State] Failed to save run state: {e}")
@@ -0,0 +1,126 @@
+import logging
+import threading
+from reconcile import STATE_TABLE_NAME
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Key prefix separating savings records from ledger items in the state table
+KEY_PREFIX = "savings#"
+LAST_RUN_KEY = KEY_PREFIX + "__last_run__"
+
+# Warm-container copy: resource_id -> (stopped, since_epoch)
+_records = {}
+_last_run = {}  # last-run marker key -> epoch
+
+
+def sync_last_run(dynamodb, last_run_key: str, table_name: str = None) -> bool:
+    """
+    Re-read one last-run marker. True when another container has run since
+    this one last did; the warm per-resource records are then dropped.
+    """
+    table_name = STATE_TABLE_NAME if table_name is None else table_name
+    if not dynamodb or not table_name:
+        return False
+    try:
+        item = dynamodb.Table(table_name).get_item(Key={"ResourceId": last_run_key}).get("Item")
+    except Exception as e:
+        logger.error(f"[Savings] Failed to read last run marker: {e}")
+        return False
+
+    stored = int(item["Since"]) if item else None
+    stale = last_run_key in _last_run and _last_run[last_run_key] != stored
+    if stale:
+        _records.clear()
+    if stored is not None:
+        _last_run[last_run_key] = stored
+    return stale
+
+
+# ================================
+# 🔹 ACCUMULATOR
+# ================================
+class SavingsAccumulator:
+    """
+    Tracks, per resource, whether it is stopped and since when. Saved hours
+    for a run are the real time each resource spent stopped since the
+    previous run, whatever the invocation frequency. Only state changes and
+    the last-run marker are written back, with a batched writer.
+    """
+
+    def __init__(self, now_epoch: int, dynamodb=None, table_name: str = None, last_run_key: str = None):
+        self.now = now_epoch
+        self.dynamodb = dynamodb
+        self.table_name = STATE_TABLE_NAME if table_name is None else table_name
+        # Each shard of a sharded run keeps its own previous-run time
+        self.last_run_key = last_run_key or LAST_RUN_KEY
+        self.changed = {}
+        self._lock = threading.Lock()
+
+    @property
+    def persistent(self) -> bool:
+        return bool(self.dynamodb and self.table_name)
+
+    def load(self, resource_ids: list):
+        """
+        Batch-read records missing from the warm cache, plus the last-run marker.
+        """
+        if not self.persistent:
+            return
+
+        keys = [KEY_PREFIX + i for i in resource_ids if i not in _records]
+        if self.last_run_key not in _last_run:
+            keys.append(self.last_run_key)
+
+        try:
+            for i in range(0, len(keys), 100):
+                request = {self.table_name: {"Keys": [{"ResourceId": k} for k in keys[i:i + 100]]}}
+                while request:
+                    resp = self.dynamodb.batch_get_item(RequestItems=request)
+                    for item in resp["Responses"].get(self.table_name, []):
+                        key = item["ResourceId"]
+                        if key == self.last_run_key:
+                            _last_run[key] = int(item["Since"])
+                        else:
+                            _records[key[len(KEY_PREFIX):]] = (bool(item["Stopped"]), int(item["Since"]))
+                    request = resp.get("UnprocessedKeys")
+        except Exception as e:
+            logger.error(f"[Savings] Failed to load savings state: {e}")
+
+    def observe(self, resource_id: str, stopped: bool, stopped_at: int = None) -> float:
+        """
+        Record the current state of one resource and return the hours it
+        spent stopped since the previous run.
+        """
+        last_run = _last_run.get(self.last_run_key)
+        previous = _records.get(resource_id)
+
+        if previous is None or previous[0] != stopped:
+            since = self.now
+            if stopped and stopped_at is not None and stopped_at <= self.now:
+                since = stopped_at
+            with self._lock:
+                _records[resource_id] = (stopped, since)
+                self.changed[resource_id] = (stopped, since)
+        else:
+            since = previous[1]
+
+        if not stopped or last_run is None:
+            return 0.0
+        return max(0, self.now - max(since, last_run)) / 3600.0
+
+    def flush(self):
+        _last_run[self.last_run_key] = self.now
+        if not self.persistent:
+            return
+        try:
+            with self.dynamodb.Table(self.table_name).batch_writer() as batch:
+                for resource_id, (stopped, since) in self.changed.items():
+                    batch.put_item(Item={"ResourceId": KEY_PREFIX + resource_id, "Stopped": stopped, "Since": since})
+                batch.put_item(Item={"ResourceId": self.last_run_key, "Since": self.now})
+        except Exception as e:
+            logger.error(f"[Savings] Failed to save savings state: {e}")
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from reconcile import STATE_TABLE_NAME
+from targets import get_client
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Split schedules across this many worker invocations (1 = one run does everything)
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", "1"))
+
+# Function the coordinator invokes for each shard (default: this function)
+WORKER_FUNCTION_NAME = os.environ.get("WORKER_FUNCTION_NAME", os.environ.get("AWS_LAMBDA_FUNCTION_NAME", ""))
+
+# How long the coordinator waits for worker summaries, and how often it checks
+SHARD_WAIT_SECONDS = float(os.environ.get("SHARD_WAIT_SECONDS", "60"))
+SHARD_POLL_SECONDS = float(os.environ.get("SHARD_POLL_SECONDS", "2"))
+
+# Worker summaries live in the state table under this prefix, briefly
+KEY_PREFIX = "shard#"
+SUMMARY_TTL_SECONDS = 3600
+
+# Invoker used by the coordinator; replaced by a LocalInvoker in local runs
+_invoker = {"invoker": None}
+
+
+def shard_of(name: str, count: int) -> int:
+    """
+    Stable shard of a schedule: the same name always lands in the same
+    shard, whatever the container or Python hash seed.
+    """
+    if count <= 1:
+        return 0
+    return int(hashlib.sha1(name.encode()).hexdigest()[:8], 16) % count
+
+
+def shard_schedules(schedules: list, index: int, count: int) -> list:
+    return [s for s in schedules if shard_of(s.get("Name", "UNKNOWN"), count) == index]
+
+
+def shard_request(event):
+    """
+    (run_id, index, count) when the event is a coordinator's shard request, else None.
+    """
+    if isinstance(event, dict) and "shard" in event and "shards" in event:
+        return event.get("run", ""), int(event["shard"]), int(event["shards"])
+    return None
+
+
+def new_run_id(context=None) -> str:
+    return getattr(context, "aws_request_id", None) or uuid.uuid4().hex
+
+
+# ================================
+# 🔹 INVOKERS
+# ================================
+class LambdaInvoker:
+    """
+    Fire-and-forget worker invocations (InvocationType=Event).
+    """
+
+    def __init__(self, function_name: str = None):
+        self.function_name = function_name or WORKER_FUNCTION_NAME
+
+    def invoke(self, payload: dict):
+        get_client("lambda").invoke(
+            FunctionName=self.function_name,
+            InvocationType="Event",
+            Payload=json.dumps(payload).encode(),
+        )
+
+
+class LocalInvoker:
+    """
+    In-process stand-in for LambdaInvoker: runs the handler inline, one
+    shard after another, for local runs and the bench.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.responses = []
+
+    def invoke(self, payload: dict):
+        self.responses.append(self.handler(dict(payload), None))
+
+
+def get_invoker():
+    if _invoker["invoker"] is None:
+        _invoker["invoker"] = LambdaInvoker()
+    return _invoker["invoker"]
+
+
+def set_invoker(invoker):
+    _invoker["invoker"] = invoker
+
+
+# ================================
+# 🔹 WORKER SUMMARIES
+# ================================
+def summary_key(run_id: str, index: int) -> str:
+    return f"{KEY_PREFIX}{run_id}#{index}"
+
+
+def save_summary(dynamodb, run_id: str, index: int, summary: dict, now_epoch: int):
+    """
+    Leave a worker's summary where the coordinator polls for it.
+    Stored as JSON: metric values are floats, which DynamoDB items reject.
+    """
+    dynamodb.Table(STATE_TABLE_NAME).put_item(Item={
+        "ResourceId": summary_key(run_id, index),
+        "Summary": json.dumps(summary, default=str),
+        "ExpiresAt": now_epoch + SUMMARY_TTL_SECONDS,
+    })
+
+
+def collect_summaries(dynamodb, run_id: str, shards: list, deadline: float, heartbeat=None) -> dict:
+    """
+    shard index -> worker summary, polling with batched reads until every
+    shard has reported or the deadline passes. heartbeat() is called
+    between polls (lease renewal).
+    """
+    summaries = {}
+    while True:
+        keys = [{"ResourceId": summary_key(run_id, i)} for i in shards if i not in summaries]
+        for start in range(0, len(keys), 100):
+            request = {STATE_TABLE_NAME: {"Keys": keys[start:start + 100]}}
+            while request:
+                resp = dynamodb.batch_get_item(RequestItems=request)
+                for item in resp["Responses"].get(STATE_TABLE_NAME, []):
+                    index = int(item["ResourceId"].rsplit("#", 1)[1])
+                    summaries[index] = json.loads(item["Summary"])
+                request = resp.get("UnprocessedKeys")
+
+        if len(summaries) == len(shards) or time.monotonic() + SHARD_POLL_SECONDS > deadline:
+            return summaries
+        time.sleep(SHARD_POLL_SECONDS)
+        if heartbeat is not None:
+            heartbeat()
@@ -0,0 +1,280 @@
+import argparse
+import csv
+import json
+import sys
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from config import parse_bool
+from period import compile_period, schedule_period_names
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the simulator needs it
+    np = None
+
+
+# Minutes since the Unix epoch, the unit of the simulation grid
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Command-line help
+USAGE = """
+Evaluate every schedule over a date range on a fixed minute grid and project
+active (running) hours and savings per schedule.
+
+    python simulate.py --config items.json --start 2025-01-01 --end 2026-01-01 --step 5
+    python simulate.py --table ec2-rds-scheduler-table --rates rates.json --matrix active.npz
+"""
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("The schedule simulator needs NumPy: pip install numpy")
+
+
+def epoch_minutes(moment: datetime) -> int:
+    return int((moment - EPOCH).total_seconds() // 60)
+
+
+# ================================
+# 🔹 TIMEZONES
+# ================================
+def utc_offsets(tz: str, start: int, end: int) -> list:
+    """
+    [(from_minute, offset_minutes)] covering [start, end) in epoch minutes.
+    Offsets are sampled daily and each change is bisected to the exact minute.
+    """
+    zone = ZoneInfo(tz)
+
+    def offset_at(minute):
+        moment = EPOCH + timedelta(minutes=minute)
+        return int(moment.astimezone(zone).utcoffset().total_seconds() // 60)
+
+    changes = [(start, offset_at(start))]
+    probe = start
+    while probe < end:
+        step_end = min(probe + 1440, end)
+        if offset_at(step_end) != changes[-1][1]:
+            lo, hi = probe, step_end
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if offset_at(mid) == changes[-1][1]:
+                    lo = mid
+                else:
+                    hi = mid
+            changes.append((hi, offset_at(hi)))
+        probe = step_end
+    return changes
+
+
+class LocalGrid:
+    """
+    Local calendar day and minute-of-day of every grid point in one timezone.
+    """
+
+    __slots__ = ("day", "minute", "first_day", "days")
+
+    def __init__(self, grid, tz: str):
+        offsets = np.zeros(len(grid), dtype=np.int64)
+        for from_minute, offset in utc_offsets(tz, int(grid[0]), int(grid[-1]) + 1):
+            offsets[grid >= from_minute] = offset
+
+        local = grid + offsets
+        self.day = local // 1440
+        self.minute = local % 1440
+        # One spare day before the range for overnight windows
+        self.first_day = int(self.day[0]) - 1
+        self.days = [date(1970, 1, 1) + timedelta(days=d) for d in range(self.first_day, int(self.day[-1]) + 1)]
+
+
+# ================================
+# 🔹 SIMULATION
+# ================================
+class Simulator:
+    """
+    Evaluates schedules over the grid [start, end) with the Lambda's period
+    semantics (period.CompiledPeriod), applied once per local calendar day
+    and broadcast over the grid with NumPy. Timezones and DST are resolved
+    per grid point from the exact UTC offset. Day masks are computed once
+    per (period, timezone) and activity vectors once per (period set,
+    timezone), so thousands of schedules sharing periods cost little more
+    than one. Raises ValueError for an empty range or a step below 1 minute.
+    """
+
+    def __init__(self, start: datetime, end: datetime, step_minutes: int = 5):
+        require_numpy()
+        if step_minutes < 1:
+            raise ValueError(f"Simulation step must be at least 1 minute, got {step_minutes}")
+        if epoch_minutes(end) <= epoch_minutes(start):
+            raise ValueError(f"Empty simulation range: end {end.isoformat()} is not after start {start.isoformat()}")
+        self.step = step_minutes
+        self.start = epoch_minutes(start)
+        self.grid = np.arange(self.start, epoch_minutes(end), step_minutes, dtype=np.int64)
+        self._grids = {}
+        self._day_masks = {}
+        self._active = {}
+
+    def local_grid(self, tz: str) -> LocalGrid:
+        if tz not in self._grids:
+            self._grids[tz] = LocalGrid(self.grid, tz)
+        return self._grids[tz]
+
+    def day_mask(self, compiled, tz: str):
+        """
+        Months/MonthDays/Weekdays evaluated once per local day.
+        """
+        key = (compiled.key, tz)
+        mask = self._day_masks.get(key)
+        if mask is None:
+            days = self.local_grid(tz).days
+            mask = self._day_masks[key] = np.fromiter((compiled.matches_day(d) for d in days), bool, len(days))
+        return mask
+
+    def period_active(self, period: dict, tz: str):
+        compiled = compile_period(period)
+        local = self.local_grid(tz)
+        days = self.day_mask(compiled, tz)
+        index = local.day - local.first_day
+        today = days[index]
+        minute = local.minute
+        begin, end = compiled.begin, compiled.end
+
+        if begin is not None and end is not None:
+            if begin <= end:
+                return today & (minute >= begin) & (minute < end)
+            # Overnight window, as CompiledPeriod.is_active: the part after
+            # midnight needs both today's and yesterday's day to match
+            return today & ((minute >= begin) | (days[index - 1] & (minute < end)))
+        if begin is not None:
+            return today & (minute >= begin)
+        if end is not None:
+            return today & (minute < end)
+        return today
+
+    def schedule_active(self, sched: dict, periods: dict):
+        """
+        Boolean vector over the grid: any of the schedule's periods active.
+        A schedule naming an unknown period is never active, as in the Lambda.
+        """
+        tz = sched.get("Timezone", "UTC")
+        names = schedule_period_names(sched)
+        if any(n not in periods for n in names):
+            return np.zeros(len(self.grid), dtype=bool)
+
+        key = (tuple(compile_period(periods[n]).key for n in names), tz)
+        active = self._active.get(key)
+        if active is None:
+            active = np.zeros(len(self.grid), dtype=bool)
+            for name in names:
+                active |= self.period_active(periods[name], tz)
+            self._active[key] = active
+        return active
+
+    def run(self, schedules: list, periods: dict, rates: dict = None, keep_matrix: bool = False) -> dict:
+        """
+        Per-schedule projection. rates maps schedule name to the hourly cost of
+        everything it manages; savings = inactive hours x rate.
+        With keep_matrix, also returns the (schedules x grid) activity matrix.
+        """
+        rates = rates or {}
+        hours_total = len(self.grid) * self.step / 60.0
+        rows = []
+        matrix = np.zeros((len(schedules), len(self.grid)), dtype=bool) if keep_matrix else None
+
+        for i, sched in enumerate(schedules):
+            name = sched.get("Name", "UNKNOWN")
+            active = self.schedule_active(sched, periods)
+            if keep_matrix:
+                matrix[i] = active
+
+            active_hours = int(np.count_nonzero(active)) * self.step / 60.0
+            rate = float(rates.get(name, 0.0))
+            rows.append({
+                "name": name,
+                "timezone": sched.get("Timezone", "UTC"),
+                "active_hours": round(active_hours, 2),
+                "saved_hours": round(hours_total - active_hours, 2),
+                "active_ratio": round(active_hours / hours_total, 4) if hours_total else 0.0,
+                "projected_cost": round(active_hours * rate, 2),
+                "projected_savings": round((hours_total - active_hours) * rate, 2),
+            })
+
+        return {"hours": hours_total, "step_minutes": self.step, "schedules": rows, "matrix": matrix}
+
+
+def simulate(schedules: list, periods: dict, start: datetime, end: datetime, step_minutes: int = 5,
+             rates: dict = None, keep_matrix: bool = False) -> dict:
+    return Simulator(start, end, step_minutes).run(schedules, periods, rates, keep_matrix)
+
+
+# ================================
+# 🔹 CLI
+# ================================
+def load_items(path: str = None, table_name: str = None):
+    """
+    (periods, schedules) from a JSON list of config items (same attributes
+    as the DynamoDB table) or from the live table.
+    """
+    if table_name:
+        from config import load_config
+        from targets import get_resource
+        return load_config(get_resource("dynamodb").Table(table_name), force=True)
+
+    with open(path) as f:
+        items = json.load(f)
+    periods = {i["Name"]: i for i in items if i.get("Type") == "period"}
+    schedules = [i for i in items if i.get("Type") == "schedule"]
+    for sched in schedules:
+        sched["UseMetric"] = parse_bool(sched.get("UseMetric", False))
+        sched["Hibernate"] = parse_bool(sched.get("Hibernate", False))
+    return periods, schedules
+
+
+def parse_day(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=USAGE, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--config", help="JSON list of period/schedule items")
+    source.add_argument("--table", help="read periods/schedules from this DynamoDB table")
+    parser.add_argument("--start", required=True, type=parse_day, help="first UTC day, YYYY-MM-DD")
+    parser.add_argument("--end", required=True, type=parse_day, help="UTC day after the last, YYYY-MM-DD")
+    parser.add_argument("--step", type=int, default=5, help="grid resolution in minutes")
+    parser.add_argument("--rates", help="JSON object: schedule name -> hourly cost of its resources")
+    parser.add_argument("--matrix", help="write the activity matrix to this .npz file")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    args = parser.parse_args(argv)
+    if args.end <= args.start:
+        parser.error(f"--end {args.end:%Y-%m-%d} must be after --start {args.start:%Y-%m-%d}")
+    if args.step < 1:
+        parser.error(f"--step must be at least 1 minute, got {args.step}")
+
+    periods, schedules = load_items(args.config, args.table)
+    rates = {}
+    if args.rates:
+        with open(args.rates) as f:
+            rates = json.load(f)
+
+    result = simulate(schedules, periods, args.start, args.end, args.step, rates, keep_matrix=bool(args.matrix))
+
+    if args.matrix:
+        grid = np.arange(epoch_minutes(args.start), epoch_minutes(args.end), args.step, dtype=np.int64)
+        np.savez_compressed(
+            args.matrix,
+            active=result["matrix"],
+            schedules=np.array([r["name"] for r in result["schedules"]]),
+            utc_minutes=grid,
+        )
+
+    if args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(result["schedules"][0]) if result["schedules"] else ["name"])
+        writer.writeheader()
+        writer.writerows(result["schedules"])
+    else:
+        print(json.dumps({k: v for k, v in result.items() if k != "matrix"}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import logging
+from inventory import ec2_record, rds_record
+from statecache import STATE_CACHE_TABLE, StateCache, ec2_item, parse_event, rds_item
+from targets import get_resource, target_for
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def describe(change: dict):
+    """
+    Current cache item for the resource of one event, from a single
+    describe call; None when it is gone, untagged or out of reach.
+    """
+    target = target_for(change["account"], change["region"])
+    if target is None:
+        logger.info(f"[StateEvents] No role for account {change['account']}, left to the next resync")
+        return None
+
+    try:
+        if change["kind"] == "ec2":
+            resp = target.client("ec2").describe_instances(InstanceIds=[change["resource_id"]])
+            for reservation in resp["Reservations"]:
+                for instance in reservation["Instances"]:
+                    record = ec2_record(instance)
+                    if record is not None:
+                        return ec2_item(None, record, change["at"])
+            return None
+
+        resp = target.client("rds").describe_db_instances(DBInstanceIdentifier=change["resource_id"])
+        for db in resp["DBInstances"]:
+            record = rds_record(db)
+            if record is not None:
+                return rds_item(None, record, change["at"])
+    except Exception as e:
+        code = getattr(e, "response", {}).get("Error", {}).get("Code", "")
+        if "NotFound" not in code:
+            raise
+    return None
+
+
+def lambda_handler(event, context=None):
+    """
+    Keep the state cache current from EC2/RDS state-change and tag-change
+    events. Accepts one EventBridge event or a list of them (replays).
+    """
+    if not STATE_CACHE_TABLE:
+        logger.warning("[StateEvents] STATE_CACHE_TABLE is not set, nothing to do")
+        return {"applied": {}}
+
+    cache = StateCache(get_resource("dynamodb").Table(STATE_CACHE_TABLE))
+    applied = {}
+
+    for raw in event if isinstance(event, list) else [event]:
+        try:
+            change = parse_event(raw)
+            if change is None:
+                outcome = "irrelevant"
+            else:
+                target_key = f"{change['account']}/{change['region']}"
+                outcome = cache.apply(change, target_key, describe)
+                logger.info(f"[StateEvents] {change['kind']} {change['resource_id']} in {target_key}: {outcome}")
+        except Exception as e:
+            logger.error(f"[StateEvents] Failed to apply event {raw.get('id', '?')}: {e}")
+            outcome = "failed"
+        applied[outcome] = applied.get(outcome, 0) + 1
+
+    return {"applied": applied}
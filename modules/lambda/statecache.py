@@ -0,0 +1,285 @@
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from actions import error_code
+from inventory import TAG_KEY, Ec2Record, InventorySnapshot, RdsRecord
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Table kept up to date by state_events.py (empty = poll describe_* every run)
+STATE_CACHE_TABLE = os.environ.get("STATE_CACHE_TABLE", "")
+
+# Full describe_* resync of each target at least this often, to catch missed events
+RESYNC_MINUTES = int(os.environ.get("RESYNC_MINUTES", "60"))
+
+# Other targets ("account/region") whose EC2/RDS events are forwarded to this
+# account's default bus. Only these and the Lambda's own account/region are read
+# from the cache; every other target is described on every run.
+STATE_CACHE_TARGETS = {t.strip() for t in os.environ.get("STATE_CACHE_TARGETS", "").split(",") if t.strip()}
+
+# Per-target item recording when the target was last fully resynced
+RESYNC_KEY = "__resync__"
+
+# RDS "DB Instance Event" IDs -> resulting DBInstanceStatus
+RDS_EVENT_STATUS = {
+    "RDS-EVENT-0087": "stopped",
+    "RDS-EVENT-0088": "available",
+    "RDS-EVENT-0003": "deleting",
+}
+
+# Fallback on the event message when the ID is not listed above (checked in order)
+RDS_MESSAGE_STATUS = [
+    (re.compile(r"\bbeing stopped|\bstopping", re.I), "stopping"),
+    (re.compile(r"\bbeing started|\bstarting", re.I), "starting"),
+    (re.compile(r"\bstopped\b", re.I), "stopped"),
+    (re.compile(r"\bstarted\b", re.I), "available"),
+    (re.compile(r"\bdeleted\b", re.I), "deleting"),
+]
+
+
+def event_epoch(value: str) -> int:
+    # EventBridge "time", e.g. "2024-05-02T18:00:05Z"
+    return int(datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp())
+
+
+def event_fed(target_key: str, home_key: str) -> bool:
+    """
+    Whether state_events.py receives the events of a target, so its cache
+    items are kept current between resyncs.
+    """
+    return target_key == home_key or target_key in STATE_CACHE_TARGETS
+
+
+# ================================
+# 🔹 EVENT PARSING
+# ================================
+def parse_event(event: dict):
+    """
+    One EventBridge event -> change dict, or None when irrelevant:
+    {"kind", "account", "region", "resource_id", "state", "at"} for state
+    changes, with "tags" instead of "state" for tag changes.
+    """
+    source = event.get("source")
+    detail_type = event.get("detail-type")
+    detail = event.get("detail") or {}
+    base = {"account": event.get("account"), "region": event.get("region"), "at": event_epoch(event["time"])}
+
+    if source == "aws.ec2" and detail_type == "EC2 Instance State-change Notification":
+        return dict(base, kind="ec2", resource_id=detail["instance-id"], state=detail["state"])
+
+    if source == "aws.rds" and detail_type == "RDS DB Instance Event":
+        status = RDS_EVENT_STATUS.get(detail.get("EventID"))
+        if status is None:
+            message = detail.get("Message", "")
+            status = next((s for pattern, s in RDS_MESSAGE_STATUS if pattern.search(message)), None)
+        if status is None:
+            return None
+        return dict(base, kind="rds", resource_id=detail["SourceIdentifier"], state=status)
+
+    if source == "aws.tag" and detail_type == "Tag Change on Resource":
+        arn = (event.get("resources") or [""])[0]
+        if detail.get("service") == "ec2" and detail.get("resource-type") == "instance":
+            return dict(base, kind="ec2", resource_id=arn.rsplit("/", 1)[-1], tags=detail.get("tags") or {})
+        if detail.get("service") == "rds" and detail.get("resource-type") == "db":
+            return dict(base, kind="rds", resource_id=arn.rsplit(":", 1)[-1], tags=detail.get("tags") or {})
+
+    return None
+
+
+# ================================
+# 🔹 ITEMS
+# ================================
+def ec2_item(target_key: str, instance: Ec2Record, updated_at: int) -> dict:
+    """
+    Cache item for one EC2 record.
+    """
+    item = {
+        "Target": target_key,
+        "ResourceId": instance.instance_id,
+        "Kind": "ec2",
+        "Tag": instance.tag,
+        "State": instance.state,
+        "InstanceType": instance.instance_type,
+        "Priority": instance.priority,
+        "LaunchedAt": instance.launched_at,
+        "StoppedAt": instance.stopped_at,
+        "UpdatedAt": updated_at,
+    }
+    return {k: v for k, v in item.items() if v is not None}
+
+
+def rds_item(target_key: str, record: RdsRecord, updated_at: int) -> dict:
+    """
+    Cache item for one RDS record.
+    """
+    item = {
+        "Target": target_key,
+        "ResourceId": record.identifier,
+        "Kind": "rds",
+        "Tag": record.tag,
+        "State": record.status,
+        "InstanceType": record.db_class,
+        "Arn": record.arn,
+        "Priority": record.priority,
+        "UpdatedAt": updated_at,
+    }
+    return {k: v for k, v in item.items() if v is not None}
+
+
+def snapshot_items(target_key: str, snapshot: InventorySnapshot, now_epoch: int) -> dict:
+    """
+    ResourceId -> cache item for every resource of a described snapshot.
+    """
+    items = {}
+    for instances in snapshot.ec2.values():
+        for instance in instances:
+            items[instance.instance_id] = ec2_item(target_key, instance, now_epoch)
+    for dbs in snapshot.rds.values():
+        for db in dbs:
+            items[db.identifier] = rds_item(target_key, db, now_epoch)
+    return items
+
+
+def optional_int(value):
+    return int(value) if value is not None else None
+
+
+def snapshot_from_items(items) -> InventorySnapshot:
+    """
+    Rebuild the inventory records the scheduler works on.
+    """
+    snapshot = InventorySnapshot()
+    for item in items:
+        if item["Kind"] == "ec2":
+            snapshot.ec2.setdefault(item["Tag"], []).append(Ec2Record(
+                item["ResourceId"],
+                item["Tag"],
+                item["State"],
+                item.get("InstanceType"),
+                item.get("Priority"),
+                optional_int(item.get("LaunchedAt")),
+                optional_int(item.get("StoppedAt")) if item["State"] == "stopped" else None,
+            ))
+        else:
+            snapshot.rds.setdefault(item["Tag"], []).append(RdsRecord(
+                item["ResourceId"],
+                item["Arn"],
+                item["Tag"],
+                item["State"],
+                item.get("InstanceType"),
+                item.get("Priority"),
+            ))
+    return snapshot
+
+
+# ================================
+# 🔹 CACHE TABLE
+# ================================
+class StateCache:
+    """
+    Compact per-resource state (tag, state, type) keyed by Target
+    ("account/region") and ResourceId, fed by state-change events and
+    periodically replaced by a full describe_* resync.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def read(self, target_key: str):
+        """
+        (items by ResourceId, last resync epoch or None) for one target.
+        """
+        items = {}
+        kwargs = {
+            "KeyConditionExpression": "#t = :t",
+            "ExpressionAttributeNames": {"#t": "Target"},
+            "ExpressionAttributeValues": {":t": target_key},
+        }
+        while True:
+            resp = self.table.query(**kwargs)
+            for item in resp["Items"]:
+                items[item["ResourceId"]] = item
+            if "LastEvaluatedKey" not in resp:
+                break
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+        marker = items.pop(RESYNC_KEY, None)
+        return items, int(marker["SyncedAt"]) if marker else None
+
+    def load(self, target_key: str, now_epoch: int, resync_minutes: int = None):
+        """
+        Snapshot of one target from the cache, or (None, items) when the
+        target is due for a full resync.
+        """
+        resync = RESYNC_MINUTES if resync_minutes is None else resync_minutes
+        items, synced_at = self.read(target_key)
+        if synced_at is None or now_epoch - synced_at >= resync * 60:
+            return None, items
+        return snapshot_from_items(items.values()), items
+
+    def replace(self, target_key: str, snapshot: InventorySnapshot, existing: dict, now_epoch: int) -> int:
+        """
+        Make the cache match a freshly described snapshot. Only changed items
+        are written and vanished ones deleted. Returns the number of writes.
+        """
+        fresh = snapshot_items(target_key, snapshot, now_epoch)
+        writes = 0
+        with self.table.batch_writer() as batch:
+            for resource_id, item in fresh.items():
+                old = existing.get(resource_id)
+                if old is None or any(old.get(k) != v for k, v in item.items() if k != "UpdatedAt"):
+                    batch.put_item(Item=item)
+                    writes += 1
+            for resource_id in existing:
+                if resource_id not in fresh:
+                    batch.delete_item(Key={"Target": target_key, "ResourceId": resource_id})
+                    writes += 1
+            batch.put_item(Item={"Target": target_key, "ResourceId": RESYNC_KEY, "SyncedAt": now_epoch})
+        logger.info(f"[StateCache] Resynced {target_key}: {len(fresh)} resources, {writes} changes")
+        return writes
+
+    def apply(self, change: dict, target_key: str, describe=None) -> str:
+        """
+        Apply one parsed event. State changes update a known resource unless
+        what is stored is newer. Unknown resources and tag changes are
+        looked up with describe(change) -> item or None (None = not scheduled).
+        Returns what was done, for logging.
+        """
+        key = {"Target": target_key, "ResourceId": change["resource_id"]}
+
+        if "tags" in change and TAG_KEY not in change["tags"]:
+            self.table.delete_item(Key=key)
+            return "deleted"
+
+        if "state" in change:
+            names = {"#s": "State", "#u": "UpdatedAt"}
+            values = {":s": change["state"], ":at": change["at"]}
+            update = "SET #s = :s, #u = :at"
+            if change["kind"] == "ec2" and change["state"] == "stopped":
+                update += ", StoppedAt = :at"
+            try:
+                self.table.update_item(
+                    Key=key,
+                    UpdateExpression=update,
+                    ConditionExpression="attribute_exists(ResourceId) AND #u <= :at",
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues=values,
+                )
+                return "updated"
+            except Exception as e:
+                if error_code(e) != "ConditionalCheckFailedException":
+                    raise
+            if self.table.get_item(Key=key).get("Item"):
+                return "stale"
+
+        item = describe(change) if describe else None
+        if item is None:
+            return "ignored"
+        self.table.put_item(Item=dict(item, Target=target_key))
+        return "refreshed"
@@ -0,0 +1,229 @@
+import boto3
+import logging
+import os
+import threading
+import time
+from botocore.config import Config
+from actions import MAX_WORKERS
+from profiling import instrument
+from resilience import MAX_ATTEMPTS, RETRY_MODE, protect
+
+
+# ================================
+# 🔹 Logging setup
+# ================================
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Global targets: comma-separated regions and assumable role ARNs.
+# Empty regions = the Lambda's own region; empty roles = the Lambda's own account.
+TARGET_REGIONS = [r.strip() for r in os.environ.get("TARGET_REGIONS", "").split(",") if r.strip()]
+TARGET_ROLE_ARNS = [r.strip() for r in os.environ.get("TARGET_ROLE_ARNS", "").split(",") if r.strip()]
+
+# Max (account, region) targets processed in parallel
+MAX_TARGET_WORKERS = int(os.environ.get("MAX_TARGET_WORKERS", "4"))
+
+# Assumed-role credentials are refreshed this long before they expire
+CREDENTIAL_REFRESH_SECONDS = 300
+
+# HTTP connections kept per client: as many as calls that can be in flight at
+# once, i.e. every target worker running its RDS dispatch pool (MAX_WORKERS),
+# plus one per target worker for the inventory/ledger calls made alongside.
+# Parallel calls then never wait for (or reopen) a pooled connection.
+MAX_POOL_CONNECTIONS = int(os.environ.get("MAX_POOL_CONNECTIONS", str(MAX_TARGET_WORKERS * (MAX_WORKERS + 1))))
+
+# Shared by every client; the retry policy lives in resilience.py
+CLIENT_CONFIG = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    retries={"mode": RETRY_MODE, "total_max_attempts": MAX_ATTEMPTS},
+    tcp_keepalive=True,
+)
+
+# Warm-container caches; nothing is built until first use
+_session = {"session": None}
+_clients = {}      # (role_arn, region, service) -> (client, expires_at)
+_resources = {}    # (region, service) -> boto3 resource
+_credentials = {}  # role_arn -> credentials dict from STS
+_identity = {}     # "account" -> the Lambda's own account ID
+_lock = threading.RLock()
+
+
+def split_list(value) -> list:
+    if not value:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+# ================================
+# 🔹 CLIENTS
+# ================================
+def get_session() -> boto3.session.Session:
+    """
+    One boto3 session for every client, so service models and endpoint
+    data are loaded once per container.
+    """
+    with _lock:
+        if _session["session"] is None:
+            _session["session"] = boto3.session.Session()
+        return _session["session"]
+
+
+def assume_role(role_arn: str) -> dict:
+    """
+    STS credentials for role_arn, reused until shortly before they expire.
+    """
+    creds = _credentials.get(role_arn)
+    if creds and creds["Expiration"].timestamp() - time.time() > CREDENTIAL_REFRESH_SECONDS:
+        return creds
+
+    resp = get_client("sts").assume_role(RoleArn=role_arn, RoleSessionName="ec2-rds-scheduler")
+    creds = resp["Credentials"]
+    _credentials[role_arn] = creds
+    return creds
+
+
+def get_client(service: str, region: str = None, role_arn: str = None):
+    """
+    One cached boto3 client per (account role, region, service), built on
+    first use and kept across warm invocations with its connection pool.
+    Clients built from assumed-role credentials are rebuilt when those expire.
+    """
+    key = (role_arn, region, service)
+    cached = _clients.get(key)
+    if cached and (cached[1] is None or cached[1] - time.time() > CREDENTIAL_REFRESH_SECONDS):
+        return cached[0]
+
+    with _lock:
+        cached = _clients.get(key)
+        if cached and (cached[1] is None or cached[1] - time.time() > CREDENTIAL_REFRESH_SECONDS):
+            return cached[0]
+
+        kwargs = {"region_name": region} if region else {}
+        expires_at = None
+        if role_arn:
+            creds = assume_role(role_arn)
+            kwargs.update(
+                aws_access_key_id=creds["AccessKeyId"],
+                aws_secret_access_key=creds["SecretAccessKey"],
+                aws_session_token=creds["SessionToken"],
+            )
+            expires_at = creds["Expiration"].timestamp()
+
+        client = protect(
+            instrument(get_session().client(service, config=CLIENT_CONFIG, **kwargs)), (role_arn or "", region or "")
+        )
+        _clients[key] = (client, expires_at)
+        return client
+
+
+def get_resource(service: str, region: str = None):
+    """
+    Cached boto3 resource in the Lambda's own account, built on first use.
+    """
+    key = (region, service)
+    resource = _resources.get(key)
+    if resource is not None:
+        return resource
+
+    with _lock:
+        if key not in _resources:
+            kwargs = {"region_name": region} if region else {}
+            _resources[key] = protect(
+                instrument(get_session().resource(service, config=CLIENT_CONFIG, **kwargs)), ("", region or "")
+            )
+        return _resources[key]
+
+
+# ================================
+# 🔹 TARGETS
+# ================================
+class Target:
+    """
+    One (account, region) pair the scheduler inventories and controls.
+    role_arn None = the Lambda's own account, region None = its own region.
+    """
+
+    __slots__ = ("role_arn", "region")
+
+    def __init__(self, role_arn: str = None, region: str = None):
+        self.role_arn = role_arn or None
+        self.region = region or None
+
+    @property
+    def key(self) -> tuple:
+        return (self.role_arn or "", self.region or "")
+
+    @property
+    def label(self) -> str:
+        account = self.role_arn.split(":")[4] if self.role_arn else "self"
+        return f"{account}/{self.region or 'default'}"
+
+    def client(self, service: str):
+        return get_client(service, self.region, self.role_arn)
+
+    def __eq__(self, other):
+        return isinstance(other, Target) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"Target({self.label})"
+
+
+def own_account() -> str:
+    """
+    The Lambda's own account ID, looked up once per container.
+    """
+    if "account" not in _identity:
+        _identity["account"] = get_client("sts").get_caller_identity()["Account"]
+    return _identity["account"]
+
+
+def own_region() -> str:
+    return get_session().region_name or os.environ.get("AWS_REGION", "us-east-1")
+
+
+def target_key(target: Target) -> str:
+    """
+    "account/region" of a target, as carried by EventBridge events.
+    """
+    account = target.role_arn.split(":")[4] if target.role_arn else own_account()
+    return f"{account}/{target.region or own_region()}"
+
+
+def target_for(account: str, region: str):
+    """
+    Target able to describe resources in account/region: the Lambda's own
+    account, or one of TARGET_ROLE_ARNS in that account. None if neither.
+    """
+    region = None if region == own_region() else region
+    if account == own_account():
+        return Target(None, region)
+    for role_arn in TARGET_ROLE_ARNS:
+        if role_arn.split(":")[4] == account:
+            return Target(role_arn, region)
+    return None
+
+
+def schedule_targets(sched: dict) -> list:
+    """
+    Targets of one schedule: its own Regions/RoleArns attributes when set,
+    otherwise the global TARGET_REGIONS/TARGET_ROLE_ARNS.
+    """
+    regions = split_list(sched.get("Regions")) or TARGET_REGIONS or [None]
+    roles = split_list(sched.get("RoleArns")) or TARGET_ROLE_ARNS or [None]
+    return [Target(role, region) for role in roles for region in regions]
+
+
+def resolve_targets(schedules: list) -> list:
+    """
+    Unique targets across all schedules, in first-seen order.
+    """
+    seen = {}
+    for sched in schedules:
+        for target in schedule_targets(sched):
+            seen.setdefault(target, target)
+    return list(seen)
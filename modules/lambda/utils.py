@@ -1,5 +1,4 @@
 import calendar
-from datetime import datetime, time
 
 def parse_month_value(val: str) -> int:
     months = {
@@ -87,25 +86,20 @@ def match_weekday(now, expr: str) -> bool:
         base, nth = expr.split("#")
         nth = int(nth)
         target = parse_weekday_value(base)
-        count = 0
-        for d in range(1, 32):
-            try:
-                if datetime(now.year, now.month, d).weekday() == target:
-                    count += 1
-                    if count == nth and d == now.day:
-                        return True
-            except ValueError:
-                break
-        return False
+        if not 0 <= target <= 6:
+            return False
+        first_wd, last_day = calendar.monthrange(now.year, now.month)
+        day = 1 + (target - first_wd) % 7 + 7 * (nth - 1)
+        return 1 <= day <= last_day and now.day == day
 
     # last weekday (e.g., friL, 4L)
     if expr.endswith("l"):
         target = parse_weekday_value(expr[:-1])
-        last_day = calendar.monthrange(now.year, now.month)[1]
-        for d in range(last_day, 0, -1):
-            if datetime(now.year, now.month, d).weekday() == target:
-                return now.day == d
-        return False
+        if not 0 <= target <= 6:
+            return False
+        first_wd, last_day = calendar.monthrange(now.year, now.month)
+        last_wd = (first_wd + last_day - 1) % 7
+        return now.day == last_day - (last_wd - target) % 7
 
     # range (e.g., 0-2)
     if "-" in expr:
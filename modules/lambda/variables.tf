@@ -9,3 +9,171 @@ variable "role_arn" {
 variable "table_name" {
   type = string
 }
+
+variable "state_table_name" {
+  description = "Companion table holding per-resource scheduler state (empty = in-memory only)"
+  type        = string
+  default     = ""
+}
+
+variable "config_type_index" {
+  description = "GSI on Type used to load periods/schedules (empty = paginated scan)"
+  type        = string
+  default     = ""
+}
+
+variable "config_ttl_seconds" {
+  description = "Max seconds a warm Lambda reuses the loaded config"
+  type        = number
+  default     = 900
+}
+
+variable "rds_index_ttl_seconds" {
+  description = "Seconds a warm Lambda may reuse the RDS tag index (0 = rebuild every run)"
+  type        = number
+  default     = 0
+}
+
+variable "max_workers" {
+  description = "Max RDS start/stop calls in flight at once per target (1 = one after another)"
+  type        = number
+  default     = 8
+}
+
+variable "skip_when_idle" {
+  description = "Skip EC2/RDS work when no schedule has a transition since the last full run"
+  type        = bool
+  default     = false
+}
+
+variable "drift_sweep_minutes" {
+  description = "Max minutes between full runs when skip_when_idle is enabled"
+  type        = number
+  default     = 60
+}
+
+variable "metrics_sink" {
+  description = "Metrics backend: \"api\" (chunked PutMetricData) or \"emf\" (Embedded Metric Format logs)"
+  type        = string
+  default     = "api"
+}
+
+variable "target_regions" {
+  description = "Regions every schedule targets unless it sets Regions (empty = the Lambda's region)"
+  type        = list(string)
+  default     = []
+}
+
+variable "target_role_arns" {
+  description = "Role ARNs assumed to reach other accounts unless a schedule sets RoleArns (empty = own account)"
+  type        = list(string)
+  default     = []
+}
+
+variable "max_target_workers" {
+  description = "Max (account, region) targets processed in parallel"
+  type        = number
+  default     = 4
+}
+
+variable "profile_metrics" {
+  description = "Also publish phase durations, per-API call counts and run lease wait/hold as scheduler metrics"
+  type        = bool
+  default     = false
+}
+
+variable "ec2_calls_per_second" {
+  description = "Max EC2 start/stop calls per second per account and region (0 = unlimited)"
+  type        = number
+  default     = 5
+}
+
+variable "rds_calls_per_second" {
+  description = "Max RDS start/stop calls per second per account and region (0 = unlimited)"
+  type        = number
+  default     = 2
+}
+
+variable "dispatch_budget_seconds" {
+  description = "Seconds one run may spend sending start/stop calls; the rest is deferred to the next run"
+  type        = number
+  default     = 30
+}
+
+variable "wave_interval_seconds" {
+  description = "Pause between Priority waves (e.g. databases before app servers)"
+  type        = number
+  default     = 0
+}
+
+variable "retry_budget" {
+  description = "AWS API retries allowed across one whole run; after that, errors are not retried"
+  type        = number
+  default     = 50
+}
+
+variable "circuit_threshold" {
+  description = "Throttled attempts in a row after which calls to that API operation are paused"
+  type        = number
+  default     = 5
+}
+
+variable "circuit_open_seconds" {
+  description = "How long a throttling API operation stays paused before one trial call"
+  type        = number
+  default     = 60
+}
+
+variable "state_cache" {
+  description = "Deploy the state-change event handler and read EC2/RDS states from its cache table"
+  type        = bool
+  default     = false
+}
+
+variable "state_cache_table" {
+  description = "State cache table name (empty = describe every target on every run)"
+  type        = string
+  default     = ""
+}
+
+variable "state_cache_targets" {
+  description = "Other targets (\"account/region\") whose EC2/RDS events are forwarded to this account's default event bus; the rest are described every run"
+  type        = list(string)
+  default     = []
+}
+
+variable "resync_minutes" {
+  description = "Full describe resync of each target at least this often, in case events were missed"
+  type        = number
+  default     = 60
+}
+
+variable "shard_count" {
+  description = "Split schedules across this many parallel worker invocations (1 = no sharding)"
+  type        = number
+  default     = 1
+}
+
+variable "shard_wait_seconds" {
+  description = "How long the coordinator waits for worker summaries before reporting shards as missing"
+  type        = number
+  default     = 60
+}
+
+variable "lease_seconds" {
+  description = "Run lease duration; a run still going renews it, a crashed run's lease expires after this"
+  type        = number
+  default     = 120
+}
+
+variable "lease_wait_seconds" {
+  description = "How long a run waits for an overlapping run to finish (0 = exit at once)"
+  type        = number
+  default     = 0
+}
+
+variable "prewarm_max_minutes" {
+  description = "Start resources up to this long before BeginTime, by their observed boot time (0 = only schedules with PrewarmMinutes start early; PrewarmMinutes on a schedule overrides it)"
+  type        = number
+  default     = 0
+}
@@ -0,0 +1,90 @@
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(ROOT, "modules", "lambda")
+BENCH_DIR = os.path.join(ROOT, "bench")
+
+# Settings are read when the Lambda modules are imported: pin them first
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("TABLE_NAME", "bench-table")
+os.environ.setdefault("STATE_TABLE_NAME", "bench-table-state")
+os.environ.setdefault("EC2_CALLS_PER_SECOND", "0")
+os.environ.setdefault("RDS_CALLS_PER_SECOND", "0")
+
+sys.path.insert(0, LAMBDA_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+TABLE_NAME = os.environ["TABLE_NAME"]
+STATE_TABLE_NAME = os.environ["STATE_TABLE_NAME"]
+STATE_CACHE_TABLE = "bench-table-cache"
+
+
+def reset_warm_state():
+    """
+    Forget everything a warm container keeps between invocations.
+    """
+    import actions
+    import config
+    import inventory
+    import lease
+    import profiling
+    import reconcile
+    import resilience
+    import savings
+    import shards
+    import targets
+
+    reconcile.forget_ledger()
+    config._config_cache.update(periods=None, schedules=None, version=None, loaded_at=0.0)
+    inventory._rds_index_cache.clear()
+    savings._records.clear()
+    savings._last_run.clear()
+    resilience._breakers.clear()
+    resilience.start_invocation()
+    lease._unpublished.clear()
+    actions._buckets.clear()
+    shards.set_invoker(None)
+    profiling._active["profiler"] = None
+    targets._identity.clear()
+    targets._credentials.clear()
+
+
+@pytest.fixture
+def fake_aws():
+    """
+    A synthetic estate behind the fakes in bench/fakes.py, handed out by the
+    Lambda's boto3 session, with a clean warm state. Yields a factory so a
+    test can build several identical estates.
+    """
+    import fakes
+    import targets
+
+    def build(instances: int = 200, dbs: int = 20, schedules: int = 20, seed: int = 7):
+        reset_warm_state()
+        estate = fakes.make_estate(instances, dbs, schedules, seed)
+        log = fakes.CallLog()
+        dynamodb = fakes.FakeDynamoDB(log)
+        dynamodb.add_table(TABLE_NAME, "Name", estate["config"])
+        dynamodb.add_table(STATE_TABLE_NAME, "ResourceId")
+        dynamodb.add_table(STATE_CACHE_TABLE, "Target", range_key="ResourceId")
+        aws = types.SimpleNamespace(
+            log=log,
+            dynamodb=dynamodb,
+            ec2=fakes.FakeEC2(log, estate["ec2"]),
+            rds=fakes.FakeRDS(log, estate["rds"]),
+            cloudwatch=fakes.FakeCloudWatch(log),
+            sts=fakes.FakeSTS(log),
+        )
+        fakes.install_session(
+            targets,
+            {"ec2": aws.ec2, "rds": aws.rds, "cloudwatch": aws.cloudwatch, "sts": aws.sts},
+            {"dynamodb": dynamodb},
+        )
+        return aws
+
+    yield build
+    reset_warm_state()
@@ -0,0 +1,256 @@
+"""
+ActionPlan dispatch (actions.py): the bounded RDS pool, priority waves,
+token buckets and batch splitting under the dispatch deadline.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import actions
+import fakes
+from actions import ActionPlan, OutOfTime, TokenBucket, paced, run_batch
+from inventory import Ec2Record, RdsRecord
+
+TARGET = ("test", "rds")
+
+
+class Batches:
+    """
+    StartInstances-like call failing any batch that holds one of the `bad` IDs.
+    """
+
+    def __init__(self, bad=(), code: str = "IncorrectInstanceState"):
+        self.bad = set(bad)
+        self.code = code
+        self.batches = []
+
+    def __call__(self, InstanceIds, **kwargs):
+        self.batches.append(list(InstanceIds))
+        if self.bad & set(InstanceIds):
+            raise fakes.FakeError(self.code)
+        return {}
+
+
+class SlowRDS:
+    """
+    RDS client whose start/stop calls take a while, counting how many are in flight.
+    """
+
+    def __init__(self, seconds: float = 0.05, errors: dict = None):
+        self.seconds = seconds
+        self.errors = errors or {}
+        self.calls = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _call(self, DBInstanceIdentifier):
+        with self._lock:
+            self.calls.append((time.monotonic(), DBInstanceIdentifier))
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.in_flight -= 1
+        if DBInstanceIdentifier in self.errors:
+            raise self.errors[DBInstanceIdentifier]
+        return {}
+
+    start_db_instance = _call
+    stop_db_instance = _call
+
+
+def instance(i: int, state: str = "stopped") -> Ec2Record:
+    return Ec2Record(f"i-{i}", "office-hours", state)
+
+
+def db(i: int, status: str = "stopped") -> RdsRecord:
+    return RdsRecord(f"db-{i}", f"arn:aws:rds:us-east-1:123456789012:db:db-{i}", "office-hours", status)
+
+
+@pytest.fixture(autouse=True)
+def buckets():
+    actions._buckets.clear()
+    yield actions._buckets
+    actions._buckets.clear()
+
+
+# ================================
+# 🔹 RDS DISPATCH POOL
+# ================================
+def test_rds_actions_run_on_a_bounded_pool(monkeypatch):
+    monkeypatch.setattr(actions, "MAX_WORKERS", 4)
+    plan = ActionPlan()
+    dbs = [db(i) for i in range(12)]
+    for record in dbs:
+        plan.start_rds(record)
+    rds = SlowRDS()
+
+    assert plan.execute(None, rds, TARGET) == {}
+    assert rds.most_in_flight == 4
+    assert sorted(plan.done) == sorted(d.identifier for d in dbs)
+    assert {d.status for d in dbs} == {"starting"}
+
+
+def test_rds_pool_of_one_is_sequential(monkeypatch):
+    monkeypatch.setattr(actions, "MAX_WORKERS", 1)
+    plan = ActionPlan()
+    for i in range(3):
+        plan.stop_rds(db(i, "available"))
+    rds = SlowRDS(0.01)
+
+    plan.execute(None, rds, TARGET)
+    assert rds.most_in_flight == 1
+    assert [db_id for _, db_id in rds.calls] == ["db-0", "db-1", "db-2"]
+
+
+def test_rds_pool_shares_the_target_bucket(monkeypatch, buckets):
+    monkeypatch.setattr(actions, "MAX_WORKERS", 8)
+    buckets[(TARGET, "rds")] = TokenBucket(rate=20, burst=1)
+    plan = ActionPlan()
+    for i in range(6):
+        plan.start_rds(db(i))
+    rds = SlowRDS(0.0)
+
+    plan.execute(None, rds, TARGET)
+    sent = sorted(at for at, _ in rds.calls)
+    # One token up front, then one every 1/20s however many threads wait
+    assert sent[-1] - sent[0] >= 5 / 20 * 0.9
+
+
+def test_rds_errors_fail_or_defer_per_db(monkeypatch):
+    from botocore.exceptions import ClientError
+
+    def client_error(code):
+        return ClientError({"Error": {"Code": code, "Message": code}}, "StartDBInstance")
+
+    monkeypatch.setattr(actions, "MAX_WORKERS", 4)
+    plan = ActionPlan()
+    for i in range(4):
+        plan.start_rds(db(i))
+    rds = SlowRDS(0.0, {"db-1": client_error("InvalidDBInstanceState"), "db-2": client_error("Throttling")})
+
+    failed = plan.execute(None, rds, TARGET)
+    assert sorted(failed) == ["db-1"]
+    assert plan.deferred == {"db-2": "start"}
+    assert plan.deferred_reasons == {"db-2": "throttled"}
+    assert sorted(plan.done) == ["db-0", "db-3"]
+
+
+def test_rds_after_deadline_is_deferred(monkeypatch, buckets):
+    monkeypatch.setattr(actions, "MAX_WORKERS", 4)
+    buckets[(TARGET, "rds")] = TokenBucket(rate=1, burst=2)
+    plan = ActionPlan()
+    for i in range(6):
+        plan.start_rds(db(i))
+    rds = SlowRDS(0.0)
+
+    plan.execute(None, rds, TARGET, deadline=time.monotonic() + 0.5)
+    assert len(plan.done) == 2
+    assert len(plan.deferred) == 4
+    assert set(plan.deferred_reasons.values()) == {"dispatch budget"}
+
+
+# ================================
+# 🔹 EC2 BATCHES
+# ================================
+def test_batch_without_errors_is_one_call():
+    call = Batches()
+    ids = [f"i-{n}" for n in range(8)]
+    assert run_batch(call, ids, {}, {}) == ids
+    assert call.batches == [ids]
+
+
+def test_failing_batch_is_halved_down_to_the_bad_ids():
+    call = Batches(bad={"i-2", "i-5"})
+    ids = [f"i-{n}" for n in range(8)]
+    failed = {}
+
+    done = run_batch(call, ids, {}, failed)
+    assert done == ["i-0", "i-1", "i-3", "i-4", "i-6", "i-7"]
+    assert sorted(failed) == ["i-2", "i-5"]
+    # 8 -> 4 + 4 -> 2 + 2 per half -> singles only where a bad ID is
+    assert call.batches[:3] == [ids, ids[:4], ids[:2]]
+    assert len(call.batches) == 11
+
+
+def test_throttled_batch_is_not_split():
+    call = Batches(bad={"i-2"}, code="RequestLimitExceeded")
+    ids = [f"i-{n}" for n in range(8)]
+    failed = {}
+
+    assert run_batch(call, ids, {}, failed) == []
+    assert sorted(failed) == sorted(ids)
+    assert call.batches == [ids]
+
+
+# ================================
+# 🔹 PACING AND WAVES
+# ================================
+def test_bucket_refuses_a_token_due_after_the_deadline():
+    bucket = TokenBucket(rate=10, burst=2)
+    now = time.monotonic()
+    assert bucket.acquire(now + 0.01)
+    assert bucket.acquire(now + 0.01)
+    # Empty: the next token is 0.1s away, and refusing it keeps the bucket as it was
+    assert not bucket.acquire(time.monotonic() + 0.05)
+    assert not bucket.acquire(time.monotonic() + 0.05)
+    started = time.monotonic()
+    assert bucket.acquire(started + 1)
+    assert 0.05 <= time.monotonic() - started < 0.5
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(rate=0)
+    assert all(bucket.acquire(time.monotonic() - 1) for _ in range(100))
+
+
+def test_paced_split_defers_what_the_deadline_leaves_out():
+    bucket = TokenBucket(rate=1, burst=2)
+    call = Batches(bad={"i-3"})
+    deferred = {}
+    failed = {}
+    ids = [f"i-{n}" for n in range(4)]
+
+    # The first call was paid for by the caller; the bucket covers both halves,
+    # but not the singles the failing half is split into
+    done = run_batch(paced(call, bucket, time.monotonic() + 0.1), ids, {}, failed, deferred)
+    assert done == ["i-0", "i-1"]
+    assert call.batches == [ids, ids[:2], ids[2:]]
+    assert deferred == {"i-2": "DispatchBudget", "i-3": "DispatchBudget"}
+    assert failed == {}
+
+
+def test_paced_raises_out_of_time():
+    bucket = TokenBucket(rate=1, burst=1)
+    call = paced(Batches(), bucket, time.monotonic() + 0.1)
+    call(InstanceIds=["i-0"])
+    call(InstanceIds=["i-1"])
+    with pytest.raises(OutOfTime):
+        call(InstanceIds=["i-2"])
+
+
+def test_waves_start_low_priority_first_and_stop_it_last():
+    plan = ActionPlan()
+    plan.start_ec2(instance(0), priority=20)
+    plan.start_rds(db(1), priority=10)
+    plan.stop_ec2(instance(2, "running"), hibernate=True, priority=10)
+    plan.stop_rds(db(3, "available"), priority=30)
+    plan.stop_ec2(instance(4, "running"), hibernate=False, priority=10)
+
+    assert plan.waves() == [("start", 10), ("start", 20), ("stop", 30), ("stop", 10)]
+
+
+def test_ec2_after_deadline_is_deferred(buckets):
+    buckets[(TARGET, "ec2")] = TokenBucket(rate=1, burst=1)
+    plan = ActionPlan()
+    for i in range(3):
+        plan.start_ec2(instance(i), priority=i)
+    ec2 = SimpleNamespace(start_instances=Batches())
+
+    plan.execute(ec2, None, TARGET, deadline=time.monotonic() + 0.5)
+    assert ec2.start_instances.batches == [["i-0"]]
+    assert plan.deferred == {"i-1": "start", "i-2": "start"}
+    assert set(plan.deferred_reasons.values()) == {"dispatch budget"}
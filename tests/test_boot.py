@@ -0,0 +1,90 @@
+"""
+Pre-warming (boot.py): the opt-in early-start cap and boot latency
+samples, estimates and leads.
+"""
+import boot
+import fakes
+from boot import BOOT_SAMPLES, BootLatency, prewarm_cap_seconds
+from conftest import STATE_TABLE_NAME
+from reconcile import RUN_INTERVAL_SECONDS, STUCK_AFTER_SECONDS
+
+NOW = 1_714_672_800
+
+
+def test_prewarm_is_opt_in():
+    assert boot.PREWARM_MAX_MINUTES == 0
+    assert prewarm_cap_seconds({"Name": "office-hours"}) == 0
+    assert prewarm_cap_seconds({"Name": "office-hours", "PrewarmMinutes": "20"}) == 20 * 60
+
+
+def test_prewarm_cap_falls_back_on_invalid_values(monkeypatch):
+    monkeypatch.setattr(boot, "PREWARM_MAX_MINUTES", 15)
+    assert prewarm_cap_seconds({"Name": "office-hours"}) == 15 * 60
+    assert prewarm_cap_seconds({"Name": "office-hours", "PrewarmMinutes": "soon"}) == 15 * 60
+    assert prewarm_cap_seconds({"Name": "office-hours", "PrewarmMinutes": 0}) == 0
+    assert prewarm_cap_seconds({"Name": "office-hours", "PrewarmMinutes": -5}) == 0
+
+
+def test_observe_takes_the_midpoint_between_runs():
+    latency = BootLatency(NOW)
+    latency.previous_run = NOW - 300
+    # Started 400s ago, still booting 300s ago, up now: somewhere in 100s..400s
+    latency.observe("ec2", "m5.large", NOW - 400)
+    assert latency.samples == {("ec2", "m5.large"): [250]}
+
+
+def test_observe_skips_unbracketed_and_stuck_boots():
+    latency = BootLatency(NOW)
+    latency.observe("ec2", "m5.large", NOW - 400)  # no previous run
+    latency.previous_run = NOW - 300
+    latency.observe("ec2", "m5.large", NOW - 200)  # started after the previous run
+    latency.observe("ec2", "m5.large", NOW - STUCK_AFTER_SECONDS - 1)  # stuck, not booting
+    assert latency.samples == {}
+
+
+def test_observe_keeps_a_rolling_window():
+    latency = BootLatency(NOW)
+    latency.previous_run = NOW - 60
+    for i in range(BOOT_SAMPLES + 5):
+        latency.observe("rds", "db.t3.micro", NOW - 60 - 2 * i)
+    window = latency.samples[("rds", "db.t3.micro")]
+    # Started 60 + 2i seconds ago, booting 60s ago: sample 30 + 2i; the oldest five are dropped
+    assert window == [30 + 2 * i for i in range(5, BOOT_SAMPLES + 5)]
+
+
+def test_estimate_is_a_high_percentile():
+    latency = BootLatency(NOW)
+    assert latency.estimate("ec2", "m5.large") is None
+    latency.samples[("ec2", "m5.large")] = list(range(10, 210, 10))  # 20 samples, 10..200
+    assert latency.estimate("ec2", "m5.large") == 180
+
+
+def test_lead_seconds_is_one_run_ahead_and_capped():
+    latency = BootLatency(NOW)
+    latency.samples[("ec2", "m5.large")] = [120]
+    assert latency.lead_seconds("ec2", "m5.large", 3600) == 120 + RUN_INTERVAL_SECONDS
+    assert latency.lead_seconds("ec2", "m5.large", 200) == 200
+    assert latency.lead_seconds("ec2", "m5.large", 0) == 0
+    assert latency.lead_seconds("ec2", "c5.large", 3600) == 0
+    assert latency.max_lead(3600) == 120 + RUN_INTERVAL_SECONDS
+
+
+def test_samples_round_trip_through_the_state_table():
+    dynamodb = fakes.FakeDynamoDB(fakes.CallLog())
+    dynamodb.add_table(STATE_TABLE_NAME, "ResourceId")
+
+    first = BootLatency(NOW - 300, dynamodb)
+    first.load({("ec2", "m5.large")})
+    assert first.previous_run is None
+    first.flush()
+
+    second = BootLatency(NOW, dynamodb)
+    second.load({("ec2", "m5.large")})
+    assert second.previous_run == NOW - 300
+    second.observe("ec2", "m5.large", NOW - 400)
+    second.flush()
+
+    third = BootLatency(NOW + 300, dynamodb)
+    third.load({("ec2", "m5.large")})
+    assert third.previous_run == NOW
+    assert third.samples == {("ec2", "m5.large"): [250]}
@@ -0,0 +1,72 @@
+"""
+Warm-container config cache (config.load_config) and its version marker.
+"""
+import pytest
+
+import config
+import fakes
+from config import VERSION_ITEM_NAME, load_config
+
+
+@pytest.fixture
+def table():
+    config._config_cache.update(periods=None, schedules=None, version=None, loaded_at=0.0)
+    log = fakes.CallLog()
+    items = [
+        {"Name": "office", "Type": "period", "BeginTime": "09:00", "EndTime": "18:00"},
+        {"Name": "office-hours", "Type": "schedule", "Periods": "office", "Hibernate": "true"},
+        {"Name": VERSION_ITEM_NAME, "Type": "version", "Version": "v1"},
+    ]
+    yield fakes.FakeDynamoDB(log).add_table("bench-table", "Name", items)
+    config._config_cache.update(periods=None, schedules=None, version=None, loaded_at=0.0)
+
+
+def scans(table) -> int:
+    return table.client.log.counts.get("dynamodb.Scan", 0)
+
+
+def test_unchanged_version_reuses_the_cache(table):
+    periods, schedules = load_config(table)
+    assert list(periods) == ["office"]
+    assert schedules[0]["Hibernate"] is True
+
+    assert load_config(table) == (periods, schedules)
+    assert scans(table) == 1
+
+
+def test_new_version_reloads(table):
+    load_config(table)
+    table.put_item(Item={"Name": "late", "Type": "period", "BeginTime": "18:00", "EndTime": "22:00"})
+    table.put_item(Item={"Name": VERSION_ITEM_NAME, "Type": "version", "Version": "v2"})
+
+    periods, _ = load_config(table)
+    assert sorted(periods) == ["late", "office"]
+    assert scans(table) == 2
+
+
+def test_missing_version_marker_always_reloads(table):
+    table.delete_item(Key={"Name": VERSION_ITEM_NAME})
+    load_config(table)
+    table.put_item(Item={"Name": "late", "Type": "period", "BeginTime": "18:00", "EndTime": "22:00"})
+
+    periods, _ = load_config(table)
+    assert sorted(periods) == ["late", "office"]
+    assert scans(table) == 2
+
+
+def test_unreadable_version_marker_reloads(table, monkeypatch):
+    load_config(table)
+
+    def broken(**kwargs):
+        raise fakes.FakeError("ProvisionedThroughputExceededException")
+
+    monkeypatch.setattr(table, "get_item", broken)
+    load_config(table)
+    assert scans(table) == 2
+
+
+def test_ttl_expiry_reloads(table, monkeypatch):
+    load_config(table)
+    monkeypatch.setattr(config, "CONFIG_TTL_SECONDS", 0)
+    load_config(table)
+    assert scans(table) == 2
@@ -0,0 +1,73 @@
+"""
+Cold start: importing the handler module must not build any boto3 session
+or client (see targets.get_session/get_client). The import time budget is
+checked by bench/run_bench.py.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from conftest import LAMBDA_DIR
+
+# Fresh interpreter: count every boto3/botocore session and client created during the import
+PROBE = """
+import json
+import boto3.session
+import botocore.session
+
+built = []
+
+def spy(cls, method, label):
+    original = getattr(cls, method)
+    def wrapper(*args, **kwargs):
+        built.append(label)
+        return original(*args, **kwargs)
+    setattr(cls, method, wrapper)
+
+spy(boto3.session.Session, "__init__", "boto3.Session")
+spy(botocore.session.Session, "__init__", "botocore.Session")
+spy(botocore.session.Session, "create_client", "client")
+
+import main
+import targets
+print(json.dumps({
+    "built": built,
+    "cached": len(targets._clients) + len(targets._resources),
+    "session": targets._session["session"] is not None,
+    "pool": targets.CLIENT_CONFIG.max_pool_connections,
+}))
+"""
+
+
+def import_main(extra_env: dict = None) -> dict:
+    env = dict(os.environ, AWS_DEFAULT_REGION="us-east-1", **(extra_env or {}))
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=LAMBDA_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_import_builds_no_session_or_client():
+    result = import_main()
+    assert (result["built"], result["cached"], result["session"]) == ([], 0, False)
+
+
+def test_import_builds_nothing_with_every_feature_on():
+    result = import_main({
+        "STATE_TABLE_NAME": "state",
+        "STATE_CACHE_TABLE": "cache",
+        "SHARD_COUNT": "4",
+        "SKIP_WHEN_IDLE": "true",
+        "PROFILE_METRICS": "true",
+        "TARGET_REGIONS": "eu-west-1,us-west-2",
+        "TARGET_ROLE_ARNS": "arn:aws:iam::111111111111:role/scheduler",
+    })
+    assert (result["built"], result["cached"], result["session"]) == ([], 0, False)
+
+
+def test_connection_pool_follows_worker_counts():
+    # Every target worker's RDS dispatch pool, plus one connection per target worker
+    assert import_main({"MAX_TARGET_WORKERS": "3", "MAX_WORKERS": "5"})["pool"] == 3 * (5 + 1)
+    assert import_main({"MAX_TARGET_WORKERS": "1", "MAX_WORKERS": "1"})["pool"] == 2
+    assert import_main({"MAX_POOL_CONNECTIONS": "50"})["pool"] == 50
@@ -0,0 +1,56 @@
+"""
+RDS tag index (inventory.load_rds_inventory) and its warm-container cache.
+"""
+import pytest
+
+import fakes
+import inventory
+from inventory import InventorySnapshot, load_rds_inventory
+
+TARGET = ("self", "us-east-1")
+
+
+@pytest.fixture
+def rds():
+    inventory._rds_index_cache.clear()
+    log = fakes.CallLog()
+    yield fakes.FakeRDS(log, fakes.make_estate(instances=0, dbs=20, schedules=4)["rds"])
+    inventory._rds_index_cache.clear()
+
+
+def describes(rds) -> int:
+    return rds.log.counts.get("rds.DescribeDBInstances", 0)
+
+
+def statuses(snapshot: InventorySnapshot) -> dict:
+    return {d.identifier: d.status for dbs in snapshot.rds.values() for d in dbs}
+
+
+def test_index_is_rebuilt_every_run_without_ttl(rds):
+    load_rds_inventory(rds, InventorySnapshot(), ttl_seconds=0, cache_key=TARGET)
+    load_rds_inventory(rds, InventorySnapshot(), ttl_seconds=0, cache_key=TARGET)
+    assert describes(rds) == 2
+    assert inventory._rds_index_cache == {}
+
+
+def test_cached_index_hands_each_run_its_own_records(rds):
+    first = load_rds_inventory(rds, InventorySnapshot(), ttl_seconds=300, cache_key=TARGET)
+    described = statuses(first)
+    assert first.rds_count() == 20
+
+    # The run marks the DBs it sent actions to, as ActionPlan does
+    for dbs in first.rds.values():
+        for db in dbs:
+            db.status = "starting"
+
+    second = load_rds_inventory(rds, InventorySnapshot(), ttl_seconds=300, cache_key=TARGET)
+    assert describes(rds) == 1
+    assert statuses(second) == described
+    first_records = {id(d) for dbs in first.rds.values() for d in dbs}
+    assert not first_records & {id(d) for dbs in second.rds.values() for d in dbs}
+
+
+def test_cache_is_kept_per_target(rds):
+    load_rds_inventory(rds, InventorySnapshot(), ttl_seconds=300, cache_key=TARGET)
+    load_rds_inventory(rds, InventorySnapshot(), ttl_seconds=300, cache_key=("123456789012", "eu-west-1"))
+    assert describes(rds) == 2
@@ -0,0 +1,136 @@
+"""
+Invocation lease (lease.py): conditional acquire, heartbeats, takeover of
+an expired lease and failing open, on a fake clock.
+"""
+import pytest
+
+import fakes
+import lease
+from conftest import TABLE_NAME
+from lease import KEY_PREFIX, LEASE_POLL_SECONDS, LEASE_SECONDS, Lease, held_scopes
+
+NOW = 1_714_672_800.0
+
+
+class Clock:
+    """
+    Stands in for the time module in lease.py; sleeping moves the clock on.
+    """
+
+    def __init__(self, now: float = NOW):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(lease, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def dynamodb():
+    dynamodb = fakes.FakeDynamoDB(fakes.CallLog())
+    dynamodb.add_table(TABLE_NAME, "Name")
+    return dynamodb
+
+
+@pytest.fixture
+def table(dynamodb):
+    return dynamodb.Table(TABLE_NAME)
+
+
+def test_held_lease_is_not_taken(clock, table):
+    first, second = Lease(table, "run", "run-1"), Lease(table, "run", "run-2")
+    assert first.acquire(0)
+    assert not second.acquire(0)
+    assert second.holder == "run-1"
+    assert clock.sleeps == []
+    assert [d["MetricName"] for d in second.metric_data()] == ["LeaseWait", "LeaseContention"]
+
+    item = table.items[KEY_PREFIX + "run"]
+    assert (item["Owner"], item["ExpiresAt"]) == ("run-1", NOW + LEASE_SECONDS)
+
+
+def test_released_lease_is_free(clock, table):
+    first = Lease(table, "run", "run-1")
+    first.acquire(0)
+    clock.now += 30
+    first.release()
+    assert table.items == {}
+    assert first.summary()["hold_ms"] == 30_000
+
+    assert Lease(table, "run", "run-2").acquire(0)
+
+
+def test_waiting_run_takes_over_once_the_lease_expires(clock, table):
+    Lease(table, "run", "run-1").acquire(0)  # never released: the run timed out
+
+    waiting = Lease(table, "run", "run-2")
+    assert waiting.acquire(LEASE_SECONDS + 10)
+    assert clock.now - NOW > LEASE_SECONDS
+    assert set(clock.sleeps) == {LEASE_POLL_SECONDS}
+    assert waiting.wait_ms == (clock.now - NOW) * 1000
+    assert table.items[KEY_PREFIX + "run"]["Owner"] == "run-2"
+
+
+def test_heartbeat_renews_after_half_the_lease(clock, table):
+    held = Lease(table, "run", "run-1")
+    held.acquire(0)
+
+    clock.now += LEASE_SECONDS / 2 - 1
+    assert held.renew()
+    assert table.items[KEY_PREFIX + "run"]["ExpiresAt"] == NOW + LEASE_SECONDS
+    clock.now += 2
+    assert held.renew()
+    assert table.items[KEY_PREFIX + "run"]["ExpiresAt"] == clock.now + LEASE_SECONDS
+
+
+def test_overtaken_holder_loses_the_lease_and_keeps_hands_off(clock, table):
+    slow = Lease(table, "run", "run-1")
+    slow.acquire(0)
+    clock.now += LEASE_SECONDS + 1
+    assert Lease(table, "run", "run-2").acquire(0)
+
+    assert not slow.renew()
+    assert slow.lost
+    slow.release()
+    assert table.items[KEY_PREFIX + "run"]["Owner"] == "run-2"
+    assert "LeaseLost" in [d["MetricName"] for d in slow.metric_data()]
+
+
+def test_scopes_are_independent(clock, table):
+    assert Lease(table, "run", "run-1").acquire(0)
+    assert Lease(table, "shard#0/2", "run-1").acquire(0)
+    assert not Lease(table, "shard#0/2", "run-2").acquire(0)
+
+
+def test_unreachable_table_fails_open(clock, table, monkeypatch):
+    def broken(**kwargs):
+        raise fakes.FakeError("ResourceNotFoundException")
+
+    monkeypatch.setattr(table, "put_item", broken)
+    held = Lease(table, "run", "run-1")
+    assert held.acquire(0)
+    assert not held.held
+    assert held.renew(force=True)
+
+
+def test_held_scopes_ignores_expired_leases(clock, dynamodb, table):
+    Lease(table, "shard#0/2", "run-1").acquire(0)
+    clock.now += LEASE_SECONDS + 1
+    Lease(table, "shard#1/2", "run-2").acquire(0)
+
+    scopes = ["shard#0/2", "shard#1/2", "run"]
+    assert held_scopes(dynamodb, TABLE_NAME, scopes, int(clock.now)) == {"shard#1/2"}
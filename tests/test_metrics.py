@@ -0,0 +1,104 @@
+"""
+Metric sinks (metrics.py): PutMetricData collapsing and chunking, EMF
+documents, and merging per-shard datums.
+"""
+import io
+import json
+
+import pytest
+
+import fakes
+from metrics import (MAX_METRICS_PER_EMF_DOC, MAX_VALUES_PER_DATUM, NAMESPACE, EmfSink, MetricsSink,
+                     PutMetricDataSink, merge_metric_data)
+
+
+def datum(name: str, value, schedule: str = "office-hours") -> dict:
+    return {"MetricName": name, "Dimensions": [{"Name": "Schedule", "Value": schedule}], "Value": value, "Unit": "Count"}
+
+
+def test_sink_must_implement_publish():
+    with pytest.raises(TypeError):
+        MetricsSink()
+
+
+# ================================
+# 🔹 PUTMETRICDATA
+# ================================
+def test_repeated_values_collapse_into_counts():
+    sink = PutMetricDataSink(None)
+    collapsed = sink.collapse([datum("Running", 1), datum("Running", 1), datum("Running", 0), datum("Running", 1, "night")])
+    assert collapsed == [
+        {"MetricName": "Running", "Dimensions": [{"Name": "Schedule", "Value": "office-hours"}],
+         "Values": [1.0, 0.0], "Counts": [2.0, 1.0], "Unit": "Count"},
+        {"MetricName": "Running", "Dimensions": [{"Name": "Schedule", "Value": "night"}],
+         "Values": [1.0], "Counts": [1.0], "Unit": "Count"},
+    ]
+
+
+def test_distinct_values_are_split_at_150_per_datum():
+    sink = PutMetricDataSink(None)
+    collapsed = sink.collapse([datum("Uptime", v) for v in range(MAX_VALUES_PER_DATUM * 2 + 1)])
+    assert [len(d["Values"]) for d in collapsed] == [MAX_VALUES_PER_DATUM, MAX_VALUES_PER_DATUM, 1]
+    assert all(len(d["Counts"]) == len(d["Values"]) for d in collapsed)
+    assert [v for d in collapsed for v in d["Values"]] == [float(v) for v in range(MAX_VALUES_PER_DATUM * 2 + 1)]
+
+
+def test_publish_sends_batches_and_survives_a_failed_one(monkeypatch):
+    cloudwatch = fakes.FakeCloudWatch(fakes.CallLog())
+    sink = PutMetricDataSink(cloudwatch, batch_size=4)
+    calls = []
+    put = cloudwatch.put_metric_data
+
+    def flaky(Namespace, MetricData):
+        calls.append(len(MetricData))
+        if len(calls) == 2:
+            raise fakes.FakeError("Throttling")
+        return put(Namespace=Namespace, MetricData=MetricData)
+
+    monkeypatch.setattr(cloudwatch, "put_metric_data", flaky)
+    sink.publish([datum("Running", 1, f"schedule-{i}") for i in range(10)])
+
+    assert calls == [4, 4, 2]
+    assert len(cloudwatch.published) == 6
+
+
+def test_publish_stays_under_the_request_limit():
+    cloudwatch = fakes.FakeCloudWatch(fakes.CallLog())
+    PutMetricDataSink(cloudwatch).publish([datum("Running", 1, f"schedule-{i}") for i in range(2500)])
+    assert len(cloudwatch.published) == 2500
+    assert cloudwatch.log.counts["cloudwatch.PutMetricData"] == 3
+
+
+# ================================
+# 🔹 EMF
+# ================================
+def test_emf_writes_one_document_per_dimension_set():
+    stream = io.StringIO()
+    EmfSink(stream).publish([datum("Running", 3), datum("Stopped", 1), datum("Running", 2, "night")])
+    docs = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    assert [d["Schedule"] for d in docs] == ["office-hours", "night"]
+    office = docs[0]
+    assert office["Running"] == 3 and office["Stopped"] == 1
+    directive = office["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == NAMESPACE
+    assert directive["Dimensions"] == [["Schedule"]]
+    assert directive["Metrics"] == [{"Name": "Running", "Unit": "Count"}, {"Name": "Stopped", "Unit": "Count"}]
+
+
+def test_emf_splits_documents_at_the_metric_limit():
+    sink = EmfSink()
+    docs = sink.documents([datum(f"Metric{i}", i) for i in range(MAX_METRICS_PER_EMF_DOC + 1)], timestamp_ms=1)
+    assert [len(d["_aws"]["CloudWatchMetrics"][0]["Metrics"]) for d in docs] == [MAX_METRICS_PER_EMF_DOC, 1]
+    assert all(d["_aws"]["Timestamp"] == 1 for d in docs)
+
+
+def test_emf_repeated_metric_becomes_a_value_array():
+    docs = EmfSink().documents([datum("Uptime", 5), datum("Uptime", 7)], timestamp_ms=1)
+    assert docs[0]["Uptime"] == [5, 7]
+    assert docs[0]["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [{"Name": "Uptime", "Unit": "Count"}]
+
+
+def test_merge_sums_partial_counts():
+    merged = merge_metric_data([datum("Running", 2), datum("Stopped", 1)], None, [datum("Running", 3)])
+    assert merged == [datum("Running", 5), datum("Stopped", 1)]
@@ -0,0 +1,66 @@
+"""
+Resources listed by several schedules (main.resolve_state, plan_groups):
+Override precedence, any-active, and which run owns a tag value.
+"""
+import pytest
+
+from inventory import Ec2Record, InventorySnapshot
+from main import plan_groups, resolve_state, schedule_override
+
+TARGET = ("self", "us-east-1")
+
+
+def schedules(*items) -> dict:
+    return {s["Name"]: s for s in items}
+
+
+BY_NAME = schedules(
+    {"Name": "office"},
+    {"Name": "batch"},
+    {"Name": "freeze", "Override": "stop"},
+    {"Name": "release", "Override": "Start"},
+)
+
+
+@pytest.mark.parametrize("names, active, expected", [
+    # No override active: running if any schedule is, decided by the first active one
+    (["office", "batch"], {"batch"}, (True, "batch", False)),
+    (["office", "batch"], set(), (False, "office", False)),
+    # An active override wins over any-active, either way
+    (["office", "freeze"], {"office", "freeze"}, (False, "freeze", True)),
+    (["freeze", "office"], {"freeze"}, (False, "freeze", True)),
+    (["office", "release"], {"release"}, (True, "release", True)),
+    # An inactive override does not count
+    (["freeze", "office"], {"office"}, (True, "office", False)),
+    # Several active overrides: the first listed wins
+    (["release", "freeze"], {"release", "freeze"}, (True, "release", True)),
+    (["freeze", "release"], {"release", "freeze"}, (False, "freeze", True)),
+])
+def test_resolve_state_precedence(names, active, expected):
+    states = {n: n in active for n in BY_NAME}
+    state, sched, overridden = resolve_state(names, BY_NAME, states)
+    assert (state, sched["Name"], overridden) == expected
+
+
+def test_invalid_override_is_ignored():
+    assert schedule_override({"Name": "odd", "Override": "pause"}) is None
+    assert schedule_override({"Name": "blank", "Override": " "}) is None
+    assert schedule_override({"Name": "release", "Override": " START "}) == "start"
+
+
+def test_tag_value_is_planned_by_its_first_schedule_only():
+    snapshot = InventorySnapshot()
+    for tag in ("office,batch", "batch", "unknown,office", "other-region"):
+        snapshot.ec2[tag] = [Ec2Record(f"i-{len(snapshot.ec2)}", tag, "stopped")]
+    states = {"office": False, "batch": True, "freeze": False, "release": False}
+    target_names = {n: {TARGET} for n in BY_NAME}
+    target_names["batch"] = {TARGET, ("self", "eu-west-1")}
+
+    groups = plan_groups(TARGET, snapshot, BY_NAME, states, {"office"}, target_names)
+    assert [(g["tag"], g["names"], g["active"]) for g in groups] == [
+        ("office,batch", ["office", "batch"], True),
+        ("unknown,office", ["office"], False),
+    ]
+
+    groups = plan_groups(TARGET, snapshot, BY_NAME, states, {"batch"}, target_names)
+    assert [g["tag"] for g in groups] == ["batch"]
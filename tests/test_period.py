@@ -0,0 +1,184 @@
+"""
+Period evaluation (period.py, utils.py): compiled periods against the
+day-by-day matchers, nth/last weekday expressions and the per-invocation
+evaluator.
+"""
+import calendar
+from datetime import date, datetime, timedelta, timezone
+
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from period import CompiledPeriod, PeriodEvaluator, compile_period, next_transition
+from utils import match_monthday, match_weekday
+
+DAYS = [date(2023, 1, 1) + timedelta(days=n) for n in range(3 * 365)]
+
+
+def nth_weekday(year: int, month: int, target: int, nth: int):
+    """
+    Day of the month of the nth `target` weekday, counted the slow way.
+    """
+    days = [d for d in range(1, calendar.monthrange(year, month)[1] + 1) if date(year, month, d).weekday() == target]
+    return days[nth - 1] if nth <= len(days) else None
+
+
+# ================================
+# 🔹 DAY EXPRESSIONS
+# ================================
+@pytest.mark.parametrize("nth", [1, 2, 3, 4, 5])
+@pytest.mark.parametrize("weekday", ["mon", "wed", "fri", "6"])
+def test_nth_weekday(weekday, nth):
+    target = list(calendar.day_abbr).index(weekday.title()) if not weekday.isdigit() else int(weekday)
+    for day in DAYS:
+        expected = day.day == nth_weekday(day.year, day.month, target, nth)
+        assert match_weekday(day, f"{weekday}#{nth}") == expected, day
+
+
+@pytest.mark.parametrize("weekday", ["mon", "thu", "fri", "0", "6"])
+def test_last_weekday(weekday):
+    target = list(calendar.day_abbr).index(weekday.title()) if not weekday.isdigit() else int(weekday)
+    for day in DAYS:
+        last_day = calendar.monthrange(day.year, day.month)[1]
+        expected = day.weekday() == target and day.day + 7 > last_day
+        assert match_weekday(day, f"{weekday}L") == expected, day
+
+
+def test_fifth_weekday_only_in_long_months():
+    fridays = [d for d in DAYS if match_weekday(d, "fri#5")]
+    assert date(2024, 3, 29) in fridays
+    assert all(d.weekday() == 4 and d.day >= 29 for d in fridays)
+    assert not any(match_weekday(d, "fri#5") for d in DAYS if (d.year, d.month) == (2024, 4))
+
+
+def test_last_and_nearest_weekday_monthdays():
+    assert [d for d in DAYS if d.year == 2024 and match_monthday(d, "L")][:3] == \
+        [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31)]
+    # 2024-06-15 is a Saturday (Friday 14th), 2024-09-15 a Sunday (Monday 16th)
+    assert match_monthday(date(2024, 6, 14), "15W")
+    assert match_monthday(date(2024, 9, 16), "15W")
+    assert not match_monthday(date(2024, 9, 14), "15W")
+
+
+# ================================
+# 🔹 COMPILED PERIODS
+# ================================
+@pytest.mark.parametrize("period", [
+    {"Weekdays": "0-4"},
+    {"Weekdays": "mon#1,fri#5"},
+    {"Weekdays": "friL", "Months": "jan-jun/2"},
+    {"MonthDays": "L,15W"},
+    {"MonthDays": "1-15/2", "Weekdays": "0-4"},
+    {"MonthDays": "1/7", "Months": "mar,sep-dec"},
+])
+def test_compiled_day_masks_match_the_day_matchers(period):
+    compiled = CompiledPeriod(period)
+    monthdays = (period.get("MonthDays") or "").split(",")
+    weekdays = (period.get("Weekdays") or "").split(",")
+    for day in DAYS:
+        expected = ((not period.get("MonthDays") or any(match_monthday(day, e) for e in monthdays))
+                    and (not period.get("Weekdays") or any(match_weekday(day, e) for e in weekdays)))
+        if period.get("Months"):
+            expected = expected and compiled.months >> day.month & 1
+        assert compiled.matches_day(day) == bool(expected), day
+
+
+def test_time_window_bounds():
+    office = CompiledPeriod({"BeginTime": "09:00", "EndTime": "17:30", "Weekdays": "0-4"})
+    monday = datetime(2024, 5, 6)
+    assert not office.is_active(monday.replace(hour=8, minute=59))
+    assert office.is_active(monday.replace(hour=9))
+    assert office.is_active(monday.replace(hour=17, minute=29))
+    assert not office.is_active(monday.replace(hour=17, minute=30))
+    assert not office.is_active(monday.replace(day=11, hour=10))  # Saturday
+
+    assert CompiledPeriod({"BeginTime": "20:00"}).is_active(monday.replace(hour=23))
+    assert not CompiledPeriod({"EndTime": "06:00"}).is_active(monday.replace(hour=6))
+
+
+def test_overnight_window_after_midnight_needs_both_days():
+    night = CompiledPeriod({"BeginTime": "22:00", "EndTime": "06:00", "Weekdays": "fri"})
+    friday, saturday = datetime(2024, 5, 10), datetime(2024, 5, 11)
+    assert not night.is_active(friday.replace(hour=3))  # Thursday night
+    assert night.is_active(friday.replace(hour=22))
+    assert not night.is_active(saturday.replace(hour=3))  # Friday's night, but Saturday does not match
+    assert not night.is_active(saturday.replace(hour=12))
+
+    nights = CompiledPeriod({"BeginTime": "22:00", "EndTime": "06:00", "Weekdays": "3-4"})
+    assert nights.is_active(friday.replace(hour=3))
+
+
+def test_periods_compile_once_per_content():
+    a = compile_period({"Name": "office", "BeginTime": "09:00", "EndTime": "17:00"})
+    b = compile_period({"Name": "renamed", "BeginTime": "09:00", "EndTime": "17:00", "Type": "period"})
+    assert a is b
+    assert compile_period({"BeginTime": "09:00", "EndTime": "18:00"}) is not a
+
+
+def scan_transition(periods: list, tz: str, after: datetime, days: int):
+    """
+    First minute after `after` at which "any period active" changes, minute by minute.
+    """
+    compiled = [compile_period(p) for p in periods]
+    zone = ZoneInfo(tz)
+
+    def active_at(moment):
+        return any(c.is_active(moment.astimezone(zone)) for c in compiled)
+
+    current = active_at(after)
+    moment = after.replace(second=0, microsecond=0)
+    for _ in range(days * 24 * 60):
+        moment += timedelta(minutes=1)
+        if active_at(moment) != current:
+            return moment
+    return None
+
+
+def test_evaluator_shares_one_instant_per_timezone():
+    now = datetime(2024, 5, 6, 7, 30, tzinfo=timezone.utc)
+    evaluator = PeriodEvaluator(now)
+    office = {"BeginTime": "09:00", "EndTime": "17:00"}
+    assert evaluator.is_active(office, "Europe/Berlin")
+    assert not evaluator.is_active(office, "UTC")
+    assert evaluator.local_now("Europe/Berlin").hour == 9
+    assert len(evaluator._results) == 2
+
+
+# ================================
+# 🔹 TRANSITIONS
+# ================================
+@pytest.mark.parametrize("periods", [
+    [{"BeginTime": "22:00", "EndTime": "06:00", "Weekdays": "0-4"}],
+    [{"BeginTime": "22:00", "EndTime": "06:00", "Weekdays": "4"}, {"BeginTime": "09:00", "EndTime": "12:00"}],
+    [{"BeginTime": "09:00", "EndTime": "17:00", "Weekdays": "friL"}],
+    [{"BeginTime": "08:00", "Weekdays": "mon#1"}],
+    [{"EndTime": "04:30", "MonthDays": "L"}],
+], ids=["overnight", "overnight-and-morning", "last-friday", "first-monday", "last-day"])
+@pytest.mark.parametrize("tz", ["UTC", "America/New_York"])
+@pytest.mark.parametrize("after", [
+    datetime(2024, 3, 8, 23, 17, 30, tzinfo=timezone.utc),
+    datetime(2024, 3, 29, 12, 0, tzinfo=timezone.utc),
+    datetime(2024, 10, 31, 23, 59, tzinfo=timezone.utc),
+])
+def test_next_transition_matches_a_minute_scan(periods, tz, after):
+    assert next_transition(periods, tz, after) == scan_transition(periods, tz, after, days=40)
+
+
+def test_next_transition_is_strictly_after():
+    office = [{"BeginTime": "09:00", "EndTime": "17:00"}]
+    at_begin = datetime(2024, 5, 6, 9, 0, tzinfo=timezone.utc)
+    assert next_transition(office, "UTC", at_begin) == datetime(2024, 5, 6, 17, 0, tzinfo=timezone.utc)
+
+
+def test_next_transition_of_an_always_active_period_is_none():
+    assert next_transition([{"Name": "always"}], "UTC", datetime(2024, 5, 6, tzinfo=timezone.utc)) is None
+
+
+def test_evaluator_caches_transitions_per_period_set():
+    evaluator = PeriodEvaluator(datetime(2024, 5, 6, 7, 30, tzinfo=timezone.utc))
+    office = {"Name": "office", "BeginTime": "09:00", "EndTime": "17:00"}
+    first = evaluator.next_transition([office], "Europe/Berlin")
+    assert first == datetime(2024, 5, 6, 15, 0, tzinfo=timezone.utc)
+    assert evaluator.next_transition([dict(office, Name="copy")], "Europe/Berlin") is first
+    assert len(evaluator._transitions) == 1
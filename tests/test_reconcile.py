@@ -0,0 +1,91 @@
+"""
+Reconciler.decide and the action ledger: cooldown, stuck transitions,
+ignored states and converged resources.
+"""
+import pytest
+
+import reconcile
+from conftest import STATE_TABLE_NAME
+from reconcile import (
+    ACTION_COOLDOWN_SECONDS,
+    IGNORED_STATES,
+    RUN_INTERVAL_SECONDS,
+    STUCK_AFTER_SECONDS,
+    Reconciler,
+)
+
+NOW = 1_714_672_800
+INSTANCE = "i-00000000000000001"
+
+
+@pytest.fixture(autouse=True)
+def ledger():
+    reconcile.forget_ledger()
+    yield reconcile._ledger
+    reconcile.forget_ledger()
+
+
+def issued(ledger: dict, action: str, age: int):
+    ledger[INSTANCE] = {"Action": action, "IssuedAt": NOW - age}
+
+
+@pytest.mark.parametrize("kind, observed", [("ec2", "stopped"), ("rds", "stopped")])
+def test_start_sent_by_the_previous_run_is_not_resent(ledger, kind, observed):
+    # The next run may still see the resource stopped (describe lags the action)
+    issued(ledger, "start", RUN_INTERVAL_SECONDS)
+    assert Reconciler(NOW).decide(kind, INSTANCE, observed, active=True) is None
+
+    # A start that got lost is sent again once the cooldown has passed
+    issued(ledger, "start", ACTION_COOLDOWN_SECONDS)
+    assert Reconciler(NOW).decide(kind, INSTANCE, observed, active=True) == "start"
+
+
+def test_action_in_cooldown_is_not_resent(ledger):
+    issued(ledger, "stop", RUN_INTERVAL_SECONDS)
+    reconciler = Reconciler(NOW)
+    assert reconciler.decide("ec2", INSTANCE, "running", active=False) is None
+    assert reconciler.summary()["converging"] == 1
+
+    # Once the cooldown is over, or for the opposite action, it goes out again
+    issued(ledger, "stop", ACTION_COOLDOWN_SECONDS)
+    assert Reconciler(NOW).decide("ec2", INSTANCE, "running", active=False) == "stop"
+    issued(ledger, "start", RUN_INTERVAL_SECONDS)
+    assert Reconciler(NOW).decide("ec2", INSTANCE, "running", active=False) == "stop"
+
+
+def test_unconverged_resource_is_reported_stuck(ledger):
+    issued(ledger, "start", STUCK_AFTER_SECONDS - 1)
+    reconciler = Reconciler(NOW)
+    assert reconciler.decide("ec2", INSTANCE, "pending", active=True) is None
+    assert reconciler.summary()["stuck"] == []
+
+    issued(ledger, "start", STUCK_AFTER_SECONDS)
+    reconciler = Reconciler(NOW)
+    assert reconciler.decide("ec2", INSTANCE, "pending", active=True) is None
+    assert reconciler.summary() == {"converged": 0, "converging": 0, "stuck": [INSTANCE], "issued": 0}
+
+
+@pytest.mark.parametrize("kind, state", [(k, s) for k, states in IGNORED_STATES.items() for s in sorted(states)])
+def test_ignored_states_are_skipped(ledger, kind, state):
+    issued(ledger, "start", STUCK_AFTER_SECONDS)
+    reconciler = Reconciler(NOW)
+    assert reconciler.decide(kind, INSTANCE, state, active=True) is None
+    assert reconciler.decide(kind, INSTANCE, state, active=False) is None
+    assert reconciler.summary() == {"converged": 0, "converging": 0, "stuck": [], "issued": 0}
+    assert INSTANCE in ledger
+
+
+def test_converged_resource_is_cleared_from_ledger(fake_aws, ledger):
+    aws = fake_aws(instances=0, dbs=0, schedules=1)
+    table = aws.dynamodb.tables[STATE_TABLE_NAME]
+    table.put_item(Item={"ResourceId": INSTANCE, "Action": "stop", "IssuedAt": NOW - 60})
+
+    reconciler = Reconciler(NOW, aws.dynamodb)
+    reconciler.prefetch([INSTANCE])
+    assert reconciler.decide("ec2", INSTANCE, "stopped", active=False) is None
+    assert INSTANCE not in ledger
+    assert reconciler.cleared == [INSTANCE]
+    assert reconciler.summary()["converged"] == 1
+
+    reconciler.flush()
+    assert table.items == {}
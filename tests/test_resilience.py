@@ -0,0 +1,159 @@
+"""
+Circuit breakers, the retry budget and their botocore hooks (resilience.py),
+on real botocore clients whose requests are answered locally.
+"""
+import boto3
+import pytest
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+import profiling
+import resilience
+from profiling import instrument
+from resilience import CircuitBreaker, CircuitOpenError, protect
+
+THROTTLED = (b"<Response><Errors><Error><Code>RequestLimitExceeded</Code><Message>slow down</Message>"
+             b"</Error></Errors><RequestID>test</RequestID></Response>")
+EMPTY = b"<DescribeInstancesResponse><reservationSet/></DescribeInstancesResponse>"
+
+
+class Body:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def stream(self, **kwargs):
+        yield self.data
+
+    def read(self):
+        return self.data
+
+
+class Api:
+    """
+    Answers every request of a client locally: throttled while `throttling`, else an empty page.
+    """
+
+    def __init__(self, throttling: bool = True):
+        self.throttling = throttling
+        self.sent = 0
+
+    def __call__(self, request=None, **kwargs):
+        self.sent += 1
+        if self.throttling:
+            return AWSResponse(request.url, 503, {}, Body(THROTTLED))
+        return AWSResponse(request.url, 200, {}, Body(EMPTY))
+
+
+def ec2_client(api: Api, region: str = "us-east-1"):
+    session = boto3.session.Session(aws_access_key_id="test", aws_secret_access_key="test", region_name=region)
+    client = session.client("ec2", config=Config(retries={"mode": "standard", "total_max_attempts": 3}))
+    client.meta.events.register("before-send.ec2.*", api)
+    return client
+
+
+def describe(client):
+    try:
+        client.describe_instances()
+        return None
+    except ClientError as e:
+        return e.response["Error"]["Code"]
+
+
+@pytest.fixture(autouse=True)
+def profiler(monkeypatch):
+    monkeypatch.setattr(resilience, "MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(resilience, "CIRCUIT_THRESHOLD", 3)
+    monkeypatch.setattr("botocore.endpoint.time.sleep", lambda seconds: None)
+    resilience._breakers.clear()
+    resilience.start_invocation(10)
+    profiler = profiling.start()
+    yield profiler
+    profiling.stop(profiler)
+    resilience._breakers.clear()
+    resilience.start_invocation()
+
+
+# ================================
+# 🔹 BREAKER
+# ================================
+def test_breaker_opens_after_threshold_then_trials(monkeypatch):
+    monkeypatch.setattr(resilience, "CIRCUIT_OPEN_SECONDS", 60)
+    cb = CircuitBreaker()
+    assert [cb.on_throttle(0) for _ in range(3)] == [False, False, True]
+    assert not cb.allow(30)
+
+    # Half-open: a single trial call, then a throttle re-opens the circuit
+    assert cb.allow(61)
+    assert not cb.allow(61)
+    assert cb.on_throttle(62)
+    assert not cb.allow(100)
+
+    assert cb.allow(125)
+    cb.on_success()
+    assert cb.allow(126) and cb.allow(126)
+    assert cb.throttles == 0
+
+
+# ================================
+# 🔹 HOOKS
+# ================================
+def test_retry_budget_is_shared_by_the_invocation(monkeypatch):
+    monkeypatch.setattr(resilience, "CIRCUIT_THRESHOLD", 100)
+    resilience.start_invocation(1)
+    api = Api()
+    client = protect(ec2_client(api))
+
+    assert describe(client) == "RequestLimitExceeded"
+    assert api.sent == 2  # one retry, then the budget is spent
+    assert describe(client) == "RequestLimitExceeded"
+    assert api.sent == 3  # no retry left
+    # Each call ended on an attempt that was not retried
+    assert resilience.summary()["retries_used"] == 1
+    assert resilience.summary()["unretried_calls"] == 2
+    assert resilience.open_circuits() == []
+
+
+def test_open_circuit_rejects_calls_without_sending_them():
+    api = Api()
+    client = protect(ec2_client(api))
+
+    assert describe(client) == "RequestLimitExceeded"
+    sent = api.sent
+    assert resilience.open_circuits() == ["ec2.DescribeInstances in self/default"]
+    with pytest.raises(CircuitOpenError):
+        client.describe_instances()
+    assert api.sent == sent
+    assert resilience.summary()["short_circuited_calls"] == 1
+
+
+def test_breakers_are_kept_per_target():
+    throttled, serving = Api(), Api(throttling=False)
+    home = protect(ec2_client(throttled), resilience.HOME_SCOPE)
+    other = protect(ec2_client(serving, "eu-west-1"), ("", "eu-west-1"))
+
+    assert describe(home) == "RequestLimitExceeded"
+    assert describe(other) is None
+    assert resilience.open_circuits() == ["ec2.DescribeInstances in self/default"]
+
+
+@pytest.mark.parametrize("wrap", [
+    lambda client: protect(instrument(client)),
+    lambda client: instrument(protect(client)),
+], ids=["instrument-then-protect", "protect-then-instrument"])
+def test_profile_sees_every_attempt_and_rejection(profiler, wrap):
+    api = Api()
+    client = wrap(ec2_client(api))
+
+    assert describe(client) == "RequestLimitExceeded"
+    assert describe(client) == "CircuitOpen"
+    assert describe(client) == "CircuitOpen"
+
+    stats = profiler.summary()["api"]["ec2.DescribeInstances"]
+    # The attempt resilience gives up on (circuit just opened) is counted too
+    assert stats["throttles"] == api.sent
+    assert stats["calls"] == 1
+    assert stats["rejected"] == 2
+    assert profiler.summary()["api_rejected"] == 2
+    metrics = {m["MetricName"]: m["Value"] for m in profiler.metric_data()}
+    assert metrics["ApiRejections"] == 2
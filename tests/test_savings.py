@@ -0,0 +1,95 @@
+"""
+SavedHours accounting (savings.py): time actually spent stopped between
+runs, state changes only written back, and the last-run marker.
+"""
+import pytest
+
+import fakes
+import savings
+from conftest import STATE_TABLE_NAME
+from savings import KEY_PREFIX, LAST_RUN_KEY, SavingsAccumulator, sync_last_run
+
+NOW = 1_714_672_800
+RUN = 300
+
+
+@pytest.fixture(autouse=True)
+def warm_state():
+    savings._records.clear()
+    savings._last_run.clear()
+    yield
+    savings._records.clear()
+    savings._last_run.clear()
+
+
+@pytest.fixture
+def dynamodb():
+    dynamodb = fakes.FakeDynamoDB(fakes.CallLog())
+    dynamodb.add_table(STATE_TABLE_NAME, "ResourceId")
+    return dynamodb
+
+
+def run(now: int, observed: dict, dynamodb=None) -> dict:
+    """
+    One invocation: {resource_id: (stopped, stopped_at)} -> {resource_id: saved hours}.
+    """
+    acc = SavingsAccumulator(now, dynamodb)
+    acc.load(list(observed))
+    hours = {r: acc.observe(r, stopped, stopped_at) for r, (stopped, stopped_at) in observed.items()}
+    acc.flush()
+    return hours
+
+
+def test_first_run_saves_nothing():
+    assert run(NOW, {"i-1": (True, NOW - 3600)}) == {"i-1": 0.0}
+
+
+def test_saved_hours_are_the_time_stopped_since_the_previous_run():
+    run(NOW, {"i-1": (True, None), "i-2": (False, None)})
+    # An irregular gap between runs is accounted for as it was
+    assert run(NOW + 2 * 3600, {"i-1": (True, None), "i-2": (False, None)}) == {"i-1": 2.0, "i-2": 0.0}
+
+
+def test_stop_between_runs_counts_from_its_recorded_time():
+    run(NOW, {"i-1": (False, None)})
+    assert run(NOW + RUN, {"i-1": (True, NOW + 120)}) == {"i-1": (RUN - 120) / 3600}
+    # Without a stop time (or one in the future) it counts from this run
+    assert run(NOW + 2 * RUN, {"i-2": (True, None), "i-3": (True, NOW + 3 * RUN)}) == {"i-2": 0.0, "i-3": 0.0}
+
+
+def test_restart_stops_the_count():
+    run(NOW, {"i-1": (True, None)})
+    assert run(NOW + RUN, {"i-1": (False, None)}) == {"i-1": 0.0}
+    assert savings._records["i-1"] == (False, NOW + RUN)
+
+
+def test_only_state_changes_are_written(dynamodb):
+    run(NOW, {"i-1": (True, NOW - 60), "i-2": (False, None)}, dynamodb)
+    table = dynamodb.tables[STATE_TABLE_NAME]
+    assert table.items[KEY_PREFIX + "i-1"]["Since"] == NOW - 60
+    assert table.items[LAST_RUN_KEY]["Since"] == NOW
+
+    table.delete_item(Key={"ResourceId": KEY_PREFIX + "i-1"})
+    run(NOW + RUN, {"i-1": (True, None), "i-2": (False, None)}, dynamodb)
+    assert KEY_PREFIX + "i-1" not in table.items
+    assert table.items[LAST_RUN_KEY]["Since"] == NOW + RUN
+
+
+def test_cold_container_reads_state_back(dynamodb):
+    run(NOW, {"i-1": (True, NOW - 60)}, dynamodb)
+    savings._records.clear()
+    savings._last_run.clear()
+    assert run(NOW + RUN, {"i-1": (True, None)}, dynamodb) == {"i-1": RUN / 3600}
+
+
+def test_run_elsewhere_drops_warm_records(dynamodb):
+    run(NOW, {"i-1": (True, NOW - 60)}, dynamodb)
+    assert not sync_last_run(dynamodb, LAST_RUN_KEY)
+
+    # Another container ran and saw i-1 started
+    dynamodb.tables[STATE_TABLE_NAME].put_item(Item={"ResourceId": KEY_PREFIX + "i-1", "Stopped": False, "Since": NOW + RUN})
+    dynamodb.tables[STATE_TABLE_NAME].put_item(Item={"ResourceId": LAST_RUN_KEY, "Since": NOW + RUN})
+    assert sync_last_run(dynamodb, LAST_RUN_KEY)
+    assert savings._records == {}
+    # Stopped again: counted from this run, not from the stop the warm copy remembered
+    assert run(NOW + 2 * RUN, {"i-1": (True, None)}, dynamodb) == {"i-1": 0.0}
@@ -0,0 +1,121 @@
+"""
+Sharded runs (shards.py): stable assignment of schedules to shards, a
+coordinator run matching an unsharded one, and worker summaries that never
+arrive.
+"""
+import time
+from datetime import datetime, timezone
+from functools import partial
+
+import main
+import shards
+from period import PeriodEvaluator
+from shards import LocalInvoker, collect_summaries, save_summary, shard_of, shard_schedules
+
+SHARDS = 4
+
+# A weekday morning, when the fake estate's periods start and stop resources
+NOW = datetime(2024, 5, 7, 8, 0, tzinfo=timezone.utc)
+
+
+class DroppingInvoker(LocalInvoker):
+    """
+    LocalInvoker whose invocations of some shards are lost.
+    """
+
+    def __init__(self, handler, dropped: set):
+        super().__init__(handler)
+        self.dropped = dropped
+
+    def invoke(self, payload: dict):
+        if payload["shard"] not in self.dropped:
+            super().invoke(payload)
+
+
+def states(aws) -> dict:
+    ec2 = {i: d["State"]["Name"] for i, d in aws.ec2.instances.items()}
+    rds = {i: d["DBInstanceStatus"] for i, d in aws.rds.dbs.items()}
+    return {"ec2": ec2, "rds": rds}
+
+
+def combined(response: dict) -> dict:
+    """
+    The parts of a run's response a coordinator adds up across shards.
+    """
+    return {
+        "ec2_actions": response["ec2_actions"],
+        "rds_actions": response["rds_actions"],
+        "active": sorted(response["active"]),
+        "failed": sorted(response["failed"]),
+        "deferred": sorted(response["deferred"]),
+    }
+
+
+# ================================
+# 🔹 ASSIGNMENT
+# ================================
+def test_shard_of_is_stable():
+    # sha1 of the name: the same in every container, whatever PYTHONHASHSEED
+    assert [shard_of(f"schedule-{i}", SHARDS) for i in range(8)] == [0, 1, 3, 0, 2, 0, 1, 2]
+    assert shard_of("office-hours", SHARDS) == 3
+    assert shard_of("office-hours", 1) == 0
+
+
+def test_shard_of_splits_evenly():
+    names = [f"schedule-{i}" for i in range(1000)]
+    sizes = [len(shard_schedules([{"Name": n} for n in names], i, SHARDS)) for i in range(SHARDS)]
+    assert sum(sizes) == len(names)
+    assert all(abs(size - len(names) / SHARDS) <= 0.15 * len(names) / SHARDS for size in sizes)
+
+
+# ================================
+# 🔹 COORDINATOR
+# ================================
+def test_sharded_run_matches_unsharded_run(fake_aws, monkeypatch):
+    # Both passes, and every worker, evaluate periods at the same instant
+    monkeypatch.setattr(main, "PeriodEvaluator", partial(PeriodEvaluator, NOW))
+    aws = fake_aws(instances=300, dbs=30, schedules=24)
+    unsharded = main.lambda_handler({}, None)
+    unsharded_states = states(aws)
+
+    aws = fake_aws(instances=300, dbs=30, schedules=24)
+    monkeypatch.setattr(main, "SHARD_COUNT", SHARDS)
+    shards.set_invoker(LocalInvoker(main.lambda_handler))
+    sharded = main.lambda_handler({}, None)
+
+    assert sharded["shards"] > 1
+    assert sharded["missing_shards"] == []
+    assert combined(sharded) == combined(unsharded)
+    assert unsharded["ec2_actions"] + unsharded["rds_actions"] > 0
+    assert states(aws) == unsharded_states
+
+
+def test_coordinator_reports_missing_worker(fake_aws, monkeypatch):
+    fake_aws(instances=100, dbs=10, schedules=24)
+    monkeypatch.setattr(main, "SHARD_COUNT", SHARDS)
+    monkeypatch.setattr(main, "SHARD_WAIT_SECONDS", 0.3)
+    monkeypatch.setattr(shards, "SHARD_POLL_SECONDS", 0.05)
+    shards.set_invoker(DroppingInvoker(main.lambda_handler, {1}))
+
+    started = time.monotonic()
+    response = main.lambda_handler({}, None)
+
+    assert time.monotonic() - started >= 0.25
+    assert response["missing_shards"] == [1]
+    assert response["shards"] == SHARDS
+
+
+def test_collect_summaries_returns_partial_results_at_deadline(fake_aws, monkeypatch):
+    aws = fake_aws(instances=0, dbs=0, schedules=1)
+    monkeypatch.setattr(shards, "SHARD_POLL_SECONDS", 0.05)
+    save_summary(aws.dynamodb, "run-1", 0, {"ec2_actions": 2}, 0)
+    save_summary(aws.dynamodb, "run-1", 2, {"ec2_actions": 3}, 0)
+    save_summary(aws.dynamodb, "run-2", 1, {"ec2_actions": 9}, 0)
+    beats = []
+
+    started = time.monotonic()
+    summaries = collect_summaries(aws.dynamodb, "run-1", [0, 1, 2], started + 0.3, lambda: beats.append(1))
+
+    assert summaries == {0: {"ec2_actions": 2}, 2: {"ec2_actions": 3}}
+    assert 0.2 <= time.monotonic() - started < 1.0
+    assert beats
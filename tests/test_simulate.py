@@ -0,0 +1,90 @@
+"""
+Schedule simulator (simulate.py): agreement with the Lambda's own period
+evaluation, DST, projections and the range checks.
+"""
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import fakes
+import simulate
+from period import compile_period
+from simulate import Simulator
+
+# Two weeks around the end of DST in Europe (2024-10-27)
+START = datetime(2024, 10, 20, tzinfo=timezone.utc)
+END = datetime(2024, 11, 3, tzinfo=timezone.utc)
+
+
+def periods_by_name() -> dict:
+    return {f"period-{i}": dict(t, Name=f"period-{i}", Type="period") for i, t in enumerate(fakes.PERIOD_TEMPLATES)}
+
+
+@pytest.mark.parametrize("tz", ["UTC", "Europe/Berlin", "America/New_York", "Asia/Tokyo"])
+def test_matches_period_evaluation_at_every_grid_point(tz):
+    simulator = Simulator(START, END, step_minutes=30)
+    zone = ZoneInfo(tz)
+    for name, period in periods_by_name().items():
+        compiled = compile_period(period)
+        active = simulator.period_active(period, tz)
+        expected = [compiled.is_active((START + timedelta(minutes=30 * i)).astimezone(zone))
+                    for i in range(len(simulator.grid))]
+        assert active.tolist() == expected, name
+
+
+def test_dst_change_keeps_local_hours():
+    periods = {"office": {"Name": "office", "BeginTime": "09:00", "EndTime": "17:00"}}
+    sched = {"Name": "berlin", "Periods": "office", "Timezone": "Europe/Berlin"}
+    result = simulate.simulate([sched], periods, START, END, step_minutes=1)
+    # 8 local hours on each of 14 days, whatever the UTC offset that day
+    assert result["schedules"][0]["active_hours"] == 14 * 8
+
+
+def test_overnight_window_and_unknown_periods():
+    periods = {"night": {"Name": "night", "BeginTime": "22:00", "EndTime": "06:00", "Weekdays": "0-4"}}
+    schedules = [
+        {"Name": "nightly", "Periods": "night", "Timezone": "UTC"},
+        {"Name": "broken", "Periods": "night,missing", "Timezone": "UTC"},
+    ]
+    start = datetime(2024, 5, 6, tzinfo=timezone.utc)  # a Monday
+    result = simulate.simulate(schedules, periods, start, start + timedelta(days=7), step_minutes=5,
+                               rates={"nightly": 2.0}, keep_matrix=True)
+    nightly, broken = result["schedules"]
+    # Mon-Fri 22:00-24:00, and 00:00-06:00 on days that match as well as the
+    # day before (Tue-Fri), as in CompiledPeriod.is_active
+    assert nightly["active_hours"] == 5 * 2 + 4 * 6
+    assert nightly["saved_hours"] == 7 * 24 - 34
+    assert nightly["projected_cost"] == 68.0
+    assert nightly["projected_savings"] == (7 * 24 - 34) * 2.0
+    assert broken["active_hours"] == 0
+    assert result["matrix"].shape == (2, 7 * 24 * 12)
+
+
+@pytest.mark.parametrize("start, end, step", [(END, START, 5), (START, START, 5), (START, END, 0)])
+def test_empty_range_is_rejected(start, end, step):
+    with pytest.raises(ValueError):
+        Simulator(start, end, step)
+
+
+def test_cli_rejects_an_empty_range(tmp_path, capsys):
+    config = tmp_path / "items.json"
+    config.write_text("[]")
+    with pytest.raises(SystemExit) as exit_info:
+        simulate.main(["--config", str(config), "--start", "2025-01-02", "--end", "2025-01-01"])
+    assert exit_info.value.code == 2
+    assert "must be after --start" in capsys.readouterr().err
+
+
+def test_cli_prints_projections(tmp_path, capsys):
+    config = tmp_path / "items.json"
+    config.write_text(
+        '[{"Name": "office", "Type": "period", "BeginTime": "09:00", "EndTime": "17:00"},'
+        ' {"Name": "office-hours", "Type": "schedule", "Periods": "office", "Timezone": "UTC"}]'
+    )
+    assert simulate.main(["--config", str(config), "--start", "2025-01-01", "--end", "2025-01-02", "--format", "csv"]) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].startswith("name,timezone,active_hours")
+    assert out[1].startswith("office-hours,UTC,8.0,16.0")
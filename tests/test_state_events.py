@@ -0,0 +1,142 @@
+"""
+Recorded EventBridge events (bench/events/*.json) through
+statecache.parse_event, StateCache.apply and the state_events handler.
+"""
+import json
+import os
+
+import pytest
+
+from conftest import BENCH_DIR, STATE_CACHE_TABLE
+
+import fakes
+import state_events
+import targets
+from instances import build_inventory
+from statecache import StateCache, event_epoch, parse_event
+
+HOME = f"{fakes.ACCOUNT}/{fakes.REGION}"
+
+
+def recorded(name: str) -> list:
+    with open(os.path.join(BENCH_DIR, "events", name)) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def cache(fake_aws):
+    """
+    State cache of a small estate, resynced before the recorded events happened.
+    """
+    aws = fake_aws(instances=20, dbs=5, schedules=3)
+    table = aws.dynamodb.tables[STATE_CACHE_TABLE]
+    StateCache(table).replace(HOME, build_inventory(targets.Target()), {}, 0)
+    return StateCache(table)
+
+
+def cached(cache: StateCache, resource_id: str):
+    return cache.table.items.get((HOME, resource_id))
+
+
+# ================================
+# 🔹 PARSING
+# ================================
+def test_parse_ec2_state_change():
+    event = recorded("ec2-state-change.json")[0]
+    assert parse_event(event) == {
+        "kind": "ec2",
+        "account": fakes.ACCOUNT,
+        "region": fakes.REGION,
+        "resource_id": "i-00000000000000001",
+        "state": "stopping",
+        "at": event_epoch("2024-05-02T18:00:05Z"),
+    }
+
+
+@pytest.mark.parametrize("event_id, state", [("RDS-EVENT-0087", "stopped"), ("RDS-EVENT-0088", "available")])
+def test_parse_rds_event_ids(event_id, state):
+    event = next(e for e in recorded("rds-instance-event.json") if e["detail"]["EventID"] == event_id)
+    change = parse_event(event)
+    assert (change["kind"], change["resource_id"], change["state"]) == ("rds", "db-0", state)
+
+
+def test_parse_rds_falls_back_on_message():
+    db = {"DBInstanceIdentifier": "db-0", "DBInstanceArn": f"arn:aws:rds:{fakes.REGION}:{fakes.ACCOUNT}:db:db-0"}
+    assert parse_event(fakes.rds_instance_event(db, "RDS-EVENT-9999", "DB instance is being started"))["state"] == "starting"
+    assert parse_event(fakes.rds_instance_event(db, "RDS-EVENT-0001", "Backing up DB instance")) is None
+
+
+def test_parse_tag_change():
+    with_tag, without_tag = map(parse_event, recorded("tag-change.json"))
+    assert (with_tag["kind"], with_tag["resource_id"]) == ("ec2", "i-00000000000000002")
+    assert with_tag["tags"]["ScheduleTag"] == "office-hours"
+    assert "state" not in with_tag
+    assert "ScheduleTag" not in without_tag["tags"]
+
+    rds = dict(recorded("tag-change.json")[0], resources=[f"arn:aws:rds:{fakes.REGION}:{fakes.ACCOUNT}:db:db-1"])
+    rds["detail"] = dict(rds["detail"], service="rds", **{"resource-type": "db"})
+    assert (parse_event(rds)["kind"], parse_event(rds)["resource_id"]) == ("rds", "db-1")
+
+
+def test_parse_ignores_other_events():
+    event = dict(recorded("ec2-state-change.json")[0], source="aws.autoscaling")
+    assert parse_event(event) is None
+
+
+# ================================
+# 🔹 APPLYING
+# ================================
+def test_apply_ec2_stop_records_stopped_at(cache):
+    change = parse_event(recorded("ec2-state-change.json")[1])
+    assert cache.apply(change, HOME, state_events.describe) == "updated"
+    item = cached(cache, "i-00000000000000001")
+    assert (item["State"], item["UpdatedAt"], item["StoppedAt"]) == ("stopped", change["at"], change["at"])
+
+
+def test_apply_rds_events(cache):
+    stopped, started = (parse_event(e) for e in recorded("rds-instance-event.json")[:2])
+    assert cache.apply(stopped, HOME) == "updated"
+    assert cached(cache, "db-0")["State"] == "stopped"
+    assert cache.apply(started, HOME) == "updated"
+    assert cached(cache, "db-0")["State"] == "available"
+
+
+def test_older_event_after_newer_one_is_stale(cache):
+    stopping, stopped, late_stopping = map(parse_event, recorded("ec2-state-change.json"))
+    assert late_stopping["at"] < stopped["at"]
+
+    assert cache.apply(stopping, HOME) == "updated"
+    assert cache.apply(stopped, HOME) == "updated"
+    before = dict(cached(cache, "i-00000000000000001"))
+    assert cache.apply(late_stopping, HOME, state_events.describe) == "stale"
+    assert cached(cache, "i-00000000000000001") == before
+
+
+def test_unknown_resource_is_described(cache):
+    cache.table.items.pop((HOME, "i-00000000000000004"))
+    change = parse_event(fakes.ec2_state_event("i-00000000000000004", "running"))
+    assert cache.apply(change, HOME, state_events.describe) == "refreshed"
+    assert cached(cache, "i-00000000000000004")["Target"] == HOME
+
+    gone = parse_event(fakes.ec2_state_event("i-0000000000000ffff", "running"))
+    assert cache.apply(gone, HOME, state_events.describe) == "ignored"
+    assert cached(cache, "i-0000000000000ffff") is None
+
+
+def test_tag_change(cache):
+    with_tag, without_tag = map(parse_event, recorded("tag-change.json"))
+    assert cache.apply(with_tag, HOME, state_events.describe) == "refreshed"
+    assert cache.apply(without_tag, HOME, state_events.describe) == "deleted"
+    assert cached(cache, "i-00000000000000003") is None
+
+
+def test_handler_replays_recorded_events(cache, monkeypatch):
+    monkeypatch.setattr(state_events, "STATE_CACHE_TABLE", STATE_CACHE_TABLE)
+    events = [e for name in ("ec2-state-change.json", "rds-instance-event.json", "tag-change.json")
+              for e in recorded(name)]
+    applied = state_events.lambda_handler(events)["applied"]
+    assert sum(applied.values()) == len(events)
+    assert applied["stale"] == 1
+    assert applied["deleted"] == 1
+    assert "failed" not in applied
+    assert cached(cache, "i-00000000000000001")["State"] == "stopped"
@@ -10,6 +10,36 @@ variable "project_name" {
   default     = "ec2-rds-scheduler"
 }
 
+variable "target_regions" {
+  description = "Regions the scheduler manages (empty = the deployment region)"
+  type        = list(string)
+  default     = []
+}
+
+variable "target_role_arns" {
+  description = "Roles assumed to manage other accounts (empty = this account only)"
+  type        = list(string)
+  default     = []
+}
+
+variable "state_cache" {
+  description = "Track EC2/RDS states from state-change events instead of describing them every run"
+  type        = bool
+  default     = false
+}
+
+variable "state_cache_targets" {
+  description = "Other targets (\"account/region\") whose EC2/RDS events are forwarded to this account's default event bus"
+  type        = list(string)
+  default     = []
+}
+
+variable "shard_count" {
+  description = "Split schedules across this many parallel Lambda invocations (1 = no sharding)"
+  type        = number
+  default     = 1
+}
+
 variable "config" {
   type = object({
     name        = optional(string)